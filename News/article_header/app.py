@@ -1,21 +1,42 @@
 import streamlit as st
-import pandas as pd
-from newspaper import Article, Config
-import nltk
-import time
+import sys
+from pathlib import Path
+
+import httpx
+from xml.etree.ElementTree import ParseError
+
+# Make the shared anewz package importable under `streamlit run`
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from anewz.articles import parse_article_details
+from anewz.columnar import LABELS, export, file_name, mime_type
+from anewz.discovery import discover, sitemaps_from_robots
+from anewz.fetch import USER_AGENT
+from anewz.http_cache import HttpCache
+from anewz.jobs import progress_panel, start_job
+from anewz.metrics import METRICS
+from anewz.pipeline import scrape_articles, scrape_headers
+from anewz.resources import missing_nltk_data
+from anewz.state import StateStore
 
 # 1. Page Setup
 st.set_page_config(page_title="News Genre Extractor", page_icon="📂", layout="wide")
 
+# NLTK data comes from the vendored nltk_data/ directory; nothing is downloaded at start
+missing = missing_nltk_data()
+if missing:
+    st.warning(f"NLTK data missing ({', '.join(missing)}): summaries will fail. "
+               "Run `python -m anewz nltk-data` once to vendor it.")
+
+# Pages and parsed rows survive reruns; unchanged articles cost a 304
 @st.cache_resource
-def load_nltk():
-    try:
-        nltk.download('punkt')
-        nltk.download('punkt_tab')
-    except:
-        pass
+def get_http_cache():
+    return HttpCache()
 
-load_nltk()
+# Rows of articles processed by earlier runs, for delta runs
+@st.cache_resource
+def get_state_store():
+    return StateStore()
 
 st.title("📂 News Path & Genre Extractor")
 st.write("Extract metadata and automatically detect the news genre from the URL path.")
@@ -25,59 +46,116 @@ col_a, col_b = st.columns([1, 2])
 
 with col_a:
     base_url = st.text_input("Base Domain:", value="https://anewz.tv")
+    export_format = st.selectbox("Download format", list(LABELS), format_func=LABELS.get)
+    headers_only = st.checkbox("Headers only: read title, author, date and section from the page head",
+                               help="Skips the article body and the summary; pages without metadata "
+                                    "are still parsed in full.")
+    dedupe = st.checkbox("Parse near-duplicate articles only once", value=True)
+    delta = st.checkbox("Delta run: only process new or changed articles")
+    show_perf = st.checkbox("Show performance panel")
 
 with col_b:
-    paths_text = st.text_area("Paste Page Paths:", 
-                              height=150, 
-                              placeholder="/region/south-caucasus/article-123\n/economy/global/article-456")
+    # Archives are too big to paste: their URLs can come from the sitemaps and feeds instead
+    source = st.radio("URLs from:", ["Pasted paths", "Sitemaps / RSS feeds"], horizontal=True)
+    if source == "Pasted paths":
+        paths_text = st.text_area("Paste Page Paths:", 
+                                  height=150, 
+                                  placeholder="/region/south-caucasus/article-123\n/economy/global/article-456")
+    else:
+        feeds_text = st.text_area("Sitemap, sitemap index or feed URLs (blank: the site's robots.txt):",
+                                  height=80, placeholder="https://anewz.tv/sitemap.xml\nhttps://anewz.tv/rss")
+        sections_text = st.text_input("Sections (comma-separated path prefixes, blank: all):",
+                                      placeholder="/politics, /economy")
+        window = st.date_input("Modified between (optional):", value=())
+        only_changed = st.checkbox("Only URLs modified since the last discovery")
 
 # 3. EXTRACTION LOGIC
+# Downloads run on a few pooled connections; parse() and nlp() run on
+# every CPU core. The genre comes from the first path segment:
+# /region/south-caucasus/ -> "Region"
+def extract(job, pipeline, base_url, discovery=None):
+    """Runs on the job's thread: no st.* calls, progress goes through the job.
+
+    Returns the error line of every path that failed. The discovery's
+    cursors move past the articles extracted, even when cancelled.
+    """
+    errors = []
+    extracted = []
+    for full_url, row, error in pipeline:
+        if job.cancelled:
+            pipeline.close()
+            break
+        if row:
+            job.add(row)
+            extracted.append(full_url)
+        else:
+            errors.append(f"Error on path {full_url[len(base_url):]}: {error}")
+        job.step(failed=row is None)
+    if discovery is not None:
+        discovery.commit(extracted)
+    return errors
+
 if st.button("Extract Data & Detect Genre"):
     base_url = base_url.strip().rstrip('/')
-    path_list = [p.strip() for p in paths_text.split('\n') if p.strip()]
-    
-    if path_list:
-        results = []
-        progress_bar = st.progress(0)
-        
-        config = Config()
-        config.browser_user_agent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/119.0.0.0 Safari/537.36'
-        
-        for i, path in enumerate(path_list):
+    # Stage timings are process-wide; start each run from zero
+    METRICS.reset()
+
+    full_urls = []
+    discovery = None
+    if source == "Pasted paths":
+        for path in (p.strip() for p in paths_text.split('\n') if p.strip()):
             clean_path = path if path.startswith('/') else '/' + path
-            full_url = f"{base_url}{clean_path}"
-            
-            # --- GENRE DETECTION LOGIC ---
-            # We split the path by '/' and take the first real word
-            # Example: /region/south-caucasus/ -> [' ', 'region', 'south-caucasus']
-            path_parts = [part for part in clean_path.split('/') if part]
-            detected_genre = path_parts[0].capitalize() if path_parts else "General"
-            
+            full_urls.append(f"{base_url}{clean_path}")
+    else:
+        # Sitemaps are streamed; with the cursor, unchanged child sitemaps are not even downloaded
+        sections = [s.strip() for s in sections_text.split(',') if s.strip()]
+        # A single picked day is a window of its own
+        since, until = (tuple(window) + (None, None))[:2]
+        with st.spinner("Reading sitemaps and feeds..."), \
+                httpx.Client(timeout=30, headers={"User-Agent": USER_AGENT}, follow_redirects=True) as client:
+            feeds = [f.strip() for f in feeds_text.split('\n') if f.strip()] or sitemaps_from_robots(base_url, client)
             try:
-                article = Article(full_url, config=config)
-                article.download()
-                article.parse()
-                article.nlp()
-                
-                results.append({
-                    "Genre": detected_genre, # The new column
-                    "Title": article.title,
-                    "Author": ", ".join(article.authors) if article.authors else "N/A",
-                    "Date": article.publish_date,
-                    "Keywords": ", ".join(article.keywords[:5]),
-                    "Summary": article.summary[:150] + "...",
-                    "Full URL": full_url
-                })
-            except Exception as e:
-                st.error(f"Error on path {clean_path}: {e}")
-            
-            progress_bar.progress((i + 1) / len(path_list))
-            time.sleep(0.3)
+                discovery = discover(feeds, sections, since, until or since,
+                                     get_state_store() if only_changed else None, client=client)
+                full_urls = [entry.url for entry in discovery]
+            except (httpx.HTTPError, ParseError) as e:
+                st.error(f"Could not read the sitemaps: {e}")
+        st.info(f"Discovered {len(full_urls):,} article URLs in {len(feeds)} sitemap(s)/feed(s).")
+    if full_urls:
+        if headers_only:
+            # Only each page's <head> is downloaded; its article:section, when
+            # present, gives the genre and its meta description the Summary
+            pipeline = scrape_headers(full_urls, detailed=True, concurrency=8, cache=get_http_cache())
+        else:
+            pipeline = scrape_articles(full_urls, concurrency=8, parse=parse_article_details,
+                                       cache=get_http_cache(), dedupe=dedupe,
+                                       state=get_state_store() if delta else None)
+        # The extraction runs in the background and survives reruns; the panel below polls it
+        start_job("genre_job", extract, pipeline, base_url, discovery, total=len(full_urls))
+    elif source == "Pasted paths":
+        st.warning("Please enter at least one path.")
+
+job = st.session_state.get("genre_job")
+if job is not None:
+    progress_panel(job, "genre_job", "articles", export_format, "news_with_genres_partial")
 
-        # 4. RESULTS DISPLAY
-        if results:
-            st.success(f"Successfully processed {len(results)} articles!")
-            df = pd.DataFrame(results)
+    # 4. RESULTS DISPLAY
+    if not job.running:
+        df = job.frame()
+        errors = job.result or []
+        if errors:
+            with st.expander(f"⚠️ {len(errors)} paths could not be processed"):
+                st.write("\n".join(f"- {e}" for e in errors))
+
+        if show_perf:
+            snap = job.snapshot()
+            with st.expander("⏱ Performance", expanded=True):
+                st.caption(f"{snap.done} articles in {snap.elapsed:.1f}s ({snap.rate:.1f}/s). "
+                           "Stage times add up across connections and processes.")
+                st.dataframe(METRICS.stage_table(), use_container_width=True)
+
+        if not df.empty:
+            st.success(f"Successfully processed {len(df)} articles!")
             
             # Show a summary count of genres
             st.subheader("Articles by Genre")
@@ -86,7 +164,5 @@ if st.button("Extract Data & Detect Genre"):
             # Show the main table
             st.dataframe(df, use_container_width=True)
 
-            csv = df.to_csv(index=False).encode('utf-8')
-            st.download_button("📥 Download All as CSV", csv, "news_with_genres.csv", "text/csv")
-    else:
-        st.warning("Please enter at least one path.")
+            st.download_button(f"📥 Download All as {LABELS[export_format]}", export(df, export_format),
+                               file_name("news_with_genres", export_format), mime_type(export_format))
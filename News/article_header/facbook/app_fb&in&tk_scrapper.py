@@ -1,101 +1,89 @@
 import streamlit as st
 import pandas as pd
-import re
-import io
+import sys
+from pathlib import Path
 
-st.set_page_config(page_title="Text Intelligence Dashboard", page_icon="📝", layout="wide")
-
-# 1. REFINED GENRE BRAIN (Specific & Smart)
-GENRE_MAP = {
-
-    "World": ["un", "nato", "global", "international", "world", "foreign", "diplomacy"],
-
-    "Politics": ["election", "president", "minister", "parliament", "government", "protest"],
-
-    "Conflict & Security": ["strike", "military", "targeted", "attack", "war", "conflict", "security", "base", "retaliatory", "clash"],
-
-    "Economy": ["oil", "gas", "price", "business", "market", "finance", "bank", "dollar"],
-
-    "Culture": ["cuisine", "art", "music", "festival", "tradition", "heritage", "food", "museum", "history", "cultural"],
+# Make the shared anewz package importable under `streamlit run`
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
 
-    "Sports": ["football", "goal", "match", "league", "win", "player", "tournament"],
+from anewz.categorize import POST_COLUMNS, HashtagIndex, find_column, label_posts
+from anewz.columnar import LABELS, UPLOAD_TYPES, export, file_name, mime_type
+from anewz.csv_stream import read_header, sniff_encoding, stream_csv
+from anewz.genre import SOCIAL_GENRE_MAP, GenreScorer
 
-    "Technology": ["ai", "tech", "software", "google", "meta", "cyber", "robot"],
-
-    "Region": ["baku", "caucasus", "tbilisi", "karabakh", "central asia"]
-
-}
-
-def detect_genre(text):
-    if not text or pd.isna(text):
-        return "Not_specified"
-    
-    text_lower = str(text).lower()
-    for genre, keywords in GENRE_MAP.items():
-        if any(word in text_lower for word in keywords):
-            return genre
-    return "General"
+st.set_page_config(page_title="Text Intelligence Dashboard", page_icon="📝", layout="wide")
 
-def extract_hashtags(text):
-    if not text or pd.isna(text):
-        return "Not_specified"
-    tags = re.findall(r"#(\w+)", str(text))
-    return ", ".join(tags) if tags else "Not_specified"
+# 1. REFINED GENRE BRAIN (Specific & Smart, kept in anewz.genre)
+# Every genre is scored: "oil prices at the NATO summit" is Economy and World
+genre_classifier = GenreScorer(SOCIAL_GENRE_MAP)
 
 # 2. UI INTERFACE
 st.title("📝 Post Text Categorizer")
 
 input_method = st.radio("Choose Input Method:", ["Paste Text", "Upload CSV"])
+export_format = st.selectbox("Download format", list(LABELS), format_func=LABELS.get)
 
-results = []
+results = None
 
 if input_method == "Paste Text":
     texts_input = st.text_area("Paste Post Texts (one per line):", height=300)
     if st.button("🚀 Process Text"):
         lines = [line.strip() for line in texts_input.split('\n') if line.strip()]
-        for line in lines:
-            results.append({
-                "Genre": detect_genre(line),
-                "Hashtags": extract_hashtags(line),
-                "Post_Text": line
-            })
+        # All pasted lines are scored in one batch
+        results = label_posts(pd.DataFrame({"Post_Text": lines}), "Post_Text", genre_classifier)
 
 else:
-    uploaded_file = st.file_uploader("Upload CSV", type="csv")
+    uploaded_file = st.file_uploader("Upload CSV, Parquet or Arrow", type=UPLOAD_TYPES)
     if uploaded_file:
-        try:
-            # Try UTF-8-SIG first (handles Excel-generated CSVs with BOM)
-            df_input = pd.read_csv(uploaded_file, encoding='utf-8-sig')
-        except:
-            uploaded_file.seek(0)
-            df_input = pd.read_csv(uploaded_file, encoding='latin1')
+        # UTF-8-SIG handles Excel-generated CSVs with BOM; fall back to latin1
+        encoding = sniff_encoding(uploaded_file) if uploaded_file.name.lower().endswith(".csv") else None
+        columns = read_header(uploaded_file, encoding=encoding)
         
         # FIND THE TEXT COLUMN (Improved List)
-        possible_names = ['description', 'text', 'post_text', 'content', 'caption', 'body', 'message']
-        col_name = next((c for c in df_input.columns if c.lower() in possible_names), None)
+        col_name = find_column(columns, POST_COLUMNS)
         
         if col_name:
-            # Create the results
-            df_input['Genre'] = df_input[col_name].apply(detect_genre)
-            df_input['Hashtags'] = df_input[col_name].apply(extract_hashtags)
+            # Every widget click reruns the script: the upload is processed
+            # once per file and format, and the previous output is deleted
+            run_key = (uploaded_file.file_id, col_name, export_format)
+            processed = st.session_state.get("fb_output")
+            if processed is None or processed[0] != run_key or not Path(processed[1].path).exists():
+                if processed is not None:
+                    Path(processed[1].path).unlink(missing_ok=True)
+                # Create the results chunk by chunk, straight to disk, counting hashtags as we go
+                trending = HashtagIndex()
+                output = stream_csv(uploaded_file, lambda chunk: label_posts(chunk, col_name, genre_classifier, trending),
+                                    output_encoding='utf-8-sig', output_format=export_format, encoding=encoding)
+                st.session_state["fb_output"] = (run_key, output, trending)
+            _, output, trending = st.session_state["fb_output"]
             
             st.success(f"Found text in column: '{col_name}'")
-            st.dataframe(df_input)
+            st.caption(f"Processed {output.rows:,} rows; showing the first {len(output.sample):,}.")
+            st.dataframe(output.sample)
+            
+            st.subheader("Trending Hashtags by Genre")
+            st.dataframe(trending.table(), hide_index=True)
             
-            csv = df_input.to_csv(index=False).encode('utf-8-sig')
-            st.download_button("📥 Download Results", csv, "processed_data.csv", "text/csv")
+            with open(output.path, "rb") as f:
+                st.download_button("📥 Download Results", f, file_name("processed_data", export_format),
+                                   mime_type(export_format))
         else:
-            st.error(f"Could not find a text column. Your columns are: {list(df_input.columns)}")
+            st.error(f"Could not find a text column. Your columns are: {columns}")
             st.info("Tip: Rename your text column to 'Description' or 'Text' in Excel and re-upload.")
 
 # 3. DISPLAY RESULTS (For Paste Method)
-if results:
-    df = pd.DataFrame(results)
+if results is not None and not results.empty:
+    df = results
     st.subheader("Genre Distribution")
     st.bar_chart(df['Genre'].value_counts())
     
+    st.subheader("Trending Hashtags")
+    trending = HashtagIndex()
+    trending.update(df['Hashtags'], df['Genre'])
+    st.dataframe(trending.table(), hide_index=True)
+    
     st.subheader("Processed Intelligence")
     st.dataframe(df, use_container_width=True)
     
-    csv_paste = df.to_csv(index=False).encode('utf-8-sig')
-    st.download_button("📥 Download Results (CSV)", csv_paste, "text_genres.csv", "text/csv")
+    st.download_button(f"📥 Download Results ({LABELS[export_format]})", export(df, export_format, 'utf-8-sig'),
+                       file_name("text_genres", export_format), mime_type(export_format))
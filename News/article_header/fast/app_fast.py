@@ -1,76 +1,184 @@
 import streamlit as st
-import pandas as pd
-from newspaper import Article, Config
-from concurrent.futures import ThreadPoolExecutor # This is the "Speed" engine
-import nltk
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed # This is the "Speed" engine
+import os
+import sys
+from pathlib import Path
+from xml.etree.ElementTree import ParseError
+
+import httpx
+
+# Make the shared anewz package importable under `streamlit run`
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+from anewz.articles import build_config, fast_scrape, parse_article
+from anewz.columnar import LABELS, export, file_name, mime_type
+from anewz.concurrency import AdaptiveConcurrency
+from anewz.discovery import discover, sitemaps_from_robots
+from anewz.fetch import USER_AGENT
+from anewz.http_cache import HttpCache, normalize_url
+from anewz.jobs import progress_panel, start_job
+from anewz.metrics import METRICS
+from anewz.pipeline import article_kind, scrape_articles, scrape_headers
+from anewz.resources import missing_nltk_data
+from anewz.state import StateStore
 
 st.set_page_config(page_title="High-Speed Scraper", page_icon="⚡", layout="wide")
 
-# Standard setup
+# Standard setup: NLTK data comes from the vendored nltk_data/ directory, checked offline
+missing = missing_nltk_data()
+if missing:
+    st.warning(f"NLTK data missing ({', '.join(missing)}): summaries will fail. "
+               "Run `python -m anewz nltk-data` once to vendor it.")
+
+# Pages and parsed rows survive reruns; unchanged articles cost a 304
 @st.cache_resource
-def load_nltk():
-    nltk.download('punkt_tab', quiet=True)
-load_nltk()
-
-# --- THE FAST EXTRACTION FUNCTION ---
-def fast_scrape(full_url, config):
-    try:
-        article = Article(full_url, config=config)
-        article.download()
-        article.parse()
-        article.nlp()
-        
-        # Genre detection logic
-        path_parts = [p for p in full_url.split('/') if p]
-        genre = path_parts[2].capitalize() if len(path_parts) > 2 else "News"
-        
-        return {
-            "Genre": genre,
-            "Title": article.title,
-            "Date": article.publish_date,
-            "Summary": article.summary[:150] + "...",
-            "URL": full_url
-        }
-    except:
-        return None
+def get_http_cache():
+    return HttpCache()
+
+# Rows of articles processed by earlier runs, for delta runs
+@st.cache_resource
+def get_state_store():
+    return StateStore()
 
 # --- UI ---
 st.title("⚡ High-Speed Bulk Scraper")
 base_url = st.text_input("Base Domain:", value="https://anewz.tv").strip().rstrip('/')
-paths_text = st.text_area("Paste 1,000+ Paths here:", height=200)
+# Whole archives come from the sitemaps and feeds rather than a paste box
+source = st.radio("URLs from:", ["Pasted paths", "Sitemaps / RSS feeds"], horizontal=True)
+if source == "Pasted paths":
+    paths_text = st.text_area("Paste 1,000+ Paths here:", height=200)
+else:
+    feeds_text = st.text_area("Sitemap, sitemap index or feed URLs (blank: the site's robots.txt):", height=80)
+    sections_text = st.text_input("Sections (comma-separated path prefixes, blank: all):")
+    window = st.date_input("Modified between (optional):", value=())
+    # Daily runs: only what changed since the previous discovery
+    only_changed = st.checkbox("Only URLs modified since the last discovery", value=True)
+
+# Speed Setting: connections in flight adapt per host to latency and 429s
+engine = st.radio("Download engine:", ["Async (pooled keep-alive)", "Threads"], horizontal=True)
+num_procs, dedupe, headers_only = None, False, False
+if engine != "Threads":
+    cores = max(os.cpu_count() or 1, 2)
+    num_procs = st.slider("Parser processes (CPU cores)", 1, cores, cores)
+    # Syndicated copies of one story are parsed once and share its row
+    dedupe = st.checkbox("Parse near-duplicate articles only once", value=True)
+    # Header audits: title and date from OpenGraph/JSON-LD, no body, no nlp()
+    headers_only = st.checkbox("Headers only: read title and date from the page head")
+export_format = st.selectbox("Download format", list(LABELS), format_func=LABELS.get)
+delta = st.checkbox("Delta run: only process new or changed articles")
+# Where the time went: DNS/connect, download, parse(), nlp(), rendering
+show_perf = st.checkbox("Show performance panel")
+
+def extract(job, urls, engine, limits, state, cache, num_procs=None, dedupe=False, headers_only=False,
+            discovery=None):
+    """Runs on the job's thread: no st.* calls, progress goes through the job.
 
-# Speed Setting
-num_threads = st.slider("How many simultaneous connections? (Speed)", 5, 50, 20)
+    The discovery's cursors move past the articles extracted, even when cancelled.
+    """
+    extracted = []
+
+    def step(url, res):
+        if res:
+            job.add(res)
+            extracted.append(url)
+        speed = limits.summary()
+        job.step(failed=not res, note=f"{speed['limit']} connections allowed · {speed['error_rate']:.0%} errors")
+
+    if engine == "Threads":
+        config = build_config(timeout=10)
+        # Without conditional requests a thread cannot tell a changed
+        # article, so delta runs skip every article processed before
+        kind = article_kind(parse_article)
+        todo = urls
+        if state is not None:
+            todo = []
+            for url in urls:
+                stored = state.rows(kind, normalize_url(url))
+                if stored:
+                    step(url, stored[0])
+                else:
+                    todo.append(url)
+
+        # Each thread downloads on its own; failures count against the limit
+        def limited_scrape(url):
+            with limits.for_url(url).request() as outcome:
+                res = fast_scrape(url, config)
+                outcome.failed = res is None
+            if res and state is not None:
+                state.record(kind, normalize_url(url), [res])
+            return res
+
+        with ThreadPoolExecutor(max_workers=limits.maximum) as executor:
+            futures = {executor.submit(limited_scrape, url): url for url in todo}
+            for future in as_completed(futures):
+                if job.cancelled:
+                    executor.shutdown(cancel_futures=True)
+                    break
+                step(futures[future], future.result())
+        if discovery is not None:
+            discovery.commit(extracted)
+        return
+
+    if headers_only:
+        # Each download stops at </head>; pages without metadata are parsed in full
+        pipeline = scrape_headers(urls, processes=num_procs, timeout=10, cache=cache, limits=limits)
+    else:
+        # Pooled async downloads feed parse()/nlp() running on every core
+        pipeline = scrape_articles(urls, processes=num_procs, timeout=10,
+                                   cache=cache, limits=limits, dedupe=dedupe, state=state)
+    for url, res, error in pipeline:
+        if job.cancelled:
+            # Closing the pipeline stops its downloads and parsers
+            pipeline.close()
+            break
+        step(url, res)
+    if discovery is not None:
+        discovery.commit(extracted)
 
 if st.button("🚀 Start High-Speed Extraction"):
-    paths = [p.strip() for p in paths_text.split('\n') if p.strip()]
-    if paths:
-        config = Config()
-        config.browser_user_agent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/119.0.0.0'
-        config.request_timeout = 10
-        
+    if source == "Pasted paths":
+        paths = [p.strip() for p in paths_text.split('\n') if p.strip()]
         urls = [f"{base_url}{'/' if not p.startswith('/') else ''}{p}" for p in paths]
-        
-        results = []
-        progress_bar = st.progress(0)
-        status = st.empty()
-
-        # START MULTITHREADING
-        with ThreadPoolExecutor(max_workers=num_threads) as executor:
-            # Map the function to all URLs across many threads
-            futures = [executor.submit(fast_scrape, url, config) for url in urls]
-            
-            for i, future in enumerate(futures):
-                res = future.result()
-                if res:
-                    results.append(res)
-                # Update UI every few articles
-                progress_bar.progress((i + 1) / len(urls))
-                status.text(f"Processed {i+1} of {len(urls)}...")
-
-        if results:
-            df = pd.DataFrame(results)
-            st.success(f"Finished! Extracted {len(results)} articles.")
+        discovery = None
+    else:
+        sections = [s.strip() for s in sections_text.split(',') if s.strip()]
+        # A single picked day is a window of its own
+        since, until = (tuple(window) + (None, None))[:2]
+        urls = []
+        discovery = None
+        with st.spinner("Reading sitemaps and feeds..."), \
+                httpx.Client(timeout=30, headers={"User-Agent": USER_AGENT}, follow_redirects=True) as client:
+            feeds = [f.strip() for f in feeds_text.split('\n') if f.strip()] or sitemaps_from_robots(base_url, client)
+            try:
+                discovery = discover(feeds, sections, since, until or since,
+                                     get_state_store() if only_changed else None, client=client)
+                urls = [entry.url for entry in discovery]
+            except (httpx.HTTPError, ParseError) as e:
+                st.error(f"Could not read the sitemaps: {e}")
+        st.info(f"Discovered {len(urls):,} article URLs in {len(feeds)} sitemap(s)/feed(s).")
+    if urls:
+        # Stage timings are process-wide; start each run from zero
+        METRICS.reset()
+        # The extraction runs in the background and survives reruns; the panel below polls it
+        start_job("extract_job", extract, urls, engine, AdaptiveConcurrency(initial=8, maximum=64),
+                  get_state_store() if delta else None, get_http_cache(), num_procs=num_procs,
+                  dedupe=dedupe, headers_only=headers_only, discovery=discovery, total=len(urls))
+
+job = st.session_state.get("extract_job")
+if job is not None:
+    progress_panel(job, "extract_job", "articles", export_format, "bulk_data_partial")
+
+    if not job.running:
+        df = job.frame()
+        if show_perf:
+            snap = job.snapshot()
+            with st.expander("⏱ Performance", expanded=True):
+                st.caption(f"{snap.done} articles in {snap.elapsed:.1f}s ({snap.rate:.1f}/s). "
+                           "Stage times add up across threads and processes.")
+                st.dataframe(METRICS.stage_table(), use_container_width=True)
+
+        if not df.empty:
+            st.success(f"Finished! Extracted {len(df)} articles.")
             st.dataframe(df)
-            st.download_button("📥 Download Excel/CSV", df.to_csv(index=False), "bulk_data.csv")
+            st.download_button(f"📥 Download {LABELS[export_format]}", export(df, export_format),
+                               file_name("bulk_data", export_format), mime_type(export_format))
@@ -1,75 +1,94 @@
 import streamlit as st
 import pandas as pd
-import requests
-from concurrent.futures import ThreadPoolExecutor
+import sys
+from pathlib import Path
+
+# Make the shared anewz package importable under `streamlit run`
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+from anewz.columnar import LABELS, export, file_name, mime_type
+from anewz.concurrency import AdaptiveConcurrency
+from anewz.jobs import progress_panel, start_job
+from anewz.metrics import METRICS
+from anewz.state import StateStore
+from anewz.tiktok import TikTokClient, fetch_tiktok
+from anewz.video_cache import VideoCache
 
 st.set_page_config(page_title="TikTok Genre Extractor", page_icon="📂", layout="wide")
 
-# 1. THE GENRE BRAIN (Keyword Mapping)
-# You can add or change these words to match your needs!
-GENRE_MAP = {
-    "Politics": ["election", "president", "minister", "parliament", "government", "protest"],
-    "Economy": ["gas", "oil", "price", "market", "finance", "business", "dollar", "crypto"],
-    "Region": ["caucasus", "karabakh", "baku", "tbilisi", "yerevan", "central asia"],
-    "Sports": ["football", "goal", "match", "olympics", "fifa", "score", "win"],
-    "Entertainment": ["music", "dance", "funny", "challenge", "movie", "star", "celebrity"]
-}
+# 1. THE GENRE BRAIN (Keyword Mapping) and 2. DATA EXTRACTION FUNCTION
+# live in anewz.genre.TIKTOK_GENRE_MAP and anewz.tiktok.fetch_tiktok
 
-def detect_genre(title):
-    title_lower = title.lower()
-    for genre, keywords in GENRE_MAP.items():
-        if any(word in title_lower for word in keywords):
-            return genre
-    return "General" # Default if no keywords match
+@st.cache_resource
+def get_video_cache():
+    # One cache per server process: reruns and new pastes reuse earlier lookups
+    return VideoCache()
 
-# 2. DATA EXTRACTION FUNCTION
-def get_tiktok_data(url):
-    try:
-        # Secret API for fast TikTok titles
-        api_url = f"https://www.tiktok.com/oembed?url={url}"
-        response = requests.get(api_url, timeout=5)
-        
-        if response.status_code == 200:
-            data = response.json()
-            title = data.get('title', 'N/A')
-            
-            # Clean title (TikTok often adds "TikTok - ..." to titles)
-            clean_title = title.split(" TikTok")[0]
-            
-            return {
-                "Genre": detect_genre(clean_title), # Run the brain
-                "Title": clean_title,
-                "Author": data.get('author_name', 'N/A'),
-                "URL": url
-            }
-    except:
-        pass
-    return None
+@st.cache_resource
+def get_state_store():
+    return StateStore()
 
 # 3. STREAMLIT UI
 st.title("📂 Video Title & Genre Extractor")
 urls_text = st.text_area("Paste TikTok URLs (one per line):", height=250)
+export_format = st.selectbox("Download format", list(LABELS), format_func=LABELS.get)
+# Videos processed on an earlier day are taken from the state store
+delta = st.checkbox("Delta run: only look up videos not processed before")
+show_perf = st.checkbox("Show performance panel")
+
+def lookup_videos(job, urls, client, cache, limits, state):
+    """Runs on the job's thread: no st.* calls, progress goes through the job."""
+    failures = []
+    hits_before = cache.hits
+    for url, res, error in fetch_tiktok(urls, workers=limits.maximum, client=client, state=state):
+        if job.cancelled:
+            break
+        if res: job.add(res)
+        else: failures.append({"URL": url, "Reason": error})
+        speed = limits.summary()
+        job.step(failed=res is None, note=f"{speed['limit']} requests allowed · {speed['error_rate']:.0%} errors")
+    return {"failures": failures, "cache_hits": cache.hits - hits_before}
 
 if st.button("🚀 Process Videos"):
     urls = [u.strip() for u in urls_text.split('\n') if u.strip()]
     if urls:
-        results = []
-        progress = st.progress(0)
-        
-        # Parallel processing for speed
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            futures = [executor.submit(get_tiktok_data, url) for url in urls]
-            for i, f in enumerate(futures):
-                res = f.result()
-                if res: results.append(res)
-                progress.progress((i + 1) / len(urls))
+        # Parallel processing for speed; requests in flight adapt to TikTok's latency and 429s,
+        # under a shared rate limit, and repeated videos are only fetched once
+        limits = AdaptiveConcurrency(initial=4, maximum=32)
+        # Stage timings are process-wide; start each run from zero
+        METRICS.reset()
+        cache = get_video_cache()
+        client = TikTokClient(limits=limits, pool_size=limits.maximum, cache=cache)
+        # The lookups run in the background and survive reruns; the panel below polls them
+        start_job("tiktok_job", lookup_videos, urls, client, cache, limits,
+                  get_state_store() if delta else None, total=len(urls))
+
+job = st.session_state.get("tiktok_job")
+if job is not None:
+    progress_panel(job, "tiktok_job", "URLs", export_format, "categorized_videos_partial")
+
+    if not job.running:
+        df = job.frame()
+        outcome = job.result or {"failures": [], "cache_hits": 0}
+        failures = outcome["failures"]
+        if show_perf:
+            snap = job.snapshot()
+            with st.expander("⏱ Performance", expanded=True):
+                st.caption(f"{snap.done} URLs in {snap.elapsed:.1f}s ({snap.rate:.1f}/s). "
+                           "Stage times add up across threads.")
+                st.dataframe(METRICS.stage_table(), use_container_width=True)
+
+        if failures:
+            with st.expander(f"⚠️ {len(failures)} URLs could not be processed"):
+                st.dataframe(pd.DataFrame(failures), use_container_width=True)
 
-        if results:
-            df = pd.DataFrame(results)
-            st.success(f"Success! Categorized {len(results)} videos.")
+        if not df.empty:
+            st.success(f"Success! Categorized {len(df)} videos "
+                       f"({outcome['cache_hits']} lookups answered from cache).")
             
             # Show the data
             st.dataframe(df, use_container_width=True)
             
             # Download
-            st.download_button("📥 Download CSV", df.to_csv(index=False), "categorized_videos.csv")
+            st.download_button(f"📥 Download {LABELS[export_format]}", export(df, export_format),
+                               file_name("categorized_videos", export_format), mime_type(export_format))
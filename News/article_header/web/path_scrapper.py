@@ -1,40 +1,21 @@
 import streamlit as st
 import pandas as pd
-import re
+import sys
+from pathlib import Path
 
-# Set page layout
-st.set_page_config(page_title="Path Intelligence Dashboard", page_icon="🔗", layout="wide")
+# Make the shared anewz package importable under `streamlit run`
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
 
-# 1. THE GENRE BRAIN
-GENRE_MAP = {
-    "World": ["un", "nato", "global", "international", "world", "foreign", "diplomacy"],
-    "Politics": ["election", "president", "minister", "parliament", "government", "protest"],
-    "Economy": ["oil", "gas", "price", "business", "market", "finance", "bank", "dollar"],
-    "Sports": ["football", "goal", "match", "league", "win", "player", "tournament"],
-    "Technology": ["ai", "tech", "software", "google", "meta", "cyber", "robot"],
-    "Region": ["baku", "caucasus", "tbilisi", "karabakh", "central asia"]
-}
+from anewz.categorize import PATH_COLUMNS, clean_path, find_column, label_paths
+from anewz.columnar import LABELS, UPLOAD_TYPES, export, file_name, mime_type
+from anewz.csv_stream import read_header, stream_csv
+from anewz.genre import NEWS_GENRE_MAP, GenreClassifier
 
-def clean_path(path_text):
-    """Removes slashes, hyphens, and extensions to make paths readable."""
-    if not path_text or pd.isna(path_text):
-        return ""
-    # Replace common URL separators with spaces
-    clean = re.sub(r'[/_\-.]', ' ', str(path_text))
-    return clean
+# Set page layout
+st.set_page_config(page_title="Path Intelligence Dashboard", page_icon="🔗", layout="wide")
 
-def detect_genre(text):
-    """Categorizes text based on keywords."""
-    if not text:
-        return "Not_specified"
-    
-    # We clean the path before checking keywords
-    readable_text = clean_path(text).lower()
-    
-    for genre, keywords in GENRE_MAP.items():
-        if any(word in readable_text for word in keywords):
-            return genre
-    return "General"
+# 1. THE GENRE BRAIN (keywords live in anewz.genre)
+genre_classifier = GenreClassifier(NEWS_GENRE_MAP)
 
 # 2. USER INTERFACE
 st.title("🔗 URL Path & Genre Categorizer")
@@ -42,8 +23,7 @@ st.info("Paste your URL Paths or upload a CSV to automatically detect Genres bas
 
 # Choose input method
 input_method = st.radio("Choose Input Method:", ["Paste Paths", "Upload CSV"])
-
-results_data = []
+export_format = st.selectbox("Download format", list(LABELS), format_func=LABELS.get)
 
 # --- METHOD A: PASTE PATHS ---
 if input_method == "Paste Paths":
@@ -52,43 +32,41 @@ if input_method == "Paste Paths":
     if st.button("🚀 Process Paths"):
         lines = [line.strip() for line in paths_input.split('\n') if line.strip()]
         if lines:
-            for line in lines:
-                results_data.append({
-                    "Original_Path": line,
-                    "Cleaned_Words": clean_path(line), # Shows you what the AI 'read'
-                    "Genre": detect_genre(line)
-                })
-            
-            df_final = pd.DataFrame(results_data)
+            # All pasted paths are labelled in one batch, like uploaded files;
+            # Cleaned_Words shows you what the AI 'read'
+            df_final = pd.DataFrame({"Original_Path": lines, "Cleaned_Words": [clean_path(line) for line in lines]})
+            df_final = label_paths(df_final, "Original_Path", genre_classifier)
             st.subheader("Results Summary")
             st.table(df_final['Genre'].value_counts())
             st.dataframe(df_final, use_container_width=True)
             
-            csv_data = df_final.to_csv(index=False).encode('utf-8')
-            st.download_button("📥 Download CSV", csv_data, "path_genres.csv", "text/csv")
+            st.download_button(f"📥 Download {LABELS[export_format]}", export(df_final, export_format),
+                               file_name("path_genres", export_format), mime_type(export_format))
 
 # --- METHOD B: UPLOAD CSV ---
 else:
-    uploaded_file = st.file_uploader("Upload your CSV file:", type="csv")
+    uploaded_file = st.file_uploader("Upload your CSV, Parquet or Arrow file:", type=UPLOAD_TYPES)
     
     if uploaded_file:
-        df_input = pd.read_csv(uploaded_file)
+        columns = read_header(uploaded_file)
         
         # Look for 'path', 'url', 'slug', or 'permalink'
-        possible_cols = ['path', 'url', 'slug', 'permalink', 'link', 'video title']
-        col_name = next((c for c in df_input.columns if c.lower() in possible_cols), None)
+        col_name = find_column(columns, PATH_COLUMNS)
         
         if col_name:
             st.success(f"Detected Path column: **{col_name}**")
             
             if st.button("🚀 Process File"):
-                df_input['Genre'] = df_input[col_name].apply(detect_genre)
+                output = stream_csv(uploaded_file, lambda chunk: label_paths(chunk, col_name, genre_classifier),
+                                    count_column='Genre', output_format=export_format)
                 
                 st.subheader("Genre Distribution")
-                st.table(df_input['Genre'].value_counts())
-                st.dataframe(df_input, use_container_width=True)
+                st.table(output.counts)
+                st.caption(f"Processed {output.rows:,} rows; showing the first {len(output.sample):,}.")
+                st.dataframe(output.sample, use_container_width=True)
                 
-                processed_csv = df_input.to_csv(index=False).encode('utf-8')
-                st.download_button("📥 Download Processed CSV", processed_csv, "processed_paths.csv", "text/csv")
+                with open(output.path, "rb") as f:
+                    st.download_button(f"📥 Download Processed {LABELS[export_format]}", f,
+                                       file_name("processed_paths", export_format), mime_type(export_format))
         else:
             st.error("Could not find a Path, URL, or Slug column. Please check your CSV headers.")
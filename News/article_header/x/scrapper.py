@@ -1,34 +1,21 @@
 import streamlit as st
 import pandas as pd
-import re
+import sys
+from pathlib import Path
 
-st.set_page_config(page_title="Text Intelligence Dashboard", page_icon="📝", layout="wide")
+# Make the shared anewz package importable under `streamlit run`
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
 
-# 1. UPDATED GENRE BRAIN (Expanded Categories)
-GENRE_MAP = {
-    "World": ["un", "nato", "global", "international", "world", "foreign", "diplomacy"],
-    "Politics": ["election", "president", "minister", "parliament", "government", "protest"],
-    "Economy": ["oil", "gas", "price", "business", "market", "finance", "bank", "dollar"],
-    "Sports": ["football", "goal", "match", "league", "win", "player", "tournament"],
-    "Technology": ["ai", "tech", "software", "google", "meta", "cyber", "robot"],
-    "Region": ["baku", "caucasus", "tbilisi", "karabakh", "central asia"]
-}
+from anewz.categorize import HashtagIndex, find_column, label_posts
+from anewz.columnar import LABELS, UPLOAD_TYPES, export, file_name, mime_type
+from anewz.csv_stream import read_header, stream_csv
+from anewz.genre import NEWS_GENRE_MAP, GenreScorer
 
-def detect_genre(text):
-    if not text or pd.isna(text):
-        return "Not_specified"
-    
-    text_lower = str(text).lower()
-    for genre, keywords in GENRE_MAP.items():
-        if any(word in text_lower for word in keywords):
-            return genre
-    return "General"
+st.set_page_config(page_title="Text Intelligence Dashboard", page_icon="📝", layout="wide")
 
-def extract_hashtags(text):
-    if not text or pd.isna(text):
-        return "Not_specified"
-    tags = re.findall(r"#(\w+)", str(text))
-    return ", ".join(tags) if tags else "Not_specified"
+# 1. UPDATED GENRE BRAIN (Expanded Categories, kept in anewz.genre)
+# Every genre is scored and the top ones kept, not just the first match
+genre_classifier = GenreScorer(NEWS_GENRE_MAP)
 
 # 2. UI INTERFACE
 st.title("📝 Post Text Categorizer")
@@ -36,46 +23,57 @@ st.info("Paste the text content of your posts below. The app will detect the Gen
 
 # Option to paste text or upload a CSV
 input_method = st.radio("Choose Input Method:", ["Paste Text", "Upload CSV"])
+export_format = st.selectbox("Download format", list(LABELS), format_func=LABELS.get)
 
-results = []
+results = None
 
 if input_method == "Paste Text":
     texts_input = st.text_area("Paste Post Texts (one per line):", height=300)
     if st.button("🚀 Process Text"):
         lines = [line.strip() for line in texts_input.split('\n') if line.strip()]
-        for line in lines:
-            results.append({
-                "Genre": detect_genre(line),
-                "Hashtags": extract_hashtags(line),
-                "Post_Text": line
-            })
+        # All pasted lines are scored in one batch
+        results = label_posts(pd.DataFrame({"Post_Text": lines}), "Post_Text", genre_classifier)
 
 else:
-    uploaded_file = st.file_uploader("Upload CSV (Make sure it has a column named 'Description' or 'Text')", type="csv")
+    uploaded_file = st.file_uploader("Upload CSV, Parquet or Arrow (Make sure it has a column named 'Description' or 'Text')",
+                                     type=UPLOAD_TYPES)
     if uploaded_file:
-        df_input = pd.read_csv(uploaded_file)
+        columns = read_header(uploaded_file)
         # Find the text column automatically
-        col_name = next((c for c in df_input.columns if c.lower() in ['description', 'text', 'post_text']), None)
+        col_name = find_column(columns, ['description', 'text', 'post_text'])
         
         if col_name:
             if st.button("🚀 Process File"):
-                df_input['Genre'] = df_input[col_name].apply(detect_genre)
-                df_input['Hashtags'] = df_input[col_name].apply(extract_hashtags)
-                st.dataframe(df_input)
-                st.download_button("📥 Download Results", df_input.to_csv(index=False), "processed_data.csv")
+                # Label the file chunk by chunk straight to disk, counting hashtags as we go
+                trending = HashtagIndex()
+                output = stream_csv(uploaded_file, lambda chunk: label_posts(chunk, col_name, genre_classifier, trending),
+                                    output_format=export_format)
+                st.subheader("Trending Hashtags by Genre")
+                st.dataframe(trending.table(), hide_index=True)
+                st.caption(f"Processed {output.rows:,} rows; showing the first {len(output.sample):,}.")
+                st.dataframe(output.sample)
+                with open(output.path, "rb") as f:
+                    st.download_button("📥 Download Results", f, file_name("processed_data", export_format),
+                                       mime_type(export_format))
         else:
             st.error("Could not find a text column. Please rename your column to 'Description'.")
 
 # 3. DISPLAY RESULTS (For Paste Method)
-if results:
-    df = pd.DataFrame(results)
+if results is not None and not results.empty:
+    df = results
     
     # Visual Summaries
     c1, c2 = st.columns(2)
     with c1:
         st.subheader("Genre Distribution")
         st.table(df['Genre'].value_counts())
+    with c2:
+        st.subheader("Trending Hashtags")
+        trending = HashtagIndex()
+        trending.update(df['Hashtags'], df['Genre'])
+        st.dataframe(trending.table(), hide_index=True)
     
     st.subheader("Processed Intelligence")
     st.dataframe(df, use_container_width=True)
-    st.download_button("📥 Download Results (CSV)", df.to_csv(index=False), "text_genres.csv")
+    st.download_button(f"📥 Download Results ({LABELS[export_format]})", export(df, export_format),
+                       file_name("text_genres", export_format), mime_type(export_format))
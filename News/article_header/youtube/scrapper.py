@@ -1,37 +1,22 @@
 import streamlit as st
 import pandas as pd
-import re
+import sys
+from pathlib import Path
+
+# Make the shared anewz package importable under `streamlit run`
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+from anewz.categorize import TITLE_COLUMNS, HashtagIndex, find_column, label_posts
+from anewz.columnar import LABELS, UPLOAD_TYPES, export, file_name, mime_type
+from anewz.csv_stream import read_header, stream_csv
+from anewz.genre import NEWS_GENRE_MAP, GenreScorer
 
 # Set page layout
 st.set_page_config(page_title="Video Content Intelligence", page_icon="🎬", layout="wide")
 
 # 1. THE GENRE BRAIN
-# Define categories and keywords
-GENRE_MAP = {
-    "World": ["un", "nato", "global", "international", "world", "foreign", "diplomacy"],
-    "Politics": ["election", "president", "minister", "parliament", "government", "protest"],
-    "Economy": ["oil", "gas", "price", "business", "market", "finance", "bank", "dollar"],
-    "Sports": ["football", "goal", "match", "league", "win", "player", "tournament"],
-    "Technology": ["ai", "tech", "software", "google", "meta", "cyber", "robot"],
-    "Region": ["baku", "caucasus", "tbilisi", "karabakh", "central asia"]
-}
-
-def detect_genre(text):
-    """Categorizes text based on keywords."""
-    if not text or pd.isna(text):
-        return "Not_specified"
-    text_lower = str(text).lower()
-    for genre, keywords in GENRE_MAP.items():
-        if any(word in text_lower for word in keywords):
-            return genre
-    return "General"
-
-def extract_hashtags(text):
-    """Pulls all #hashtags from a string."""
-    if not text or pd.isna(text):
-        return "Not_specified"
-    tags = re.findall(r"#(\w+)", str(text))
-    return ", ".join(tags) if tags else "Not_specified"
+# Categories and keywords are defined in anewz.genre; every genre is scored
+genre_classifier = GenreScorer(NEWS_GENRE_MAP)
 
 # 2. USER INTERFACE
 st.title("🎬 Video Title & Genre Categorizer")
@@ -39,9 +24,7 @@ st.info("Paste your Video Titles or upload a CSV to automatically detect Genres
 
 # Choose input method
 input_method = st.radio("Choose Input Method:", ["Paste Titles", "Upload CSV"])
-
-# Initialize results list
-results_data = []
+export_format = st.selectbox("Download format", list(LABELS), format_func=LABELS.get)
 
 # --- METHOD A: PASTE TITLES ---
 if input_method == "Paste Titles":
@@ -50,56 +33,57 @@ if input_method == "Paste Titles":
     if st.button("🚀 Process Titles"):
         lines = [line.strip() for line in titles_input.split('\n') if line.strip()]
         if lines:
-            for line in lines:
-                results_data.append({
-                    "Video_Title": line,
-                    "Genre": detect_genre(line),
-                    "Hashtags": extract_hashtags(line)
-                })
-            
-            # Create DataFrame
-            df_final = pd.DataFrame(results_data)
+            # Label all titles in one batch
+            df_final = label_posts(pd.DataFrame({"Video_Title": lines}), "Video_Title", genre_classifier)
             
             # Display stats
             st.subheader("Results Summary")
             st.table(df_final['Genre'].value_counts())
+            trending = HashtagIndex()
+            trending.update(df_final['Hashtags'], df_final['Genre'])
+            st.dataframe(trending.table(), hide_index=True)
             
             # Show Data
             st.dataframe(df_final, use_container_width=True)
             
             # Download Button
-            csv_data = df_final.to_csv(index=False).encode('utf-8')
-            st.download_button("📥 Download CSV", csv_data, "video_titles.csv", "text/csv")
+            st.download_button(f"📥 Download {LABELS[export_format]}", export(df_final, export_format),
+                               file_name("video_titles", export_format), mime_type(export_format))
         else:
             st.warning("Please enter some titles first.")
 
 # --- METHOD B: UPLOAD CSV ---
 else:
-    uploaded_file = st.file_uploader("Upload your CSV file:", type="csv")
+    uploaded_file = st.file_uploader("Upload your CSV, Parquet or Arrow file:", type=UPLOAD_TYPES)
     
     if uploaded_file:
-        df_input = pd.read_csv(uploaded_file)
+        columns = read_header(uploaded_file)
         
         # Look for the best column to use for titles
-        possible_cols = ['video title', 'title', 'headline', 'description', 'text']
-        col_name = next((c for c in df_input.columns if c.lower() in possible_cols), None)
+        col_name = find_column(columns, TITLE_COLUMNS)
         
         if col_name:
             st.success(f"Found column: **{col_name}**")
             
             if st.button("🚀 Process File"):
-                # Apply the logic to the detected column
-                df_input['Genre'] = df_input[col_name].apply(detect_genre)
-                df_input['Hashtags'] = df_input[col_name].apply(extract_hashtags)
+                # Apply the logic chunk by chunk, writing results to disk and counting hashtags
+                trending = HashtagIndex()
+                output = stream_csv(uploaded_file, lambda chunk: label_posts(chunk, col_name, genre_classifier, trending),
+                                    count_column='Genre', output_format=export_format)
                 
                 # Show results
                 st.subheader("Genre Distribution")
-                st.table(df_input['Genre'].value_counts())
+                st.table(output.counts)
+                
+                st.subheader("Trending Hashtags by Genre")
+                st.dataframe(trending.table(), hide_index=True)
                 
-                st.dataframe(df_input, use_container_width=True)
+                st.caption(f"Processed {output.rows:,} rows; showing the first {len(output.sample):,}.")
+                st.dataframe(output.sample, use_container_width=True)
                 
                 # Download Button
-                processed_csv = df_input.to_csv(index=False).encode('utf-8')
-                st.download_button("📥 Download Processed CSV", processed_csv, "processed_videos.csv", "text/csv")
+                with open(output.path, "rb") as f:
+                    st.download_button(f"📥 Download Processed {LABELS[export_format]}", f,
+                                       file_name("processed_videos", export_format), mime_type(export_format))
         else:
             st.error("Could not find a Title or Description column. Please check your CSV headers.")
@@ -0,0 +1 @@
+"""Shared logic behind the AnewZ Streamlit apps and batch jobs."""
@@ -0,0 +1,3 @@
+from anewz.cli import main
+
+main()
@@ -0,0 +1,142 @@
+"""Article parsing and genre helpers for the bulk news scrapers.
+
+newspaper (and NLTK under it) is imported on first use rather than with this
+module, so the apps paint before paying for it; NLTK is pointed at the
+vendored data directory first (see anewz.resources).
+"""
+from urllib.parse import urlsplit
+
+from anewz.fetch import USER_AGENT
+from anewz.metrics import timed
+from anewz.resources import use_local_nltk_data
+
+
+def _newspaper():
+    use_local_nltk_data()
+    import newspaper
+
+    return newspaper
+
+
+def build_config(timeout=10):
+    config = _newspaper().Config()
+    config.browser_user_agent = USER_AGENT
+    config.request_timeout = timeout
+    return config
+
+
+def path_genre(full_url):
+    """Genre from the first path segment: https://host/<genre>/..."""
+    path_parts = [p for p in full_url.split('/') if p]
+    return path_parts[2].capitalize() if len(path_parts) > 2 else "News"
+
+
+def section_genre(full_url):
+    """Genre from the first path segment, e.g. /region/south-caucasus/ -> Region."""
+    path_parts = [part for part in urlsplit(full_url).path.split('/') if part]
+    return path_parts[0].capitalize() if path_parts else "General"
+
+
+def article_row(article, full_url):
+    return {
+        "Genre": path_genre(full_url),
+        "Title": article.title,
+        "Date": article.publish_date,
+        "Summary": article.summary[:150] + "...",
+        "URL": full_url
+    }
+
+
+def rebase_row(row, full_url):
+    """A parsed row reused for another URL with the same article (a syndicated
+    copy): the URL and the genre derived from it are swapped, the rest kept.
+    """
+    if "Full URL" in row:
+        return {**row, "Genre": section_genre(full_url), "Full URL": full_url}
+    return {**row, "Genre": path_genre(full_url), "URL": full_url}
+
+
+def parse_article(full_url, html, config=None):
+    """Parses an already-downloaded page; returns the result row or None."""
+    try:
+        article = _newspaper().Article(full_url, config=config or build_config())
+        article.download(input_html=html)
+        with timed("parse"):
+            article.parse()
+        with timed("nlp"):
+            article.nlp()
+        return article_row(article, full_url)
+    except Exception:
+        return None
+
+
+def parse_article_details(full_url, html, config=None):
+    """Parses a downloaded page into the detailed row of the path extractor.
+
+    Unlike parse_article this raises on failure so the caller can report it.
+    """
+    article = _newspaper().Article(full_url, config=config or build_config())
+    article.download(input_html=html)
+    with timed("parse"):
+        article.parse()
+    with timed("nlp"):
+        article.nlp()
+    return {
+        "Genre": section_genre(full_url),
+        "Title": article.title,
+        "Author": ", ".join(article.authors) if article.authors else "N/A",
+        "Date": article.publish_date,
+        "Keywords": ", ".join(article.keywords[:5]),
+        "Summary": article.summary[:150] + "...",
+        "Full URL": full_url
+    }
+
+
+def _summary(text):
+    return text[:150] + "..." if text else ""
+
+
+def _capitalized(text):
+    # Unlike str.capitalize(), keeps "South Caucasus" as it is
+    return text[:1].upper() + text[1:] if text else text
+
+
+def head_row(metadata, full_url):
+    """parse_article's row from page-head metadata (see anewz.page_head)."""
+    return {
+        "Genre": path_genre(full_url),
+        "Title": metadata["title"],
+        "Date": metadata["published"],
+        "Summary": _summary(metadata["description"]),
+        "URL": full_url
+    }
+
+
+def head_row_details(metadata, full_url):
+    """parse_article_details' row from page-head metadata; the Genre comes from
+    the page's article:section when it declares one.
+    """
+    return {
+        "Genre": _capitalized(metadata["section"]) or section_genre(full_url),
+        "Title": metadata["title"],
+        "Author": ", ".join(metadata["authors"]) if metadata["authors"] else "N/A",
+        "Date": metadata["published"],
+        "Keywords": ", ".join(metadata["keywords"][:5]),
+        "Summary": _summary(metadata["description"]),
+        "Full URL": full_url
+    }
+
+
+def fast_scrape(full_url, config):
+    """Downloads and parses one article in the calling thread."""
+    try:
+        article = _newspaper().Article(full_url, config=config)
+        with timed("download"):
+            article.download()
+        with timed("parse"):
+            article.parse()
+        with timed("nlp"):
+            article.nlp()
+        return article_row(article, full_url)
+    except Exception:
+        return None
@@ -0,0 +1,129 @@
+"""Morning news briefing for the root app.py bot.
+
+Every country's top headlines are fetched concurrently through one NewsAPI
+client, so adding countries costs one round trip rather than one per
+country. Responses go through a short-lived HeadlineCache shared by all
+sections, so a prebuilt report and a rebuild at send time do not hit the
+API twice. Delivery is any callable taking the report text; WhatsApp is
+one such callable, print_report a stand-in for local runs and tests.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+GLOBAL = (None, "🌍 Global")
+PAGE_SIZE = 5
+CACHE_TTL = 15 * 60  # seconds a fetched headline list stays reusable
+MAX_WORKERS = 16
+
+
+class HeadlineCache:
+    """Headline lists by (country, page size), kept for `ttl` seconds."""
+
+    def __init__(self, ttl=CACHE_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get_or_fetch(self, key, fetch):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[0] < self.ttl:
+                return entry[1]
+        articles = fetch()
+        with self._lock:
+            self._entries[key] = (time.monotonic(), articles)
+        return articles
+
+
+def fetch_headlines(client, country=None, page_size=PAGE_SIZE, cache=None):
+    """Top English headlines for a country code, or worldwide for None."""
+    def fetch():
+        params = {"language": "en", "page_size": page_size}
+        if country:
+            params["country"] = country
+        return client.get_top_headlines(**params).get("articles", [])
+
+    if cache is None:
+        return fetch()
+    return cache.get_or_fetch((country, page_size), fetch)
+
+
+def format_section(name, articles, page_size=PAGE_SIZE):
+    section = f"\n{name} Top {page_size}:\n"
+    if not articles:
+        return section + "(no headlines available)\n"
+    for i, art in enumerate(articles, 1):
+        section += f"{i}. {art['title']}\n"
+    return section
+
+
+def build_briefing(client, countries, title, page_size=PAGE_SIZE, cache=None, include_global=True):
+    """The full report text; `countries` is a list of (code, display name).
+
+    All sections are fetched at once. A country whose fetch fails gets a
+    note in its section instead of holding back the whole briefing.
+    """
+    sections = list(countries) + ([GLOBAL] if include_global else [])
+
+    def section(entry):
+        code, name = entry
+        try:
+            return format_section(name, fetch_headlines(client, code, page_size, cache), page_size)
+        except Exception as exc:
+            return f"\n{name}: headlines unavailable ({exc})\n"
+
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(sections))) as executor:
+        return title + "".join(executor.map(section, sections))
+
+
+def minutes_before(clock, minutes):
+    """Clock time ("HH:MM") a number of minutes earlier, wrapping past midnight."""
+    at = datetime.strptime(clock, "%H:%M") - timedelta(minutes=minutes)
+    return at.strftime("%H:%M")
+
+
+def print_report(report):
+    """Delivery stand-in: prints the report instead of sending it."""
+    print(report)
+
+
+def whatsapp(phone, wait_time=15, tab_close=True):
+    """Delivery through WhatsApp Web; wait_time gives the browser time to load."""
+    def deliver(report):
+        import pywhatkit
+
+        pywhatkit.sendwhatmsg_instantly(phone, report, wait_time=wait_time, tab_close=tab_close)
+
+    return deliver
+
+
+class Briefing:
+    """Prebuilds a report shortly before it is due and delivers it on time.
+
+    prepare() runs a few minutes early and keeps the report; send() uses it
+    if it is still fresh, or builds one on the spot (e.g. when the bot was
+    started after the prebuild slot).
+    """
+
+    def __init__(self, build, deliver, max_age=CACHE_TTL):
+        self.build = build
+        self.deliver = deliver
+        self.max_age = max_age
+        self._prepared = None
+
+    def prepare(self):
+        started = time.perf_counter()
+        self._prepared = (time.monotonic(), self.build())
+        print(f"Report prebuilt in {time.perf_counter() - started:.1f}s.")
+
+    def send(self):
+        prepared, self._prepared = self._prepared, None
+        if prepared and time.monotonic() - prepared[0] < self.max_age:
+            report = prepared[1]
+        else:
+            report = self.build()
+        self.deliver(report)
+        print(f"Briefing sent at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}.")
@@ -0,0 +1,106 @@
+"""Genre and hashtag labelling of uploaded posts, titles and URL paths."""
+import re
+from collections import Counter, defaultdict
+
+import pandas as pd
+
+POST_COLUMNS = ['description', 'text', 'post_text', 'content', 'caption', 'body', 'message']
+TITLE_COLUMNS = ['video title', 'title', 'headline', 'description', 'text']
+PATH_COLUMNS = ['path', 'url', 'slug', 'permalink', 'link', 'video title']
+
+HASHTAG_PATTERN = re.compile(r"#(\w+)")
+TRENDING_TOP = 10
+
+def find_column(columns, candidates):
+    """First column whose lower-cased name is one of the candidates."""
+    return next((c for c in columns if c.lower() in candidates), None)
+
+def extract_hashtags(text):
+    """Pulls all #hashtags from a string, as a list."""
+    if not text or pd.isna(text):
+        return []
+    return HASHTAG_PATTERN.findall(str(text))
+
+def hashtag_lists(texts):
+    """extract_hashtags for a whole Series: one str.findall pass over the
+    rows that contain a "#" at all, empty lists for the rest.
+    """
+    if not isinstance(texts, pd.Series):
+        texts = pd.Series(texts, dtype=object)
+    texts = texts.astype("string")
+    tagged = texts.str.contains("#", regex=False, na=False)
+    tags = pd.Series([[]] * len(texts), index=texts.index, dtype=object)
+    tags[tagged] = texts[tagged].str.findall(HASHTAG_PATTERN)
+    return tags
+
+class HashtagIndex:
+    """Running hashtag counts per genre, updated one chunk at a time.
+
+    Tags are counted case-insensitively, once per post that uses them, so
+    the top tags per genre are ready as soon as the last chunk is in.
+    """
+
+    def __init__(self):
+        self.counts = defaultdict(Counter)
+
+    def update(self, tags, genres=None):
+        """Adds a Series of tag lists, optionally with the genre of each post."""
+        posts = pd.DataFrame({"tag": tags.values,
+                              "Genre": genres.values if genres is not None else "All"})
+        posts = posts.explode("tag").dropna(subset=["tag"])
+        posts["tag"] = posts["tag"].str.lower()
+        # A tag repeated within one post counts once
+        posts = posts.reset_index().drop_duplicates(["index", "tag"])
+        per_genre = posts.groupby(["Genre", "tag"], observed=True).size()
+        for (genre, tag), count in per_genre.items():
+            self.counts[genre][tag] += count
+
+    def top(self, n=TRENDING_TOP, genre=None):
+        """[(tag, count), ...] for one genre, or over all genres."""
+        if genre is not None:
+            return self.counts[genre].most_common(n)
+        total = Counter()
+        for counts in self.counts.values():
+            total.update(counts)
+        return total.most_common(n)
+
+    def table(self, n=TRENDING_TOP):
+        """Top n tags of every genre as a Genre / Rank / Hashtag / Posts frame."""
+        rows = [{"Genre": genre, "Rank": rank, "Hashtag": f"#{tag}", "Posts": count}
+                for genre in sorted(self.counts)
+                for rank, (tag, count) in enumerate(self.counts[genre].most_common(n), 1)]
+        return pd.DataFrame(rows, columns=["Genre", "Rank", "Hashtag", "Posts"])
+
+def clean_path(path_text):
+    """Removes slashes, hyphens, and extensions to make paths readable."""
+    if not path_text or pd.isna(path_text):
+        return ""
+    # Replace common URL separators with spaces
+    return re.sub(r'[/_\-.]', ' ', str(path_text))
+
+def add_genres(chunk, texts, classifier):
+    """Adds a Genre column; a GenreScorer also adds Genre_Score and Genres
+    (its top-k genres, best first).
+    """
+    if hasattr(classifier, "top_k"):
+        labels = classifier.top_k(texts)
+        for name in labels:
+            chunk[name] = labels[name]
+    else:
+        chunk['Genre'] = classifier.classify(texts)
+    return chunk
+
+def label_posts(chunk, column, classifier, trending=None):
+    """Adds genre (see add_genres) and Hashtags (a list per row) columns for
+    the texts in `column`, and counts the chunk's tags in a HashtagIndex if given.
+    """
+    add_genres(chunk, chunk[column], classifier)
+    chunk['Hashtags'] = hashtag_lists(chunk[column])
+    if trending is not None:
+        trending.update(chunk['Hashtags'], chunk['Genre'])
+    return chunk
+
+def label_paths(chunk, column, classifier):
+    """Adds genre columns (see add_genres) for the URL paths in `column`."""
+    readable = chunk[column].astype("string").str.replace(r'[/_\-.]', ' ', regex=True)
+    return add_genres(chunk, readable.astype(object), classifier)
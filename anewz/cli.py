@@ -0,0 +1,421 @@
+"""Headless batch runner for the AnewZ pipelines.
+
+Runs the same extraction and classification code as the Streamlit apps, but
+reads its input from files, streams results to disk and reports throughput on
+stderr, so large jobs can run from cron without a browser session:
+
+    python -m anewz articles paths.txt -o articles.csv
+    python -m anewz articles --discover --section /politics --since 2026-01-01 -o articles.csv
+    python -m anewz categorize posts.csv -o posts_labelled.parquet --genres social --trending tags.csv
+    python -m anewz tiktok urls.txt -o videos.csv
+    python -m anewz youtube videos.csv --column url -o comments.csv
+    python -m anewz meta posts.csv --column post_id --platform Facebook -o comments.csv
+
+Daily runs over the same list can add --delta (articles, tiktok, youtube,
+meta) to fetch only what changed since the last run and merge it with the
+results stored then. `articles --discover` takes its URLs from the site's
+sitemaps (listed in robots.txt) or from --sitemap sitemaps and RSS feeds
+instead of a file; with --delta only URLs whose lastmod is newer than the
+last run's are extracted. Header audits can add --headers-only to articles, which
+reads title, author, date and section from each page's head and parses only
+pages without that metadata in full. `categorize` scores every genre per
+row and writes Genre, Genre_Score and the --top-k best as Genres (keyword
+weights tunable with --weights); --first-match keeps the old single label.
+
+Every run times its stages (download, parse, nlp, API calls, sentiment...):
+--metrics FILE writes them in the Prometheus text format at the end (for
+the node_exporter textfile collector), --metrics-port serves them live, and
+-v prints the stage breakdown.
+
+Two maintenance commands keep app start-up fast: `nltk-data` vendors the
+NLTK tokenizers into nltk_data/ (run it when building the image), and
+`imports` reports what each app imports before its first paint, failing if
+a heavy library is loaded eagerly or the total exceeds --budget-ms.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date, datetime
+from functools import partial
+from pathlib import Path
+
+import pandas as pd
+
+from anewz.fetch import DEFAULT_CONCURRENCY
+
+REPORT_EVERY = 5  # seconds between progress lines
+SCORE_CHUNK = 5_000  # comments scored and written together
+
+
+class Throughput:
+    """Prints progress and rate to stderr at most every REPORT_EVERY seconds."""
+
+    def __init__(self, label, total=None):
+        self.label = label
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.started = time.perf_counter()
+        self._last = self.started
+
+    def step(self, count=1, failed=False):
+        self.done += count
+        self.failed += failed
+        now = time.perf_counter()
+        if now - self._last >= REPORT_EVERY:
+            self._last = now
+            self._print(now)
+
+    def _print(self, now, prefix=""):
+        elapsed = max(now - self.started, 1e-9)
+        of_total = f"/{self.total:,}" if self.total else ""
+        print(f"[{self.label}] {prefix}{self.done:,}{of_total} in {elapsed:.1f}s "
+              f"({self.done / elapsed:,.1f}/s, {self.failed:,} failed)", file=sys.stderr, flush=True)
+
+    def finish(self):
+        self._print(time.perf_counter(), prefix="done: ")
+
+
+def read_items(path, column=None):
+    """Non-empty values from a text file (one per line) or a CSV/Excel column.
+
+    Without a column name the first column is used.
+    """
+    path = Path(path)
+    if path.suffix.lower() in (".csv", ".xlsx"):
+        df = pd.read_csv(path) if path.suffix.lower() == ".csv" else pd.read_excel(path)
+        values = df[column or df.columns[0]].dropna().astype(str)
+    else:
+        values = path.read_text(encoding="utf-8").splitlines()
+    return [v.strip() for v in values if v.strip()]
+
+
+def date_or_time(text):
+    """YYYY-MM-DD as a date (a whole day), anything longer as an ISO datetime."""
+    return date.fromisoformat(text) if len(text) == 10 else datetime.fromisoformat(text)
+
+
+def discover_urls(args, base_url, state):
+    import httpx
+
+    from anewz.discovery import discover, sitemaps_from_robots
+    from anewz.fetch import USER_AGENT
+
+    with httpx.Client(timeout=args.timeout, headers={"User-Agent": USER_AGENT}, follow_redirects=True) as client:
+        sources = args.sitemap or sitemaps_from_robots(base_url, client)
+        progress = Throughput("discover")
+        discovery = discover(sources, args.section, args.since, args.until, state, client=client)
+        urls = []
+        for entry in discovery:
+            urls.append(entry.url)
+            progress.step()
+        progress.finish()
+    return urls, discovery
+
+
+def run_articles(args):
+    from anewz.articles import parse_article, parse_article_details
+    from anewz.concurrency import AdaptiveConcurrency
+    from anewz.csv_stream import RowWriter
+    from anewz.http_cache import HttpCache
+    from anewz.pipeline import scrape_articles, scrape_headers
+    from anewz.state import StateStore
+
+    base_url = args.base_url.strip().rstrip('/')
+    state = StateStore() if args.delta else None
+    discovery = None
+    if args.discover or args.sitemap:
+        urls, discovery = discover_urls(args, base_url, state)
+    elif args.input:
+        urls = [p if p.startswith("http") else f"{base_url}{'' if p.startswith('/') else '/'}{p}"
+                for p in read_items(args.input, args.column)]
+    else:
+        sys.exit("articles needs an input file, --discover or --sitemap")
+    parse = parse_article_details if args.detailed else parse_article
+    cache = None if args.no_cache else HttpCache()
+    limits = AdaptiveConcurrency(maximum=args.concurrency) if args.adaptive else None
+
+    if args.headers_only:
+        results = scrape_headers(urls, args.detailed, args.concurrency, args.processes, args.timeout,
+                                 cache=cache, limits=limits)
+    else:
+        results = scrape_articles(urls, args.concurrency, args.processes, args.timeout,
+                                  parse=parse, cache=cache, limits=limits, dedupe=args.dedupe, state=state)
+
+    progress = Throughput("articles", len(urls))
+    extracted = []
+    with RowWriter(args.output) as out:
+        for url, row, error in results:
+            if row:
+                out.write(row)
+                extracted.append(url)
+            elif args.verbose:
+                print(f"failed: {url}: {error}", file=sys.stderr)
+            progress.step(failed=row is None)
+    progress.finish()
+    if discovery is not None:
+        # only now, with the rows written, may the sitemap cursors move past them
+        discovery.commit(extracted)
+
+
+def run_categorize(args):
+    from anewz.categorize import (PATH_COLUMNS, POST_COLUMNS, HashtagIndex, find_column, label_paths,
+                                  label_posts)
+    from anewz.columnar import format_of
+    from anewz.csv_stream import read_header, stream_csv
+    from anewz.genre import GENRE_MAPS, GenreClassifier, GenreScorer
+
+    if args.first_match:
+        classifier = GenreClassifier(GENRE_MAPS[args.genres])
+    else:
+        weights = json.loads(Path(args.weights).read_text()) if args.weights else None
+        classifier = GenreScorer(GENRE_MAPS[args.genres], weights=weights, k=args.top_k)
+    trending = HashtagIndex() if args.trending else None
+    if args.paths:
+        label, candidates = label_paths, PATH_COLUMNS
+    else:
+        label, candidates = partial(label_posts, trending=trending), POST_COLUMNS
+    with open(args.input, "rb") as source:
+        column = args.column or find_column(read_header(source, encoding=args.encoding), candidates)
+        if column is None:
+            sys.exit(f"No text column found in {args.input}; pass --column.")
+
+        progress = Throughput("categorize")
+
+        def process(chunk):
+            chunk = label(chunk, column, classifier)
+            progress.step(len(chunk))
+            return chunk
+
+        stream_csv(source, process, chunksize=args.chunksize, out_path=args.output,
+                   output_format=format_of(args.output), encoding=args.encoding)
+    progress.finish()
+    if trending is not None:
+        trending.table(args.top).to_csv(args.trending, index=False)
+
+
+def run_tiktok(args):
+    from anewz.concurrency import AdaptiveConcurrency
+    from anewz.csv_stream import RowWriter
+    from anewz.state import StateStore
+    from anewz.tiktok import RATE, TikTokClient, fetch_tiktok
+    from anewz.video_cache import VideoCache
+
+    urls = read_items(args.input, args.column)
+    limits = AdaptiveConcurrency(initial=4, maximum=args.workers) if args.adaptive else None
+    cache = None if args.no_cache else VideoCache(ttl=args.ttl * 3600)
+    client = TikTokClient(rate=args.rate or RATE, limits=limits, pool_size=args.workers, cache=cache)
+    progress = Throughput("tiktok", len(urls))
+    with RowWriter(args.output) as out:
+        for url, res, error in fetch_tiktok(urls, args.workers, client, StateStore() if args.delta else None):
+            if res:
+                out.write(res)
+            else:
+                print(f"{url}: {error}", file=sys.stderr)
+            progress.step(failed=res is None)
+    progress.finish()
+
+
+def _score_comments(chunk, text_column, category_column="Sentiment", dedupe=False):
+    from anewz.sentiment import score_sentiment
+
+    scores = score_sentiment(chunk[text_column], dedupe=dedupe)
+    chunk[category_column] = scores['Sentiment']
+    chunk['Sentiment_Score'] = scores['Sentiment_Score']
+    if dedupe:
+        chunk['Cluster_ID'] = scores['Cluster_ID']
+    return chunk
+
+
+def run_youtube(args):
+    from anewz.columnar import ChunkWriter, format_of
+    from anewz.state import StateStore
+    from anewz.youtube import harvest_comments, job_dir, read_harvest
+
+    urls = read_items(args.input, args.column)
+    workdir = Path(args.workdir or job_dir(urls, delta=args.delta, max_comments=args.max_comments))
+    print(f"[youtube] checkpoint directory: {workdir}", file=sys.stderr)
+    state = StateStore() if args.delta else None
+
+    progress = Throughput("youtube", len(urls))
+    for url, count, error in harvest_comments(urls, workdir, args.processes, args.max_comments, state):
+        if error and args.verbose:
+            print(f"failed: {url}: {error}", file=sys.stderr)
+        progress.step(failed=error is not None)
+    progress.finish()
+
+    # Sentiment runs as its own pass over the whole harvest, as in the app:
+    # repeated comments and near-duplicate clusters span videos and chunks.
+    # With a StateStore that is the merged history, earlier runs' comments too
+    comments = read_harvest(workdir, state, urls)
+    with ChunkWriter(args.output, format_of(args.output)) as out:
+        out.write(_score_comments(comments, "Comment_Text", dedupe=args.dedupe))
+
+
+def run_meta(args):
+    from anewz.collector import INTERNED_COLUMNS, ColumnCollector
+    from anewz.columnar import ChunkWriter, format_of
+    from anewz.meta import COMMENT_COLUMNS, MESSAGE_FIELD, get_meta_comments
+    from anewz.state import StateStore
+
+    token = args.token or os.environ.get("META_ACCESS_TOKEN")
+    if not token:
+        sys.exit("Pass --token or set META_ACCESS_TOKEN.")
+
+    path = Path(args.input)
+    df = pd.read_csv(path) if path.suffix.lower() == ".csv" else pd.read_excel(path)
+    column = args.column or df.columns[0]
+    rows_by_id = {}
+    for record, item_id in zip(df.to_dict('records'), df[column].astype(str).str.strip()):
+        rows_by_id.setdefault(item_id, []).append(record)
+
+    columns = list(dict.fromkeys(list(df.columns) + COMMENT_COLUMNS[args.platform]))
+    text_column = MESSAGE_FIELD[args.platform]
+    progress = Throughput("meta", len(rows_by_id))
+
+    with ChunkWriter(args.output, format_of(args.output)) as out:
+        def score(chunk):
+            out.write(_score_comments(chunk, text_column, "Sentiment_Category", args.dedupe))
+
+        # Comments are stored a column at a time and scored and written every
+        # SCORE_CHUNK rows; the original columns repeat per comment and are interned
+        # (but not those holding lists or other unhashable values)
+        repeated = tuple(c for c in df.columns if df[c].map(pd.api.types.is_hashable).all())
+        with ColumnCollector(columns, categorical=INTERNED_COLUMNS + repeated, numeric=("like_count",),
+                             flush_rows=SCORE_CHUNK, sink=score) as collected:
+            for item_id, comments, error in get_meta_comments(rows_by_id, token, args.platform, args.concurrency,
+                                                              state=StateStore() if args.delta else None):
+                if error and args.verbose:
+                    print(f"failed: {item_id}: {error}", file=sys.stderr)
+                # Keep every original column next to each comment
+                for record in rows_by_id[item_id]:
+                    collected.extend(comments, record)
+                progress.step(failed=error is not None)
+    progress.finish()
+
+
+def run_nltk_data(args):
+    from anewz.resources import NLTK_DATA_DIR, download_nltk_data, missing_nltk_data
+
+    results = download_nltk_data()
+    missing = missing_nltk_data()
+    print(f"NLTK data in {NLTK_DATA_DIR}: " + ", ".join(f"{name} {'ok' if ok else 'failed'}"
+                                                      for name, ok in results.items()), file=sys.stderr)
+    if missing:
+        sys.exit(f"Still missing: {', '.join(missing)}")
+
+
+def run_imports(args):
+    from anewz.importtime import report
+
+    table = report()
+    print(table.to_string(index=False, float_format="{:,.0f}".format))
+    problems = [f"{row.App} imports {row.Eager_heavy} at start-up" for row in table.itertuples() if row.Eager_heavy]
+    if args.budget_ms:
+        problems += [f"{row.App} takes {row.Import_ms:,.0f} ms to import (budget {args.budget_ms:,} ms)"
+                     for row in table.itertuples() if row.Import_ms > args.budget_ms]
+    if problems:
+        sys.exit("\n".join(problems))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m anewz", description=__doc__.splitlines()[0])
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="report every failed item and the time spent per stage")
+    parser.add_argument("--metrics", metavar="FILE", help="write stage timings and counters here (Prometheus format)")
+    parser.add_argument("--metrics-port", type=int, help="serve /metrics on this port while running")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def command(name, func, help, column_help="input column (CSV/Excel inputs)", input_optional=False):
+        sub = commands.add_parser(name, help=help)
+        sub.add_argument("input", nargs="?" if input_optional else None, help="input file")
+        sub.add_argument("-o", "--output", required=True, help="output file: CSV, Parquet or Arrow, from its extension")
+        sub.add_argument("--column", help=column_help)
+        sub.set_defaults(func=func)
+        return sub
+
+    sub = command("articles", run_articles, "extract article metadata from URL paths", input_optional=True)
+    sub.add_argument("--base-url", default="https://anewz.tv")
+    sub.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="connections in flight")
+    sub.add_argument("--processes", type=int, default=None, help="parser processes (default: all cores)")
+    sub.add_argument("--timeout", type=float, default=10)
+    sub.add_argument("--detailed", action="store_true", help="include authors and keywords")
+    sub.add_argument("--no-cache", action="store_true", help="skip the on-disk HTTP cache")
+    sub.add_argument("--adaptive", action="store_true",
+                     help="adapt connections per host, with --concurrency as the ceiling")
+    sub.add_argument("--dedupe", action="store_true", help="parse near-duplicate articles once")
+    sub.add_argument("--delta", action="store_true", help="reuse rows of articles unchanged since the last run")
+    sub.add_argument("--headers-only", action="store_true",
+                     help="read metadata from the page head; --dedupe and --delta do not apply")
+    sub.add_argument("--discover", action="store_true", help="take URLs from the sitemaps in robots.txt")
+    sub.add_argument("--sitemap", action="append", metavar="URL",
+                     help="sitemap, sitemap index or RSS/Atom feed to take URLs from (repeatable)")
+    sub.add_argument("--section", action="append", default=[], metavar="PATH",
+                     help="only discovered URLs under this path prefix (repeatable)")
+    sub.add_argument("--since", type=date_or_time, help="only URLs modified from this date (or ISO time) on")
+    sub.add_argument("--until", type=date_or_time, help="only URLs modified up to this date (inclusive) or ISO time")
+
+    sub = command("categorize", run_categorize, "label a CSV of posts or paths with genres")
+    sub.add_argument("--genres", choices=["news", "social", "tiktok"], default="news")
+    sub.add_argument("--paths", action="store_true", help="the column holds URL paths")
+    sub.add_argument("--chunksize", type=int, default=50_000)
+    sub.add_argument("--encoding", default="utf-8-sig")
+    sub.add_argument("--trending", metavar="CSV", help="also write the top hashtags per genre to this file")
+    sub.add_argument("--top", type=int, default=10, help="hashtags per genre for --trending")
+    sub.add_argument("--top-k", type=int, default=3, help="genres kept per row in the Genres column")
+    sub.add_argument("--weights", metavar="JSON", help='keyword weights overriding the map\'s, e.g. {"oil": 2}')
+    sub.add_argument("--first-match", action="store_true",
+                     help="only a Genre column, the first genre in map order with a keyword")
+
+    sub = command("tiktok", run_tiktok, "look up TikTok titles and genres")
+    sub.add_argument("--workers", type=int, default=10)
+    sub.add_argument("--adaptive", action="store_true",
+                     help="adapt requests in flight, with --workers as the ceiling")
+    sub.add_argument("--rate", type=float, help="oEmbed requests per second (default 10)")
+    sub.add_argument("--ttl", type=float, default=168, help="hours a cached video stays fresh (default %(default)s)")
+    sub.add_argument("--no-cache", action="store_true", help="skip the on-disk video cache")
+    sub.add_argument("--delta", action="store_true", help="only look up videos no earlier run processed")
+
+    sub = command("youtube", run_youtube, "harvest YouTube comments with sentiment")
+    sub.add_argument("--workdir", help="checkpoint directory (default: derived from the URL list)")
+    sub.add_argument("--processes", type=int, default=4)
+    sub.add_argument("--max-comments", type=int, default=50)
+    sub.add_argument("--dedupe", action="store_true", help="score near-duplicate comments once")
+    sub.add_argument("--delta", action="store_true", help="fetch new comments only and merge with earlier runs")
+
+    sub = command("meta", run_meta, "fetch Facebook/Instagram comments with sentiment",
+                  column_help="column holding post or media IDs (default: first)")
+    sub.add_argument("--platform", choices=["Facebook", "Instagram"], default="Facebook")
+    sub.add_argument("--token", help="page access token (default: $META_ACCESS_TOKEN)")
+    sub.add_argument("--concurrency", type=int, default=4, help="batch requests in flight")
+    sub.add_argument("--dedupe", action="store_true", help="score near-duplicate comments once")
+    sub.add_argument("--delta", action="store_true", help="fetch new comments only and merge with earlier runs")
+
+    sub = commands.add_parser("nltk-data", help="vendor the NLTK tokenizers into nltk_data/ (at image build)")
+    sub.set_defaults(func=run_nltk_data)
+
+    sub = commands.add_parser("imports", help="report import time per app and flag eager heavy imports")
+    sub.add_argument("--budget-ms", type=int, help="fail if an app's imports take longer than this")
+    sub.set_defaults(func=run_imports)
+    return parser
+
+
+def main(argv=None):
+    from anewz.metrics import METRICS, serve
+
+    args = build_parser().parse_args(argv)
+    if args.metrics_port:
+        serve(args.metrics_port)
+    try:
+        args.func(args)
+    finally:
+        if args.metrics:
+            Path(args.metrics).write_text(METRICS.render(), encoding="utf-8")
+        if args.verbose:
+            print(METRICS.stage_table().to_string(index=False, float_format="{:,.3f}".format), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
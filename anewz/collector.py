@@ -0,0 +1,173 @@
+"""Columnar accumulation of result rows.
+
+Pipelines used to append one dict per record to a list and build a DataFrame
+at the end. With a million comments most of that memory is overhead: a dict
+per row, a pointer per key, and the same URL, author or label held once per
+row. A ColumnCollector appends each value to its column's buffer instead:
+columns of repeated values are interned as int32 codes into one copy of each
+distinct value, numeric columns go into 8-byte array buffers, and the rest
+into plain lists. Every `flush_rows` rows the buffers become a compact
+DataFrame chunk (categoricals and numpy arrays), kept for frame() or handed
+to a sink such as ChunkWriter.write, which streams it to Parquet.
+"""
+import math
+from array import array
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+from anewz.columnar import CATEGORICAL_COLUMNS
+
+FLUSH_ROWS = 50_000
+# Columns whose values repeat from row to row: labels, video URLs, authors
+INTERNED_COLUMNS = CATEGORICAL_COLUMNS + ("Sentiment_Category", "Video_URL", "Comment_Author", "Author",
+                                          "Author_Name", "Author_ID", "username")
+
+
+class _Objects:
+    """Any values, as a list."""
+
+    def __init__(self):
+        self.values = []
+
+    def extend(self, values):
+        self.values.extend(values)
+
+    def take(self):
+        values, self.values = self.values, []
+        return values
+
+
+class _Numbers:
+    """Numbers as float64, missing values as NaN."""
+
+    def __init__(self):
+        self.values = array("d")
+
+    def extend(self, values):
+        self.values.extend([math.nan if value is None else value for value in values])
+
+    def take(self):
+        values, self.values = self.values, array("d")
+        return np.frombuffer(values, dtype=np.float64)
+
+
+class _Interned:
+    """Values as int32 codes into the distinct values seen so far."""
+
+    def __init__(self):
+        self.codes = array("i")
+        self.categories = {}
+
+    def extend(self, values):
+        categories = self.categories
+        # None and NaN (the only value unequal to itself) are missing: code -1
+        self.codes.extend([-1 if value is None or value != value else categories.setdefault(value, len(categories))
+                           for value in values])
+
+    def take(self):
+        codes, self.codes = self.codes, array("i")
+        return pd.Categorical.from_codes(np.frombuffer(codes, dtype=np.int32), list(self.categories))
+
+
+class ColumnCollector:
+    """Collects dict rows column by column.
+
+    `categorical` columns are interned and `numeric` ones stored as float64;
+    any other column is kept as is. With `columns` the output has exactly
+    those columns and other keys are dropped (as RowWriter does); without,
+    a key seen for the first time adds a column, empty for the rows before.
+    Give a sink `columns`: its first chunk fixes the schema.
+    """
+
+    def __init__(self, columns=None, categorical=INTERNED_COLUMNS, numeric=(), flush_rows=FLUSH_ROWS, sink=None):
+        self.categorical = set(categorical)
+        self.numeric = set(numeric)
+        self.flush_rows = flush_rows
+        self.sink = sink
+        self.rows = 0
+        self._fixed = columns is not None
+        self._columns = {}
+        self._pending = 0
+        self._chunks = []
+        for name in columns or ():
+            self._add_column(name)
+
+    def _add_column(self, name):
+        if name in self.categorical:
+            column = _Interned()
+        elif name in self.numeric:
+            column = _Numbers()
+        else:
+            column = _Objects()
+        column.extend([None] * self._pending)
+        self._columns[name] = column
+
+    def append(self, row):
+        self.extend([row])
+
+    def extend(self, rows, constants=None):
+        """Appends rows, each on top of `constants` (e.g. the input record a
+        batch of comments belongs to); the row's own values win. A batch
+        is stored a column at a time, much faster than row by row.
+        """
+        rows = rows if isinstance(rows, list) else list(rows)
+        constants = constants or {}
+        if not self._fixed:
+            for key in dict.fromkeys(chain(constants, *rows)):
+                if key not in self._columns:
+                    self._add_column(key)
+        for name, column in self._columns.items():
+            default = constants.get(name)
+            column.extend([row.get(name, default) for row in rows])
+        self.rows += len(rows)
+        self._pending += len(rows)
+        if self._pending >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        """Turns the buffered rows into a DataFrame chunk, for the sink or frame()."""
+        if not self._pending:
+            return
+        chunk = pd.DataFrame({name: column.take() for name, column in self._columns.items()})
+        self._pending = 0
+        if self.sink is not None:
+            self.sink(chunk)
+        else:
+            self._chunks.append(chunk)
+
+    def frame(self):
+        """Every row collected so far as one DataFrame (without a sink)."""
+        self.flush()
+        if not self._chunks:
+            return pd.DataFrame(columns=list(self._columns))
+        chunks = [self._with_all_categories(chunk) for chunk in self._chunks]
+        return chunks[0] if len(chunks) == 1 else pd.concat(chunks, ignore_index=True)
+
+    def _with_all_categories(self, chunk):
+        """A chunk with every column and, for interned ones, every category.
+
+        Categories only ever grow, so an earlier chunk's are a prefix of the
+        current ones and its codes still hold; a column added after the chunk
+        was flushed is all missing in it.
+        """
+        chunk = chunk.reindex(columns=list(self._columns))
+        changed = {}
+        for name, column in self._columns.items():
+            if not isinstance(column, _Interned):
+                continue
+            values = chunk[name]
+            codes = values.cat.codes.to_numpy() if values.dtype == "category" else np.full(len(chunk), -1)
+            if values.dtype != "category" or len(values.cat.categories) < len(column.categories):
+                changed[name] = pd.Categorical.from_codes(codes, list(column.categories))
+        return chunk.assign(**changed) if changed else chunk
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,245 @@
+"""Parquet and Arrow IPC input and output next to CSV for every dashboard.
+
+Uploads are recognised by extension and read a chunk at a time: CSV through
+pandas, Parquet a batch of row groups at a time and Arrow IPC (Feather v2)
+one record batch at a time. ChunkWriter appends processed chunks to any of
+the three formats; every chunk becomes one Parquet row group (or Arrow
+record batch), so large outputs stream to disk. Label columns such as Genre
+and Sentiment are written dictionary-encoded and read back as categoricals;
+list columns such as Hashtags stay lists, and are joined into text for CSV.
+
+pyarrow is only imported when a Parquet or Arrow file is touched.
+"""
+import io
+
+import pandas as pd
+
+FORMATS = {
+    # name: (extension, MIME type)
+    "csv": (".csv", "text/csv"),
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+    "arrow": (".arrow", "application/vnd.apache.arrow.file"),
+}
+EXTENSIONS = {
+    ".csv": "csv", ".txt": "csv",
+    ".parquet": "parquet", ".pq": "parquet",
+    ".arrow": "arrow", ".feather": "arrow", ".ipc": "arrow",
+    ".xlsx": "excel", ".xls": "excel",
+}
+LABELS = {"csv": "CSV", "parquet": "Parquet", "arrow": "Arrow IPC"}
+UPLOAD_TYPES = ["csv", "parquet", "pq", "arrow", "feather"]
+CATEGORICAL_COLUMNS = ("Genre", "Sentiment", "Platform")
+PARQUET_COMPRESSION = "zstd"
+LIST_SEPARATOR = ", "  # how list columns are written to CSV
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet and Arrow files need pyarrow: pip install pyarrow") from None
+    return pyarrow
+
+
+def format_of(name, default="csv"):
+    """Format name for a file name or upload, judged by its extension."""
+    name = str(getattr(name, "name", name) or "").lower()
+    for extension, fmt in EXTENSIONS.items():
+        if name.endswith(extension):
+            return fmt
+    return default
+
+
+def file_name(stem, fmt):
+    return stem + FORMATS[fmt][0]
+
+
+def mime_type(fmt):
+    return FORMATS[fmt][1]
+
+
+def read_columns(source, fmt):
+    """Column names of a Parquet or Arrow upload without reading its rows."""
+    pa = _pyarrow()
+    if fmt == "parquet":
+        names = pa.parquet.read_schema(source).names
+    else:
+        names = _open_ipc(pa, source).schema.names
+    source.seek(0)
+    return [n for n in names if not n.startswith("__index_level_")]
+
+
+def _open_ipc(pa, source):
+    try:
+        return pa.ipc.open_file(source)
+    except pa.ArrowInvalid:
+        source.seek(0)
+        return pa.ipc.open_stream(source)
+
+
+def iter_chunks(source, fmt, chunksize, **read_kwargs):
+    """DataFrames of about `chunksize` rows from a CSV, Parquet or Arrow source."""
+    if fmt == "csv":
+        yield from pd.read_csv(source, chunksize=chunksize, **read_kwargs)
+        return
+    if fmt == "excel":
+        yield pd.read_excel(source, **read_kwargs)
+        return
+
+    pa = _pyarrow()
+    if fmt == "parquet":
+        batches = pa.parquet.ParquetFile(source).iter_batches(batch_size=chunksize)
+    else:
+        reader = _open_ipc(pa, source)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches)) \
+            if hasattr(reader, "get_batch") else reader
+    pending, rows = [], 0
+    for batch in batches:
+        pending.append(batch)
+        rows += batch.num_rows
+        if rows >= chunksize:
+            yield pa.Table.from_batches(pending).to_pandas()
+            pending, rows = [], 0
+    if pending:
+        yield pa.Table.from_batches(pending).to_pandas()
+
+
+def read_table(source, fmt=None, **read_kwargs):
+    """Whole upload as one DataFrame, for inputs small enough to hold in memory."""
+    fmt = fmt or format_of(source)
+    if fmt == "csv":
+        return pd.read_csv(source, **read_kwargs)
+    if fmt == "excel":
+        return pd.read_excel(source, **read_kwargs)
+    _pyarrow()
+    if fmt == "parquet":
+        return pd.read_parquet(source, **read_kwargs)
+    return pd.read_feather(source, **read_kwargs)
+
+
+def _csv_ready(df, separator=LIST_SEPARATOR):
+    """List columns (e.g. Hashtags) joined into text for CSV output."""
+    joined = {}
+    for column in df.columns:
+        values = df[column]
+        if values.dtype == object and len(values) and isinstance(values.iloc[0], list):
+            joined[column] = values.map(separator.join, na_action="ignore")
+    return df.assign(**joined) if joined else df
+
+
+def _with_categories(df, categorical):
+    columns = [c for c in categorical if c in df.columns and df[c].dtype != "category"]
+    if columns:
+        df = df.astype({c: "category" for c in columns})
+    return df
+
+
+def _stable_schema(pa, schema):
+    """Schema every later chunk is cast to: 32-bit dictionary indices, and
+    strings for columns (or lists) that happened to be empty in the first chunk.
+    """
+    fields = []
+    for field in schema:
+        if pa.types.is_dictionary(field.type):
+            field = field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+        elif pa.types.is_null(field.type):
+            field = field.with_type(pa.string())
+        elif pa.types.is_list(field.type) and pa.types.is_null(field.type.value_type):
+            field = field.with_type(pa.list_(pa.string()))
+        fields.append(field)
+    return pa.schema(fields)
+
+
+class ChunkWriter:
+    """Appends DataFrame chunks to a CSV, Parquet or Arrow IPC file.
+
+    `target` is a path or a binary file object. The first chunk fixes the
+    columns and types; each later Parquet chunk becomes its own row group.
+    """
+
+    def __init__(self, target, fmt="csv", encoding="utf-8", categorical=CATEGORICAL_COLUMNS):
+        self.fmt = fmt
+        self.encoding = encoding
+        self.categorical = categorical
+        self.rows = 0
+        self._target = target
+        self._file = None
+        self._writer = None
+        self._schema = None
+        self._categories = {}
+
+    def _open_csv(self):
+        if hasattr(self._target, "write"):
+            return io.TextIOWrapper(self._target, encoding=self.encoding, newline="", write_through=True)
+        return open(self._target, "w", encoding=self.encoding, newline="")
+
+    def _extend_categories(self, df):
+        """Arrow IPC files only take dictionary deltas, so every chunk's
+        categories start with all categories seen before, in the same order.
+        """
+        changed = {}
+        for column in df.columns:
+            if df[column].dtype == "category":
+                seen = self._categories.setdefault(column, {})
+                seen.update(dict.fromkeys(df[column].cat.categories))
+                changed[column] = df[column].cat.set_categories(list(seen))
+        return df.assign(**changed) if changed else df
+
+    def write(self, chunk):
+        if self.fmt == "csv":
+            if self._file is None:
+                self._file = self._open_csv()
+            _csv_ready(chunk).to_csv(self._file, header=self.rows == 0, index=False)
+            self.rows += len(chunk)
+            return
+
+        pa = _pyarrow()
+        chunk = _with_categories(chunk, self.categorical)
+        if self.fmt == "arrow":
+            chunk = self._extend_categories(chunk)
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if self._writer is None:
+            self._schema = _stable_schema(pa, table.schema)
+            if self.fmt == "parquet":
+                self._writer = pa.parquet.ParquetWriter(self._target, self._schema,
+                                                        compression=PARQUET_COMPRESSION)
+            else:
+                self._writer = pa.ipc.new_file(self._target, self._schema,
+                                               options=pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True))
+        table = table.select(self._schema.names).cast(self._schema)
+        self._writer.write_table(table)
+        self.rows += len(chunk)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._file is not None:
+            if hasattr(self._target, "write"):
+                self._file.detach()
+            else:
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def export(df, fmt="csv", encoding="utf-8"):
+    """Download payload for a finished DataFrame.
+
+    CSV stays text so no second, encoded copy is made (unless an encoding
+    like utf-8-sig is asked for); Parquet and Arrow are written into one
+    in-memory buffer.
+    """
+    if fmt == "csv":
+        text = _csv_ready(df).to_csv(index=False)
+        return text if encoding == "utf-8" else text.encode(encoding)
+    buffer = io.BytesIO()
+    with ChunkWriter(buffer, fmt) as writer:
+        writer.write(df)
+    buffer.seek(0)
+    return buffer
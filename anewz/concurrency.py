@@ -0,0 +1,223 @@
+"""Adaptive per-host concurrency limits for the network pipelines.
+
+Instead of a fixed thread count, each host gets an AIMD limit on requests in
+flight: every healthy response adds roughly one slot per round trip, and a
+429/5xx, a transport error or recent latency rising well above its long-run
+average halves it (at most once per round trip). The limit settles just
+below where the origin starts to push back.
+
+TokenBucket is the fixed-rate counterpart for APIs with a known request
+budget, shared by every thread talking to that API.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from urllib.parse import urlsplit
+
+THROTTLED = (429, 503)
+RATE_WINDOW = 10  # seconds of completions behind the achieved-rate figure
+
+
+class Outcome:
+    """Filled in by the caller inside a request() block."""
+
+    def __init__(self):
+        self.status = None
+        self.failed = False
+
+
+class AdaptiveLimit:
+    """AIMD limit on concurrent requests to one host."""
+
+    def __init__(self, initial=8, minimum=1, maximum=64, backoff=0.5, latency_tolerance=2.0):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self.completed = 0
+        self.errors = 0
+        self.throttled = 0
+        self.recent_latency = None  # fast EWMA
+        self.usual_latency = None  # slow EWMA, the baseline
+        self._last_decrease = 0.0
+        self._recent = deque()
+        self._cond = threading.Condition()
+        self._async_waiters = []  # (loop, future) of coroutines waiting for a slot
+
+    def try_acquire(self):
+        with self._cond:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    async def acquire_async(self):
+        """Waits for a slot without blocking the loop; release() wakes the
+        waiters, from whichever thread it runs on.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            try:
+                await waiter
+            finally:
+                with self._cond:
+                    if (loop, waiter) in self._async_waiters:
+                        self._async_waiters.remove((loop, waiter))
+
+    def _wake_async_waiters(self):
+        """Called under the lock: every waiting coroutine tries again."""
+        waiters, self._async_waiters = self._async_waiters, []
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:
+                pass  # its loop is closed
+
+    def release(self, latency, status=None, failed=False):
+        """Returns a slot and adjusts the limit from the request's outcome."""
+        now = time.monotonic()
+        throttled = status in THROTTLED
+        overloaded = failed or throttled or (status is not None and status >= 500)
+        with self._cond:
+            self.in_flight -= 1
+            self.completed += 1
+            self._recent.append(now)
+            while self._recent and self._recent[0] < now - RATE_WINDOW:
+                self._recent.popleft()
+
+            if overloaded:
+                self.errors += 1
+                self.throttled += throttled
+            elif self.usual_latency is None:
+                self.recent_latency = self.usual_latency = latency
+            else:
+                self.recent_latency = 0.8 * self.recent_latency + 0.2 * latency
+                self.usual_latency = 0.98 * self.usual_latency + 0.02 * latency
+
+            slow = not overloaded and self.recent_latency > self.latency_tolerance * self.usual_latency
+            if overloaded or slow:
+                # Multiplicative decrease, at most once per round trip
+                if now - self._last_decrease >= (self.recent_latency or 0.1):
+                    self.limit = max(self.minimum, self.limit * self.backoff)
+                    self._last_decrease = now
+            else:
+                # Additive increase: about one slot per full window of successes
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+            self._wake_async_waiters()
+
+    @contextmanager
+    def request(self):
+        """Holds a slot around one request; set outcome.status inside the block."""
+        self.acquire()
+        outcome = Outcome()
+        started = time.perf_counter()
+        try:
+            yield outcome
+        except Exception:
+            outcome.failed = True
+            raise
+        finally:
+            self.release(time.perf_counter() - started, outcome.status, outcome.failed)
+
+    @asynccontextmanager
+    async def request_async(self):
+        await self.acquire_async()
+        outcome = Outcome()
+        started = time.perf_counter()
+        try:
+            yield outcome
+        except Exception:
+            outcome.failed = True
+            raise
+        finally:
+            self.release(time.perf_counter() - started, outcome.status, outcome.failed)
+
+    def rate(self):
+        """Completions per second over the last RATE_WINDOW seconds."""
+        with self._cond:
+            if len(self._recent) < 2:
+                return 0.0
+            return len(self._recent) / max(self._recent[-1] - self._recent[0], 1e-3)
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class AdaptiveConcurrency:
+    """One AdaptiveLimit per host, created on first use."""
+
+    def __init__(self, **limit_options):
+        self.limit_options = limit_options
+        self.maximum = limit_options.get("maximum", 64)
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def for_url(self, url):
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = AdaptiveLimit(**self.limit_options)
+            return self._hosts[host]
+
+    def summary(self):
+        """Current limit, requests in flight, achieved rate and error share."""
+        with self._lock:
+            hosts = list(self._hosts.values())
+        completed = sum(h.completed for h in hosts)
+        return {
+            "limit": sum(int(h.limit) for h in hosts),
+            "in_flight": sum(h.in_flight for h in hosts),
+            "rate": sum(h.rate() for h in hosts),
+            "error_rate": sum(h.errors for h in hosts) / completed if completed else 0.0,
+        }
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` requests per second, bursts up to `burst`."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1.0, self.rate))
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Blocks until a token is available, then takes it."""
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Holds every caller back for `seconds`, e.g. after a Retry-After."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, 1 - seconds * self.rate)
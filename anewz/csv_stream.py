@@ -0,0 +1,171 @@
+"""Chunked upload processing for the categorizer dashboards.
+
+Uploads (CSV, Parquet or Arrow) are read a chunk at a time and every
+labelled chunk is appended to a temporary file on disk, so memory stays flat
+however large the export is. The dashboards preview a sample and serve the
+download from that file.
+"""
+import codecs
+import csv
+import os
+import tempfile
+import time
+from collections import namedtuple
+from pathlib import Path
+
+import pandas as pd
+
+from anewz.columnar import FORMATS, ChunkWriter, format_of, iter_chunks, read_columns
+
+DEFAULT_CHUNKSIZE = 50_000
+SAMPLE_ROWS = 1_000
+OUTPUT_DIR = Path(tempfile.gettempdir()) / "anewz"
+OUTPUT_TTL = 24 * 3600  # processed files older than this are swept
+ROW_GROUP_ROWS = 50_000  # buffered dict rows per Parquet row group
+
+StreamedCsv = namedtuple("StreamedCsv", "path rows sample counts")
+
+
+def sniff_encoding(source, candidates=("utf-8-sig", "latin1"), block=1 << 20):
+    """Picks the first candidate encoding that decodes the whole upload.
+
+    The upload is decoded a block at a time, so a stray byte deep into the
+    file is caught here rather than halfway through stream_csv.
+    """
+    for encoding in candidates:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            while True:
+                data = source.read(block)
+                decoder.decode(data, final=not data)
+                if not data:
+                    return encoding
+        except UnicodeDecodeError:
+            continue
+        finally:
+            source.seek(0)
+    return candidates[-1]
+
+
+def read_header(source, **read_kwargs):
+    """Column names of an upload without reading its rows."""
+    fmt = format_of(source)
+    if fmt != "csv":
+        return read_columns(source, fmt)
+    columns = pd.read_csv(source, nrows=0, **read_kwargs).columns
+    source.seek(0)
+    return list(columns)
+
+
+def _sweep_outputs():
+    cutoff = time.time() - OUTPUT_TTL
+    for old in OUTPUT_DIR.glob("processed_*"):
+        try:
+            if old.stat().st_mtime < cutoff:
+                old.unlink()
+        except OSError:
+            pass
+
+
+def stream_csv(source, process, chunksize=DEFAULT_CHUNKSIZE, count_column=None,
+               sample_rows=SAMPLE_ROWS, output_encoding="utf-8", out_path=None,
+               input_format=None, output_format="csv", **read_kwargs):
+    """Runs process(chunk) -> chunk over an upload and writes the result to disk.
+
+    The input format is taken from the upload's name unless `input_format`
+    is given; `read_kwargs` only apply to CSV input. CSV columns read into
+    Parquet or Arrow stay text: pandas guesses types chunk by chunk (ints
+    in one, a 2.5 or an empty cell in the next) while the file's schema is
+    fixed by the first chunk. The output goes to
+    `out_path`, or to a temporary file when it is None, as CSV, Parquet or
+    Arrow per `output_format`. Returns the output path, the number of rows
+    written, the first `sample_rows` rows for display and, if `count_column`
+    is given, its value counts over the whole file.
+    """
+    input_format = input_format or format_of(source)
+    if input_format == "csv" and output_format != "csv":
+        read_kwargs = {**read_kwargs, "dtype": str}
+    if out_path is None:
+        OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        _sweep_outputs()
+        fd, path = tempfile.mkstemp(prefix="processed_", suffix=FORMATS[output_format][0], dir=OUTPUT_DIR)
+    else:
+        path = str(out_path)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+
+    samples = []
+    counts = pd.Series(dtype="int64")
+    with os.fdopen(fd, "wb") as out, ChunkWriter(out, output_format, output_encoding) as writer:
+        for chunk in iter_chunks(source, input_format, chunksize,
+                                 **(read_kwargs if input_format == "csv" else {})):
+            chunk = process(chunk)
+            if writer.rows < sample_rows:
+                samples.append(chunk.head(sample_rows - writer.rows))
+            if count_column:
+                counts = counts.add(chunk[count_column].value_counts(), fill_value=0)
+            writer.write(chunk)
+
+    sample = pd.concat(samples, ignore_index=True) if samples else pd.DataFrame()
+    # Categorical columns also count the labels that never occurred
+    counts = counts[counts > 0].astype("int64").sort_values(ascending=False).rename("count")
+    counts.index.name = count_column
+    return StreamedCsv(path, writer.rows, sample, counts)
+
+
+class RowWriter:
+    """Writes dict rows to a CSV, Parquet or Arrow file as they arrive.
+
+    The format follows the file extension. The header comes from
+    `fieldnames` or, failing that, the first row's keys; keys missing from
+    the header are dropped. Parquet and Arrow rows are buffered and written
+    every ROW_GROUP_ROWS rows as one row group.
+    """
+
+    def __init__(self, path, fieldnames=None, encoding="utf-8"):
+        self.rows = 0
+        self.format = format_of(path)
+        self._fieldnames = fieldnames
+        self._writer = None
+        if self.format == "csv":
+            self._file = open(path, "w", encoding=encoding, newline="")
+        else:
+            self._chunks = ChunkWriter(path, self.format)
+            self._buffer = []
+
+    def _flush(self):
+        if self._buffer:
+            self._chunks.write(pd.DataFrame.from_records(self._buffer, columns=self._fieldnames))
+            self._buffer = []
+
+    def write(self, row):
+        if self.format != "csv":
+            if self._fieldnames is None:
+                self._fieldnames = list(row)
+            self._buffer.append(row)
+            if len(self._buffer) >= ROW_GROUP_ROWS:
+                self._flush()
+            self.rows += 1
+            return
+        if self._writer is None:
+            self._writer = csv.DictWriter(self._file, fieldnames=self._fieldnames or list(row),
+                                          extrasaction="ignore")
+            self._writer.writeheader()
+        self._writer.writerow(row)
+        self.rows += 1
+
+    def write_many(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def close(self):
+        if self.format == "csv":
+            self._file.close()
+        else:
+            self._flush()
+            self._chunks.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,194 @@
+"""Near-duplicate clustering, so syndicated copies are analysed only once.
+
+Texts are reduced to their set of word bigrams and summarised by a MinHash
+signature of NUM_PERM values; the share of equal values estimates the
+Jaccard similarity of two texts. Candidates come from LSH banding (BANDS
+bands of NUM_PERM / BANDS values; texts agreeing on any whole band are
+compared) and are accepted above SIMILARITY. A one-word edit in a 20-word
+comment keeps about 0.8 of its bigrams, a different comment close to none.
+Texts shorter than MIN_TOKENS words carry too little signal and only
+cluster with identical text (after case and punctuation are normalised).
+
+Each cluster keeps its first member as representative; expensive work
+(newspaper's nlp(), VADER) runs on representatives and the result is
+copied to the other members, next to a Cluster_ID column.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+NUM_PERM = 32
+BANDS = 8
+SIMILARITY = 0.7  # estimated Jaccard of the bigram sets
+MIN_TOKENS = 5
+BLOCK_DOCS = 50_000  # texts hashed per numpy pass
+MIN_PAGE_WORDS = 50  # pages with less paragraph text (paywalls, errors) are never merged
+
+_WORD = re.compile(r"\w+")
+_PARAGRAPH = re.compile(r"<p\b[^>]*>(.*?)</p>", re.IGNORECASE | re.DOTALL)
+_TAG = re.compile(r"<[^>]+>")
+
+# Fixed multiply-add permutations, so signatures are comparable across runs
+_rng = np.random.default_rng(20240101)
+_MULTIPLIERS = _rng.integers(1, 2**63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_OFFSETS = _rng.integers(0, 2**63, NUM_PERM, dtype=np.uint64)
+_BAND_MIX = _rng.integers(1, 2**63, NUM_PERM // BANDS, dtype=np.uint64) | np.uint64(1)
+
+
+def tokenize(texts):
+    """Lower-cased word lists for a list or Series of texts ([] when missing)."""
+    words = pd.Series(texts, dtype=object).astype("string").str.lower().str.findall(_WORD)
+    return words.astype(object).where(words.notna(), pd.Series([[]] * len(words), index=words.index))
+
+
+def _signatures(block):
+    """MinHash signatures (len(block) x NUM_PERM) from word lists of >= 2 words."""
+    counts = block.map(len).to_numpy()
+    tokens = np.array([t for doc in block for t in doc], dtype=object)
+    docs = np.repeat(np.arange(len(block)), counts)
+    same_doc = docs[1:] == docs[:-1]
+    hashes = pd.util.hash_array(tokens[:-1][same_doc] + " " + tokens[1:][same_doc])
+    # Bigrams are still grouped by doc, so each doc is one contiguous run
+    starts = np.concatenate([[0], np.cumsum(counts - 1)[:-1]])
+    signatures = np.empty((len(block), NUM_PERM), dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for i in range(NUM_PERM):
+            signatures[:, i] = np.minimum.reduceat(hashes * _MULTIPLIERS[i] + _OFFSETS[i], starts)
+    return signatures
+
+
+def minhash(words, min_tokens=MIN_TOKENS):
+    """Signatures for word lists with at least min_tokens words; other rows are 0."""
+    long_enough = words.map(len).to_numpy() >= max(min_tokens, 2)
+    signatures = np.zeros((len(words), NUM_PERM), dtype=np.uint64)
+    rows = np.flatnonzero(long_enough)
+    for start in range(0, len(rows), BLOCK_DOCS):
+        chunk = rows[start:start + BLOCK_DOCS]
+        signatures[chunk] = _signatures(words.iloc[chunk])
+    return signatures
+
+
+def band_keys(signatures):
+    """One integer per LSH band of every signature (rows x BANDS)."""
+    bands = signatures.reshape(len(signatures), BANDS, NUM_PERM // BANDS)
+    with np.errstate(over="ignore"):
+        return (bands * _BAND_MIX).sum(axis=2, dtype=np.uint64)
+
+
+class NearDuplicateIndex:
+    """Incremental clustering: add() returns the cluster of each new text."""
+
+    def __init__(self, similarity=SIMILARITY, min_tokens=MIN_TOKENS):
+        self.similarity = similarity
+        self.min_tokens = min_tokens
+        self.clusters = 0
+        self._buckets = [{} for _ in range(BANDS)]
+        self._exact = {}
+
+    def _new_cluster(self):
+        self.clusters += 1
+        return self.clusters - 1
+
+    def add(self, signature, tokens, keys=None):
+        """Cluster number for a text given its MinHash signature and word list
+        (and its band_keys, when computed for a whole batch).
+        """
+        if len(tokens) < max(self.min_tokens, 2):
+            key = " ".join(tokens)
+            if key not in self._exact:
+                self._exact[key] = self._new_cluster()
+            return self._exact[key]
+
+        if keys is None:
+            keys = band_keys(signature[None, :])[0].tolist()
+        # Like the batch version, each bucket only remembers its first text
+        for bucket, key in zip(self._buckets, keys):
+            first = bucket.get(key)
+            if first is not None and np.count_nonzero(signature == first[0]) >= self.similarity * NUM_PERM:
+                return first[1]
+        cluster = self._new_cluster()
+        for bucket, key in zip(self._buckets, keys):
+            bucket.setdefault(key, (signature, cluster))
+        return cluster
+
+    def add_text(self, text):
+        """Cluster number for one raw text."""
+        words = tokenize([text])
+        return self.add(minhash(words, self.min_tokens)[0], words.iloc[0])
+
+
+def _first_with_same(keys):
+    """Position of the first row sharing each row's key."""
+    codes, _ = pd.factorize(keys)
+    _, first = np.unique(codes, return_index=True)
+    return first[codes]
+
+
+def _cluster_batch(words, signatures, similarity, min_tokens):
+    """Representative position for every row, computed a band at a time.
+
+    Each text is compared with the first text of every LSH bucket it falls
+    in; links always point to an earlier row, so following them to the end
+    gives the earliest member of the cluster.
+    """
+    rows = len(words)
+    counts = words.map(len).to_numpy()
+    rep = np.arange(rows)
+
+    short = np.flatnonzero(counts < max(min_tokens, 2))
+    if len(short):
+        rep[short] = short[_first_with_same(words.iloc[short].map(" ".join).to_numpy(dtype=object))]
+
+    long_rows = np.flatnonzero(counts >= max(min_tokens, 2))
+    signatures = signatures[long_rows]
+    keys = band_keys(signatures)
+    best = np.arange(len(long_rows))
+    for band in range(BANDS):
+        leader = _first_with_same(keys[:, band])
+        candidates = np.flatnonzero(leader < best)
+        agree = (signatures[candidates] == signatures[leader[candidates]]).sum(axis=1)
+        linked = candidates[agree >= similarity * NUM_PERM]
+        best[linked] = np.minimum(best[linked], leader[linked])
+    while True:
+        followed = best[best]
+        if np.array_equal(followed, best):
+            break
+        best = followed
+    rep[long_rows] = long_rows[best]
+    return rep
+
+
+def near_duplicate_clusters(texts, similarity=SIMILARITY, min_tokens=MIN_TOKENS):
+    """Cluster_ID Series aligned with `texts`; IDs count up in order of first
+    appearance, so the first row of each cluster is its representative.
+    """
+    if not isinstance(texts, pd.Series):
+        texts = pd.Series(texts, dtype=object)
+    # Identical texts never need hashing twice
+    codes, uniques = pd.factorize(texts, use_na_sentinel=False)
+    words = tokenize(list(uniques))
+    rep = _cluster_batch(words, minhash(words, min_tokens), similarity, min_tokens)
+    # A representative is the first row of its cluster, so this numbers
+    # clusters in order of first appearance
+    cluster_of_unique, _ = pd.factorize(rep)
+    return pd.Series(cluster_of_unique[codes], index=texts.index, name="Cluster_ID")
+
+
+def representatives(clusters):
+    """Positions of the first member of every cluster, in cluster order."""
+    _, first = np.unique(np.asarray(clusters), return_index=True)
+    return first
+
+
+def html_text(html):
+    """Cheap paragraph text of an article page, enough to fingerprint it."""
+    return " ".join(_TAG.sub(" ", p) for p in _PARAGRAPH.findall(html))
+
+
+def page_cluster(index, html):
+    """Cluster of an article page, or None if it has too little text to judge."""
+    text = html_text(html)
+    if len(_WORD.findall(text)) < MIN_PAGE_WORDS:
+        return None
+    return index.add_text(text)
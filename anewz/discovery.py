@@ -0,0 +1,278 @@
+"""Article URL discovery from sitemaps and RSS/Atom feeds.
+
+A source is a sitemap index, a sitemap, an RSS or an Atom feed; which one is
+told from its elements, so robots.txt `Sitemap:` lines and feed links can be
+mixed freely. Every file is streamed into an incremental XML parser and each
+<url>/<item>/<entry> is dropped once read, so a 50,000-URL sitemap (or a
+gzipped one) never sits in memory whole.
+
+Entries are filtered by section (path prefix) and by a date window on their
+lastmod / publication date. With a StateStore, each source keeps as cursor
+the newest lastmod it has seen, with the URLs seen at exactly that time:
+later runs skip entries that are older (or listed at the cursor) and do not
+even download child sitemaps whose own lastmod is older, so the daily run
+over a 200k-URL archive reads a few small files. Articles sharing the
+cursor's second, or a day-only lastmod, are not lost. A cursor only moves
+when the caller commits the URLs it extracted, and never past one that
+failed. Entries without a date cannot be compared and are always kept; the
+article pipeline's own delta run makes those cheap.
+"""
+import email.utils
+import re
+import zlib
+from collections import namedtuple
+from datetime import datetime, time, timezone
+from time import perf_counter
+from urllib.parse import urljoin, urlsplit
+from xml.etree.ElementTree import XMLPullParser
+
+import httpx
+
+from anewz.fetch import USER_AGENT
+from anewz.http_cache import normalize_url
+from anewz.metrics import count, observe
+
+SITEMAP = "sitemap"
+# Elements holding one discovered item, by local name
+ENTRIES = {"sitemap", "url", "item", "entry"}
+# Date elements, most specific first: when the article last changed, then when it appeared
+DATE_FIELDS = ("lastmod", "updated", "publication_date", "pubDate", "published", "date")
+
+Entry = namedtuple("Entry", "url lastmod source")
+
+_GZIP_MAGIC = b"\x1f\x8b"
+# Bytes of XML per parser feed; the parsed events of one feed are held at once
+FEED_BYTES = 64 * 1024
+
+
+def _local(tag):
+    return tag.rpartition("}")[2]
+
+
+def parse_time(text):
+    """W3C/ISO 8601 or RFC 822 (RSS) date as an aware UTC datetime, or None."""
+    if not text:
+        return None
+    text = text.strip()
+    try:
+        value = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            value = email.utils.parsedate_to_datetime(text)
+        except (TypeError, ValueError):
+            return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _fields(element):
+    """(kind, url, lastmod) of one entry element."""
+    kind = _local(element.tag)
+    values = {}
+    url = None
+    for child in element.iter():
+        name = _local(child.tag)
+        if name == "link" and child.get("href"):
+            # Atom: the alternate (or only) link is the article
+            if child.get("rel", "alternate") == "alternate":
+                url = url or child.get("href")
+        elif child is not element and child.text and name not in values:
+            values[name] = child.text.strip()
+    url = url or values.get("loc") or values.get("link") or values.get("guid")
+    lastmod = next((parse_time(values[f]) for f in DATE_FIELDS if f in values), None)
+    return kind, url, lastmod
+
+
+def _xml_pieces(chunks):
+    """Byte chunks as XML in FEED_BYTES pieces; a gzipped document (detected by
+    its magic number) is inflated a piece at a time, sitemaps compress ~25x.
+    """
+    inflate = None
+    for chunk in chunks:
+        if inflate is None:
+            inflate = zlib.decompressobj(31) if chunk.startswith(_GZIP_MAGIC) else False
+        if not inflate:
+            for start in range(0, len(chunk), FEED_BYTES):
+                yield chunk[start:start + FEED_BYTES]
+            continue
+        while chunk:
+            yield inflate.decompress(chunk, FEED_BYTES)
+            chunk = inflate.unconsumed_tail
+
+
+def iter_entries(chunks):
+    """Yields (kind, url, lastmod) from an XML document arriving as byte chunks,
+    gzipped or not; kind is "sitemap" for a sitemap index's children and
+    "url", "item" or "entry" for articles.
+    """
+    parser = XMLPullParser(events=("start", "end"))
+    open_elements = []
+    for piece in _xml_pieces(chunks):
+        parser.feed(piece)
+        for event, element in parser.read_events():
+            if event == "start":
+                open_elements.append(element)
+                continue
+            open_elements.pop()
+            if _local(element.tag) in ENTRIES:
+                yield _fields(element)
+                # Drop the entry from the tree so memory stays flat
+                if open_elements:
+                    open_elements[-1].remove(element)
+    parser.close()
+
+
+def sitemaps_from_robots(base_url, client):
+    """Sitemap URLs listed in the site's robots.txt, or /sitemap.xml if none are."""
+    found = []
+    try:
+        response = client.get(urljoin(base_url + "/", "/robots.txt"))
+        if response.is_success:
+            found = [m.group(1).strip() for m in re.finditer(r"(?im)^\s*sitemap:\s*(\S+)", response.text)]
+    except httpx.HTTPError:
+        pass
+    return found or [urljoin(base_url + "/", "/sitemap.xml")]
+
+
+def _bound(value, end=False):
+    """A date window edge as aware UTC; a plain date covers its whole day."""
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, time.max if end else time.min)
+    return parse_time(value.isoformat())
+
+
+def _in_sections(url, sections):
+    if not sections:
+        return True
+    path = urlsplit(url).path
+    return any(path == s.rstrip("/") or path.startswith(s.rstrip("/") + "/") for s in sections)
+
+
+def _cursor_key(source, sections):
+    # The cursor only covers what the filter let through
+    return " ".join([normalize_url(source)] + sorted(sections))
+
+
+def discover(sources, sections=(), since=None, until=None, state=None, timeout=30, client=None):
+    """A Discovery run: iterate it for an Entry(url, lastmod, source) per
+    article URL, each URL once.
+
+    `sections` are path prefixes ("/politics"); `since`/`until` bound the
+    entries' dates (dates or datetimes, naive ones taken as UTC; `until`
+    as a date includes that day), and with either of them undated entries
+    are dropped. With a StateStore only entries previous runs did not
+    yield come back (newer ones, and new URLs at the cursor's own lastmod).
+    The cursors only move on Discovery.commit(), once the URLs have been
+    extracted, so URLs that failed or were never processed are found again
+    by the next run. A run with `until` is a backfill of an older slice
+    and leaves the cursors alone.
+    """
+    return Discovery(sources, sections, since, until, state, timeout, client)
+
+
+class Discovery:
+    """Entries of some sitemaps and feeds, and the cursors they move; see discover()."""
+
+    def __init__(self, sources, sections=(), since=None, until=None, state=None, timeout=30, client=None):
+        self.sources = list(sources)
+        self.sections = [s if s.startswith("/") else "/" + s for s in sections]
+        self.since, self.until = _bound(since), _bound(until, end=True)
+        self.state = state
+        self.timeout = timeout
+        self.client = client
+        # cursor key -> (cursor, URLs at the cursor, [(normalized URL, lastmod)])
+        # for every source read to the end
+        self._read = {}
+
+    def __iter__(self):
+        state, sections, since, until = self.state, self.sections, self.since, self.until
+        client = self.client
+        own_client = client is None
+        if own_client:
+            client = httpx.Client(timeout=self.timeout, headers={"User-Agent": USER_AGENT}, follow_redirects=True)
+        seen = set()
+        try:
+            for source in self.sources:
+                key = _cursor_key(source, sections)
+                stored = state.get(SITEMAP, key) if state is not None else None
+                cursor = parse_time(stored.cursor) if stored and stored.cursor else None
+                # URLs listed at exactly the cursor's time were yielded already
+                listed = state.rows(SITEMAP, key) if cursor else []
+                at_cursor = set(listed[0]["urls"]) if listed else set()
+                dated = []
+                pending = [source]
+                while pending:
+                    location = pending.pop(0)
+                    # Entries are yielded as the file streams in; the caller's time is not discovery's
+                    started, outside = perf_counter(), 0.0
+                    with client.stream("GET", location) as response:
+                        response.raise_for_status()
+                        for kind, url, lastmod, normalized in _walk(response.iter_bytes(), location, sections,
+                                                                    since, until, cursor, at_cursor, seen):
+                            if kind == SITEMAP:
+                                pending.append(url)
+                                continue
+                            if lastmod:
+                                dated.append((normalized, lastmod))
+                            paused = perf_counter()
+                            yield Entry(url, lastmod, location)
+                            outside += perf_counter() - paused
+                    observe("discovery", perf_counter() - started - outside)
+                    count("sitemaps_read")
+                self._read[key] = (cursor, at_cursor, dated)
+        finally:
+            if own_client:
+                client.close()
+
+    def commit(self, extracted):
+        """Moves the cursor of every source read to the end past the URLs in
+        `extracted`: past its newest entry if all of them were extracted,
+        otherwise up to the oldest one that was not, which (with any newer
+        ones) the next run yields again.
+        """
+        if self.state is None or self.until is not None:
+            return
+        done = {normalize_url(url) for url in extracted}
+        for key, (cursor, at_cursor, dated) in self._read.items():
+            held = [lastmod for url, lastmod in dated if url not in done]
+            newest = min(held) if held else max((lastmod for _, lastmod in dated), default=None)
+            if newest is None:
+                continue
+            at_newest = {url for url, lastmod in dated if lastmod == newest and url in done}
+            if newest == cursor:
+                at_newest |= at_cursor
+            self.state.record(SITEMAP, key, [{"urls": sorted(at_newest)}], cursor=newest.isoformat())
+
+
+def _walk(chunks, location, sections, since, until, cursor, at_cursor, seen):
+    """(kind, url, lastmod, normalized url) of the entries of one file that
+    pass the filters; child sitemaps that cannot hold anything new or in the
+    window are left out. `at_cursor` and `seen` hold normalized URLs.
+    """
+    for kind, url, lastmod in iter_entries(chunks):
+        if not url:
+            continue
+        url = urljoin(location, url)
+        if kind == SITEMAP:
+            # A child's lastmod is its newest entry's
+            if lastmod and ((cursor and lastmod < cursor) or (since and lastmod < since)):
+                count("sitemaps_skipped")
+                continue
+            yield kind, url, lastmod, None
+            continue
+        if not _in_sections(url, sections):
+            continue
+        if (since or until) and lastmod is None:
+            continue
+        if (since and lastmod < since) or (until and lastmod > until):
+            continue
+        normalized = normalize_url(url)
+        if cursor and lastmod and (lastmod < cursor or (lastmod == cursor and normalized in at_cursor)):
+            continue
+        if normalized in seen:
+            continue
+        seen.add(normalized)
+        yield kind, url, lastmod, normalized
@@ -0,0 +1,197 @@
+"""Pooled asyncio downloader for the bulk article scrapers.
+
+One httpx.AsyncClient keeps connections alive per host, so a long path list
+is fetched over a handful of reused TLS connections instead of one handshake
+per article. Pages come back in completion order. Each request's connect
+(DNS lookup and TCP), TLS, wait-for-first-byte and body phases are timed
+through httpx's trace hook. In head-only mode a page is streamed just until
+its </head> arrives and the connection is dropped, for jobs that only need
+the metadata there.
+"""
+import asyncio
+import queue
+import re
+import threading
+import time
+
+import httpx
+
+from anewz.metrics import count, observe, timed
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/119.0.0.0'
+DEFAULT_CONCURRENCY = 20
+
+# httpcore trace steps -> sub-stages of "download"
+TRACE_STAGES = {
+    "connection.connect_tcp": "download:connect",
+    "connection.start_tls": "download:tls",
+    "http11.receive_response_headers": "download:wait",
+    "http2.receive_response_headers": "download:wait",
+    "http11.receive_response_body": "download:body",
+    "http2.receive_response_body": "download:body",
+}
+
+HEAD_END = re.compile(rb"</head\s*>", re.IGNORECASE)
+# Stop reading a page without </head> after this many bytes
+HEAD_MAX_BYTES = 256 * 1024
+
+_END = object()
+
+
+class _Stopped(Exception):
+    """The consumer of fetch_pages went away."""
+
+
+def _tracer():
+    started = {}
+
+    async def trace(event, info):
+        step, _, phase = event.rpartition(".")
+        stage = TRACE_STAGES.get(step)
+        if stage is None:
+            return
+        if phase == "started":
+            started[step] = time.perf_counter()
+        elif step in started:
+            observe(stage, time.perf_counter() - started.pop(step))
+
+    return trace
+
+
+async def _get(client, url, cache, limits):
+    # The cache is SQLite: its reads and writes run off the loop, so one
+    # lookup never stalls the other connections
+    cached = await asyncio.to_thread(cache.lookup, url) if cache else None
+    headers = cache.conditional_headers(cached) if cached else None
+    with timed("download"):
+        if limits is None:
+            response = await client.get(url, headers=headers, extensions={"trace": _tracer()})
+        else:
+            async with limits.for_url(url).request_async() as outcome:
+                response = await client.get(url, headers=headers, extensions={"trace": _tracer()})
+                outcome.status = response.status_code
+        if not (cached and response.status_code == 304):
+            response.raise_for_status()
+    if cached and response.status_code == 304:
+        count("cache_hits", cache="http")
+        await asyncio.to_thread(cache.touch, url)
+        return cached.body
+    count("cache_misses", cache="http")
+    count("bytes_downloaded", len(response.content), mode="full")
+    if cache:
+        await asyncio.to_thread(cache.store, url, response.text, response.headers.get("ETag"),
+                                response.headers.get("Last-Modified"))
+    return response.text
+
+
+async def _read_head(client, url):
+    """(response, head text); the body after </head> is never read."""
+    chunks, size = [], 0
+    async with client.stream("GET", url, extensions={"trace": _tracer()}) as response:
+        if response.is_success:
+            async for chunk in response.aiter_bytes():
+                chunks.append(chunk)
+                size += len(chunk)
+                # The tag may straddle two chunks, so search the end of the previous one too
+                window = chunks[-2][-16:] + chunk if len(chunks) > 1 else chunk
+                if HEAD_END.search(window) or size >= HEAD_MAX_BYTES:
+                    break
+        encoding = response.charset_encoding or "utf-8"
+    count("bytes_downloaded", size, mode="head")
+    return response, b"".join(chunks).decode(encoding, errors="replace")
+
+
+async def _get_head(client, url, limits):
+    """The page up to and including </head> (or the first HEAD_MAX_BYTES of it)."""
+    with timed("download"):
+        if limits is None:
+            response, head = await _read_head(client, url)
+        else:
+            async with limits.for_url(url).request_async() as outcome:
+                response, head = await _read_head(client, url)
+                outcome.status = response.status_code
+        response.raise_for_status()
+    return head
+
+
+async def _worker(client, pending, emit, cache, limits, head_only):
+    # Workers share one iterator, so at most `concurrency` requests are in flight
+    for url in pending:
+        try:
+            if head_only:
+                html = await _get_head(client, url, limits)
+            else:
+                html = await _get(client, url, cache, limits)
+            item = (url, html, None)
+        except Exception as e:
+            item = (url, None, e)
+        await emit(item)
+
+
+async def fetch_all(urls, emit, concurrency=DEFAULT_CONCURRENCY, timeout=10, headers=None,
+                    cache=None, limits=None, head_only=False):
+    """Downloads every url, awaiting emit((url, html, error)) as each one finishes.
+
+    A slow emit holds its worker, which is how downstream stages push back.
+    With an HttpCache, cached pages are revalidated with conditional requests
+    and a 304 answer returns the stored body. With an AdaptiveConcurrency,
+    `concurrency` is ignored and requests in flight follow its per-host
+    limits instead. With head_only, html is only the page's head and the
+    cache is not used (it holds whole pages).
+    """
+    if limits is not None:
+        concurrency = limits.maximum
+    pool = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    headers = {"User-Agent": USER_AGENT, **(headers or {})}
+    async with httpx.AsyncClient(limits=pool, timeout=timeout, headers=headers,
+                                 follow_redirects=True) as client:
+        pending = iter(urls)
+        await asyncio.gather(*(_worker(client, pending, emit, cache, limits, head_only)
+                               for _ in range(concurrency)))
+
+
+def fetch_pages(urls, concurrency=DEFAULT_CONCURRENCY, timeout=10, headers=None, buffer=0,
+                cache=None, limits=None, head_only=False):
+    """Yields (url, html, error) tuples in completion order.
+
+    The event loop runs on a background thread, so this can be consumed from
+    plain synchronous code such as a Streamlit script. With buffer > 0 at most
+    that many downloaded pages wait for the consumer; downloads pause until
+    it catches up. Closing the generator early stops the downloads.
+    """
+    done = queue.Queue(maxsize=buffer)
+    failure = []
+    stopped = threading.Event()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                done.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+        raise _Stopped()
+
+    async def emit(item):
+        await asyncio.to_thread(put, item)
+
+    def run():
+        try:
+            asyncio.run(fetch_all(urls, emit, concurrency, timeout, headers, cache, limits, head_only))
+        except _Stopped:
+            pass
+        except Exception as e:
+            failure.append(e)
+        finally:
+            if not stopped.is_set():
+                done.put(_END)
+
+    threading.Thread(target=run, daemon=True).start()
+    try:
+        while (item := done.get()) is not _END:
+            yield item
+    finally:
+        # Closing the generator early (a cancelled job) stops the downloads too
+        stopped.set()
+    if failure:
+        raise failure[0]
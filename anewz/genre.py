@@ -0,0 +1,265 @@
+"""Keyword genre classification shared by the categorizer dashboards.
+
+GenreClassifier compiles a genre map once into a single word-boundary regex
+and labels a whole Series per call, first matching genre in map order.
+
+GenreScorer uses the same regex but scores every genre instead: each batch of
+texts becomes a sparse text x keyword matrix (which keywords occur in which
+text), multiplied by a keyword x genre weight matrix built from the map. A
+post about "oil prices at the NATO summit" then scores Economy 2, World 1,
+and the top k genres come back with their scores. Both matrices stay in
+coordinate / CSR form as numpy arrays, so the product is a few vectorised
+operations (a repeat and one bincount) for any number of rows.
+"""
+import hashlib
+import re
+
+import numpy as np
+import pandas as pd
+
+NOT_SPECIFIED = "Not_specified"
+DEFAULT_GENRE = "General"
+
+# Keyword maps, in priority order. Add or change words to match your needs!
+# Keywords match whole words only, so plurals are listed as words of their own.
+# Posts, video titles and URL paths (X, YouTube and web categorizers)
+NEWS_GENRE_MAP = {
+    "World": ["un", "nato", "global", "international", "world", "foreign", "diplomacy"],
+    "Politics": ["election", "elections", "president", "presidents", "minister", "ministers", "parliament",
+                 "parliaments", "government", "governments", "protest", "protests"],
+    "Economy": ["oil", "gas", "price", "prices", "business", "businesses", "market", "markets", "finance",
+                "bank", "banks", "dollar", "dollars"],
+    "Sports": ["football", "goal", "goals", "match", "matches", "league", "leagues", "win", "wins", "player",
+               "players", "tournament", "tournaments"],
+    "Technology": ["ai", "tech", "software", "google", "meta", "cyber", "robot", "robots"],
+    "Region": ["baku", "caucasus", "tbilisi", "karabakh", "central asia"]
+}
+
+# FB/IG/TikTok posts: adds security and culture coverage
+SOCIAL_GENRE_MAP = {
+    "World": ["un", "nato", "global", "international", "world", "foreign", "diplomacy"],
+    "Politics": ["election", "elections", "president", "presidents", "minister", "ministers", "parliament",
+                 "parliaments", "government", "governments", "protest", "protests"],
+    "Conflict & Security": ["strike", "strikes", "military", "targeted", "attack", "attacks", "war", "wars",
+                            "conflict", "conflicts", "security", "base", "bases", "retaliatory", "clash",
+                            "clashes"],
+    "Economy": ["oil", "gas", "price", "prices", "business", "businesses", "market", "markets", "finance",
+                "bank", "banks", "dollar", "dollars"],
+    "Culture": ["cuisine", "art", "arts", "music", "festival", "festivals", "tradition", "traditions", "heritage",
+                "food", "museum", "museums", "history", "cultural"],
+    "Sports": ["football", "goal", "goals", "match", "matches", "league", "leagues", "win", "wins", "player",
+               "players", "tournament", "tournaments"],
+    "Technology": ["ai", "tech", "software", "google", "meta", "cyber", "robot", "robots"],
+    "Region": ["baku", "caucasus", "tbilisi", "karabakh", "central asia"]
+}
+
+# TikTok video titles
+TIKTOK_GENRE_MAP = {
+    "Politics": ["election", "elections", "president", "presidents", "minister", "ministers", "parliament",
+                 "parliaments", "government", "governments", "protest", "protests"],
+    "Economy": ["gas", "oil", "price", "prices", "market", "markets", "finance", "business", "businesses",
+                "dollar", "dollars", "crypto"],
+    "Region": ["caucasus", "karabakh", "baku", "tbilisi", "yerevan", "central asia"],
+    "Sports": ["football", "goal", "goals", "match", "matches", "olympics", "fifa", "score", "scores", "win",
+               "wins"],
+    "Entertainment": ["music", "dance", "dances", "funny", "challenge", "challenges", "movie", "movies", "star",
+                      "stars", "celebrity", "celebrities"]
+}
+
+GENRE_MAPS = {"news": NEWS_GENRE_MAP, "social": SOCIAL_GENRE_MAP, "tiktok": TIKTOK_GENRE_MAP}
+
+# Genres per text kept by GenreScorer.top_k
+TOP_K = 3
+WORD = re.compile(r"\w+")
+
+
+class GenreClassifier:
+    """Keyword matcher built once from a GENRE_MAP.
+
+    Genres keep the priority order of the map: when a text mentions keywords
+    from several genres the first genre in the map wins, like the old per-row
+    detect_genre loops. Keywords only match whole words, so "un" no longer
+    fires on "fun", "ai" not on "said" and "win" not on "wines"; the maps
+    list the plurals they mean to match.
+    """
+
+    def __init__(self, genre_map, default=DEFAULT_GENRE, missing=NOT_SPECIFIED):
+        self.genres = list(genre_map)
+        self.default = default
+        self.missing = missing
+        # Every label classify() can return, in map order: the categories of its output
+        self.labels = list(dict.fromkeys(self.genres + [default, missing]))
+
+        # keyword -> index of the first genre that lists it
+        self._rank = {}
+        for rank, keywords in enumerate(genre_map.values()):
+            for word in keywords:
+                self._rank.setdefault(word.lower(), rank)
+
+        # Longest keywords first so multi-word entries ("central asia") win
+        alternation = "|".join(re.escape(w) for w in sorted(self._rank, key=len, reverse=True))
+        self.pattern = re.compile(rf"\b({alternation})\b", re.IGNORECASE)
+
+        # Changes whenever the map or labels do, so cached genres can be checked
+        self.fingerprint = hashlib.sha1(
+            repr((self.genres, sorted(self._rank.items()), default, missing)).encode()).hexdigest()[:16]
+
+    def _best_rank(self, text):
+        best = None
+        for match in self.pattern.finditer(text):
+            rank = self._rank[match.group(1).lower()]
+            if rank == 0:
+                return 0
+            if best is None or rank < best:
+                best = rank
+        return best
+
+    def _label(self, text):
+        if not text or pd.isna(text):
+            return self.missing
+        rank = self._best_rank(str(text))
+        return self.default if rank is None else self.genres[rank]
+
+    def detect(self, text):
+        """Categorizes a single text."""
+        return self._label(text)
+
+    def classify(self, texts):
+        """Categorizes a whole Series (or list) of texts in one call.
+
+        Duplicate texts are matched only once; the result keeps the input index
+        and is categorical over self.labels, so chunks concatenate cheaply.
+        """
+        if not isinstance(texts, pd.Series):
+            texts = pd.Series(texts, dtype=object)
+        codes, uniques = pd.factorize(texts)
+        position = {label: i for i, label in enumerate(self.labels)}
+        # factorize maps missing values to -1, which picks the trailing entry
+        lookup = np.array([position[self._label(u)] for u in uniques] + [position[self.missing]])
+        return pd.Series(pd.Categorical.from_codes(lookup[codes], self.labels),
+                         index=texts.index, name="Genre")
+
+
+class GenreScorer(GenreClassifier):
+    """Weighted multi-label scorer built once from a GENRE_MAP.
+
+    A map entry is a list of keywords (weight 1 each) or a {keyword: weight}
+    dict; `weights` ({keyword: weight}) overrides the weight of a keyword in
+    every genre that lists it, to tune a map without copying it. A text's
+    score for a genre is the summed weight of the distinct keywords of that
+    genre it mentions, so repeating a word does not inflate it. Ties keep
+    map order, so with the default weights the top genre only differs from
+    GenreClassifier's when another genre has more keyword hits.
+    """
+
+    def __init__(self, genre_map, weights=None, k=TOP_K, default=DEFAULT_GENRE, missing=NOT_SPECIFIED):
+        super().__init__(genre_map, default, missing)
+        self.k = k
+        weights = {" ".join(WORD.findall(word.lower())): weight for word, weight in (weights or {}).items()}
+
+        # Keyword x genre weights as CSR arrays: the genres and weights of
+        # keyword t are genre_ids / values[indptr[t]:indptr[t + 1]]
+        entries = {}
+        for genre_id, keywords in enumerate(genre_map.values()):
+            pairs = keywords.items() if isinstance(keywords, dict) else ((word, 1.0) for word in keywords)
+            for word, weight in pairs:
+                word = " ".join(WORD.findall(word.lower()))
+                entries.setdefault(word, {})[genre_id] = float(weights.get(word, weight))
+        self.terms = pd.Index(sorted(entries))
+        self._longest = max((term.count(" ") + 1 for term in self.terms), default=1)
+        per_term = [sorted(entries[term].items()) for term in self.terms]
+        self._indptr = np.cumsum([0] + [len(genres) for genres in per_term])
+        self._genre_ids = np.array([g for genres in per_term for g, _ in genres], dtype=np.int64)
+        self._values = np.array([w for genres in per_term for _, w in genres], dtype=np.float32)
+
+        self.fingerprint = hashlib.sha1(
+            repr((self.fingerprint, "scored", k, [sorted(entries[t].items()) for t in self.terms])).encode()
+        ).hexdigest()[:16]
+
+    def _term_matrix(self, texts):
+        """(row, term) coordinates of the distinct keywords found in each text.
+
+        Texts are split into lower-case words and the words (and, for
+        multi-word keywords, runs of words) are looked up in the keyword
+        index: the same matches as the classifier's regex, without scanning
+        every text with a long alternation.
+        """
+        tokens = pd.Series(texts, dtype=object).str.lower().str.findall(WORD).explode().dropna()
+        rows = tokens.index.to_numpy(dtype=np.int64)
+        words = tokens.to_numpy(dtype=object)
+        candidates, candidate_rows = [words], [rows]
+        for n in range(2, self._longest + 1):
+            # Runs of n words within one text
+            same = rows[:len(rows) - n + 1] == rows[n - 1:]
+            grams = words[:len(words) - n + 1][same]
+            for shift in range(1, n):
+                grams = grams + " " + words[shift:len(words) - n + 1 + shift][same]
+            candidates.append(grams)
+            candidate_rows.append(rows[:len(rows) - n + 1][same])
+        rows = np.concatenate(candidate_rows)
+        # A batch repeats a few thousand distinct words: look those up once
+        codes, vocabulary = pd.factorize(np.concatenate(candidates))
+        terms = self.terms.get_indexer(vocabulary)[codes]
+        found = terms >= 0
+        pairs = np.unique(rows[found] * len(self.terms) + terms[found])
+        return pairs // len(self.terms), pairs % len(self.terms)
+
+    def _score_matrix(self, texts):
+        """Dense texts x genres float32 scores: term matrix times weight matrix."""
+        rows, terms = self._term_matrix(texts)
+        n_genres = len(self.genres)
+        # Expand every (row, term) into the term's (genre, weight) entries
+        starts, counts = self._indptr[terms], np.diff(self._indptr)[terms]
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        entries = np.repeat(starts, counts) + offsets
+        cells = np.repeat(rows, counts) * n_genres + self._genre_ids[entries]
+        scores = np.bincount(cells, weights=self._values[entries], minlength=len(texts) * n_genres)
+        return scores.astype(np.float32).reshape(len(texts), n_genres)
+
+    def scores(self, texts):
+        """Every genre's score for every text, as a float32 frame on the input index."""
+        if not isinstance(texts, pd.Series):
+            texts = pd.Series(texts, dtype=object)
+        codes, uniques = pd.factorize(texts)
+        # Duplicate texts are scored once; missing ones (code -1) pick the zero row
+        matrix = np.vstack([self._score_matrix(uniques.astype(str)), np.zeros((1, len(self.genres)), np.float32)])
+        return pd.DataFrame(matrix[codes], index=texts.index, columns=self.genres)
+
+    def top_k(self, texts, k=None):
+        """Genre (the best one, categorical like classify()), Genre_Score, and
+        Genres: up to k genres with a positive score, best first, joined by
+        "; ". Texts without any keyword get the default genre and score 0;
+        empty or missing ones get the missing label, as in classify().
+        """
+        k = k or self.k
+        if not isinstance(texts, pd.Series):
+            texts = pd.Series(texts, dtype=object)
+        codes, uniques = pd.factorize(texts)
+        matrix = self._score_matrix(uniques.astype(str))
+        # Stable sort on negated scores: ties keep map order
+        order = np.argsort(-matrix, axis=1, kind="stable")[:, :k]
+        best = np.take_along_axis(matrix, order, axis=1)
+
+        position = {label: i for i, label in enumerate(self.labels)}
+        top = np.where(best[:, 0] > 0, order[:, 0], position[self.default])
+        top[np.array([not text for text in uniques], dtype=bool)] = position[self.missing]
+        genre_codes = np.append(top, position[self.missing])
+        names = np.array(self.genres, dtype=object)
+        # One column per rank: positive ranks are a prefix, since scores are sorted
+        joined = np.where(best[:, 0] > 0, names[order[:, 0]], "")
+        for rank in range(1, order.shape[1]):
+            joined = np.where(best[:, rank] > 0, joined + "; " + names[order[:, rank]], joined)
+        joined = np.append(joined.astype(object), "")
+        score = np.append(best[:, 0], np.float32(0))
+
+        return pd.DataFrame({
+            "Genre": pd.Categorical.from_codes(genre_codes[codes], self.labels),
+            "Genre_Score": score[codes],
+            "Genres": joined[codes],
+        }, index=texts.index)
+
+    def classify(self, texts):
+        return self.top_k(texts, k=1)["Genre"]
+
+    def detect(self, text):
+        return self._label(text) if not text or pd.isna(text) else self.classify([str(text)]).iloc[0]
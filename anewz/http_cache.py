@@ -0,0 +1,157 @@
+"""On-disk HTTP cache with conditional revalidation for article fetches.
+
+Pages are stored in one SQLite file keyed by their normalised URL, together
+with the ETag / Last-Modified validators the server sent. Later fetches send
+If-None-Match / If-Modified-Since, so an unchanged article costs a 304 and no
+body. Parsed rows are stored next to the page, keyed by parser and content
+digest, so an unchanged page is not parsed again either.
+"""
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from collections import namedtuple
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+CACHE_DIR = Path(os.environ.get("ANEWZ_CACHE_DIR", Path.home() / ".cache" / "anewz"))
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512 MB of compressed pages
+DEFAULT_MAX_AGE = 30 * 24 * 3600  # 30 days since the last successful check
+PRUNE_EVERY = 500  # stores between eviction passes
+
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid")
+
+CachedPage = namedtuple("CachedPage", "body etag last_modified digest")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    digest TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    checked_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS parsed (
+    url TEXT NOT NULL,
+    parser TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    row BLOB NOT NULL,
+    PRIMARY KEY (url, parser)
+);
+"""
+
+
+def normalize_url(url):
+    """Cache key for a URL: lower-case host, sorted query, no fragment,
+    default port, tracking parameters or trailing slash.
+    """
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "https").lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and (scheme, parts.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(TRACKING_PARAMS)
+    ))
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def content_digest(text):
+    return hashlib.sha1(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+class HttpCache:
+    """SQLite-backed page and parsed-row cache, safe to share between threads.
+
+    Entries not revalidated within max_age seconds are dropped, and the
+    least recently checked pages go first once the file holds more than
+    max_bytes of compressed bodies.
+    """
+
+    def __init__(self, path=None, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE):
+        path = Path(path or CACHE_DIR / "http.sqlite3")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._stores = 0
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self.prune()
+
+    def lookup(self, url):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT body, etag, last_modified, digest FROM pages WHERE url = ?",
+                (normalize_url(url),)).fetchone()
+        if row is None:
+            return None
+        body, etag, last_modified, digest = row
+        return CachedPage(zlib.decompress(body).decode("utf-8", "surrogatepass"),
+                          etag, last_modified, digest)
+
+    @staticmethod
+    def conditional_headers(page):
+        headers = {}
+        if page.etag:
+            headers["If-None-Match"] = page.etag
+        if page.last_modified:
+            headers["If-Modified-Since"] = page.last_modified
+        return headers
+
+    def store(self, url, body, etag=None, last_modified=None):
+        blob = zlib.compress(body.encode("utf-8", "surrogatepass"))
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (normalize_url(url), blob, etag, last_modified, content_digest(body),
+                 len(blob), time.time()))
+            self._stores += 1
+            due = self._stores % PRUNE_EVERY == 0
+        if due:
+            self.prune()
+
+    def touch(self, url):
+        """Marks a cached page as just revalidated (the server answered 304)."""
+        with self._lock:
+            self._db.execute("UPDATE pages SET checked_at = ? WHERE url = ?",
+                             (time.time(), normalize_url(url)))
+
+    def get_parsed(self, url, parser, digest):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT row FROM parsed WHERE url = ? AND parser = ? AND digest = ?",
+                (normalize_url(url), parser, digest)).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def put_parsed(self, url, parser, digest, row):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO parsed VALUES (?, ?, ?, ?)",
+                             (normalize_url(url), parser, digest, pickle.dumps(row)))
+
+    def prune(self):
+        """Evicts expired pages, then the oldest ones until under max_bytes."""
+        with self._lock:
+            db = self._db
+            db.execute("DELETE FROM pages WHERE checked_at < ?", (time.time() - self.max_age,))
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+            if total > self.max_bytes:
+                excess = total - self.max_bytes
+                for url, size in db.execute("SELECT url, size FROM pages ORDER BY checked_at").fetchall():
+                    db.execute("DELETE FROM pages WHERE url = ?", (url,))
+                    excess -= size
+                    if excess <= 0:
+                        break
+            db.execute("DELETE FROM parsed WHERE url NOT IN (SELECT url FROM pages)")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
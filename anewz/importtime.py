@@ -0,0 +1,66 @@
+"""Import-time report: what each app loads before its first paint.
+
+Every group of modules an app imports at the top is imported in a fresh
+interpreter under `python -X importtime`, so nothing is already cached.
+The report lists the total and the slowest packages. It also flags heavy
+libraries (LAZY) that should only load once a feature uses them, so a
+module-level `import newspaper` creeping back shows up as a failure rather
+than as slower pod starts.
+"""
+import subprocess
+import sys
+
+import pandas as pd
+
+# Modules imported at the top of each kind of app
+APP_MODULES = {
+    "article extractors": ["anewz.articles", "anewz.pipeline", "anewz.columnar", "anewz.http_cache",
+                           "anewz.metrics", "anewz.resources", "anewz.state"],
+    "tiktok extractor": ["anewz.tiktok", "anewz.video_cache", "anewz.columnar", "anewz.metrics"],
+    "comment scrapers": ["anewz.sentiment", "anewz.youtube", "anewz.meta", "anewz.columnar", "anewz.state"],
+    "categorizers": ["anewz.categorize", "anewz.genre", "anewz.csv_stream", "anewz.columnar"],
+}
+# Libraries that must not be imported before a feature needs them (pyarrow is
+# not listed: pandas imports it whenever it is installed)
+LAZY = ("newspaper", "nltk", "yt_dlp", "vaderSentiment")
+
+
+def import_times(modules):
+    """One row per module imported by `import <modules>` in a fresh interpreter:
+    its own and cumulative milliseconds and its nesting depth (0 = top level).
+    """
+    code = "; ".join(f"import {m}" for m in modules) or "pass"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            capture_output=True, text=True, check=False)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        # One leading space, then two per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append({"Module": name.strip(), "Self_ms": int(own) / 1000,
+                     "Cumulative_ms": int(cumulative) / 1000, "Depth": depth})
+    return pd.DataFrame(rows, columns=["Module", "Self_ms", "Cumulative_ms", "Depth"])
+
+
+def report(groups=APP_MODULES, top=5):
+    """Per app group: total import time, the slowest packages, and eagerly loaded LAZY ones."""
+    # What the interpreter imports on its own is not the apps' doing
+    baseline = set(import_times([])["Module"])
+    rows = []
+    for group, modules in groups.items():
+        times = import_times(modules)
+        times = times[~times["Module"].isin(baseline)]
+        packages = times[times["Module"].str.count(r"\.") == 0]
+        eager = sorted({m.split(".")[0] for m in times["Module"]} & set(LAZY))
+        slowest = packages.sort_values("Cumulative_ms", ascending=False).head(top)
+        rows.append({
+            "App": group,
+            "Import_ms": times.loc[times["Depth"] == 0, "Cumulative_ms"].sum(),
+            "Slowest": ", ".join(f"{m} {ms:.0f}ms" for m, ms in zip(slowest["Module"], slowest["Cumulative_ms"])),
+            "Eager_heavy": ", ".join(eager),
+        })
+    return pd.DataFrame(rows)
@@ -0,0 +1,188 @@
+"""Background jobs for the Streamlit dashboards.
+
+A Streamlit script reruns from the top on every widget interaction, so work
+done inside `if st.button(...)` is thrown away by the first click elsewhere,
+and updating a progress bar per item sends one websocket message per item.
+A Job runs the work on a daemon thread and is kept in st.session_state, so
+it outlives reruns. The work reports through the job (rows, counts and a
+status note, all cheap lock-protected updates) and the page redraws from
+`snapshot()` a few times per second in a fragment (`progress_panel`),
+whatever the item rate. Jobs stop at the next item once cancelled, and
+the rows collected so far can be downloaded while the job still runs.
+Rows are kept column by column in a ColumnCollector, not as a dict each.
+"""
+import threading
+import time
+from collections import namedtuple
+
+from anewz.collector import ColumnCollector
+
+RUNNING = "running"
+DONE = "done"
+CANCELLED = "cancelled"
+FAILED = "failed"
+POLL_SECONDS = 0.25  # how often a running job's panel redraws
+
+Snapshot = namedtuple("Snapshot", "status done total failed note elapsed rate error")
+
+
+class Cancelled(Exception):
+    """Raised by Job.check() in the work once the job is cancelled."""
+
+
+class Job:
+    """Runs func(job, *args, **kwargs) on a daemon thread.
+
+    The work calls add() or extend() with result rows, step() per finished
+    item and check() (or reads `cancelled`) between items; whatever it
+    returns is kept as `result`. The work must not call Streamlit itself:
+    everything the page shows comes from snapshot(), frame() and result.
+    `collector` sets how rows are stored (default: a ColumnCollector).
+    """
+
+    def __init__(self, func, *args, total=None, collector=None, **kwargs):
+        self.total = total
+        self.status = RUNNING
+        self.result = None
+        self.error = None
+        self.started = time.perf_counter()
+        self.finished = None
+        self._rows = collector if collector is not None else ColumnCollector()
+        self._done = 0
+        self._failed = 0
+        self._note = ""
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(func, args, kwargs), daemon=True)
+        self._thread.start()
+
+    def _run(self, func, args, kwargs):
+        try:
+            self.result = func(self, *args, **kwargs)
+            status = CANCELLED if self._cancel.is_set() else DONE
+        except Cancelled:
+            status = CANCELLED
+        except Exception as e:
+            self.error = e
+            status = FAILED
+        self.finished = time.perf_counter()
+        self.status = status
+
+    # --- called by the work ---
+
+    def add(self, *rows):
+        with self._lock:
+            self._rows.extend(list(rows))
+
+    def extend(self, rows, constants=None):
+        """Adds rows, each on top of `constants` (see ColumnCollector.extend)."""
+        with self._lock:
+            self._rows.extend(rows, constants)
+
+    def step(self, count=1, failed=0, note=None):
+        with self._lock:
+            self._done += count
+            self._failed += failed
+            if note is not None:
+                self._note = note
+
+    def note(self, text):
+        with self._lock:
+            self._note = text
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def check(self):
+        if self._cancel.is_set():
+            raise Cancelled()
+
+    # --- called by the page ---
+
+    @property
+    def running(self):
+        return self.status == RUNNING
+
+    def cancel(self):
+        self._cancel.set()
+
+    def wait(self, timeout=None):
+        self._thread.join(timeout)
+        return not self.running
+
+    def snapshot(self):
+        with self._lock:
+            done, failed, note = self._done, self._failed, self._note
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        return Snapshot(self.status, done, self.total, failed, note, elapsed,
+                        done / elapsed if elapsed > 0 else 0.0, self.error)
+
+    def frame(self):
+        """The rows added so far as a DataFrame."""
+        with self._lock:
+            return self._rows.frame()
+
+
+def start_job(key, func, *args, total=None, collector=None, **kwargs):
+    """Starts a Job and keeps it in st.session_state[key], cancelling the one it replaces."""
+    import streamlit as st
+
+    previous = st.session_state.get(key)
+    if previous is not None:
+        previous.cancel()
+    st.session_state.pop(f"{key}_partial", None)
+    job = st.session_state[key] = Job(func, *args, total=total, collector=collector, **kwargs)
+    return job
+
+
+def progress_panel(job, key, unit="items", export_format=None, stem="partial_results", partial=None):
+    """Streamlit panel for a job: progress bar, status line, Cancel button and
+    a download of the results so far.
+
+    While the job runs the panel is a fragment that redraws itself every
+    POLL_SECONDS without rerunning the page, and reruns the whole page once
+    the job has ended so the final results are drawn. `partial` returns the
+    results so far as a DataFrame (default: the job's frame()); they are only
+    exported when asked for, not on every redraw. `key` must be unique
+    per page.
+    """
+    import streamlit as st
+
+    from anewz.columnar import LABELS, export, file_name, mime_type
+    from anewz.metrics import timed
+
+    was_running = job.running
+
+    @st.fragment(run_every=POLL_SECONDS if was_running else None)
+    def panel():
+        snap = job.snapshot()
+        if was_running and snap.status != RUNNING:
+            st.rerun()
+        with timed("render"):
+            of_total = f" of {snap.total:,}" if snap.total else ""
+            if snap.total:
+                st.progress(min(snap.done / snap.total, 1.0))
+            line = (f"{snap.status.capitalize()}: {snap.done:,}{of_total} {unit} in {snap.elapsed:.1f}s "
+                    f"({snap.rate:.1f}/s, {snap.failed:,} failed)")
+            st.text(f"{line} · {snap.note}" if snap.note else line)
+            if snap.status == FAILED:
+                st.error(f"The job stopped with an error: {snap.error}")
+            elif snap.status == CANCELLED:
+                st.warning("The job was cancelled; the results so far are kept.")
+
+            if snap.status != RUNNING:
+                return
+            cancel_col, partial_col = st.columns(2)
+            if cancel_col.button("⏹ Cancel", key=f"{key}_cancel"):
+                job.cancel()
+            if export_format is not None and partial_col.button("📸 Export results so far", key=f"{key}_snap"):
+                df = partial() if partial else job.frame()
+                st.session_state[f"{key}_partial"] = (len(df), export(df, export_format))
+            if f"{key}_partial" in st.session_state:
+                rows, data = st.session_state[f"{key}_partial"]
+                partial_col.download_button(f"📥 Download {rows:,} rows as {LABELS[export_format]}", data,
+                                            file_name(stem, export_format), mime_type(export_format),
+                                            key=f"{key}_download")
+
+    panel()
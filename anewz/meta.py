@@ -0,0 +1,229 @@
+"""Comment fetching from the Meta Graph API (Facebook and Instagram).
+
+Requests for up to 50 objects go out as one call to the Graph batch endpoint,
+every comment page is followed through its `after` cursor, and a few batches
+run at once. The X-App-Usage / X-Business-Use-Case-Usage headers feed a
+throttle that cuts concurrency and pauses before Meta starts rejecting calls.
+With a StateStore only comments newer than the last run are fetched
+(`since`, and newest-first paging on Facebook that stops at the first known
+comment); they are merged with the stored ones.
+"""
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from urllib.parse import urlencode
+
+import requests
+
+from anewz.metrics import count, timed
+from anewz.state import meta_kind
+
+GRAPH_URL = "https://graph.facebook.com"
+API_VERSION = "v22.0"
+BATCH_SIZE = 50  # Graph API maximum per batch call
+PAGE_SIZE = 100
+MAX_ATTEMPTS = 3  # per request, for entries Meta returns as null (timed out)
+
+# Instagram uses 'text', Facebook uses 'message'
+FIELDS = {
+    "Instagram": 'text,username,timestamp,like_count',
+    "Facebook": 'message,from,created_time,like_count',
+}
+MESSAGE_FIELD = {"Instagram": "text", "Facebook": "message"}
+TIME_FIELD = {"Instagram": "timestamp", "Facebook": "created_time"}
+
+# Columns of a fetched comment once flattened
+COMMENT_COLUMNS = {
+    "Instagram": ["id", "text", "username", "timestamp", "like_count"],
+    "Facebook": ["id", "message", "created_time", "like_count", "Author_Name", "Author_ID"],
+}
+
+
+class MetaApiError(Exception):
+    pass
+
+
+class UsageThrottle:
+    """Backs off as Meta's rate-limit usage headers approach 100%.
+
+    Usage is the highest percentage reported by either header. Above 50% only
+    half the batches run at once, above 75% one at a time with a short pause,
+    and at 95% (or when Meta reports a time to regain access) calls stop
+    until that time has passed.
+    """
+
+    HALF = 50
+    SLOW = 75
+    STOP = 95
+
+    def __init__(self):
+        self.usage = 0
+        self.resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def update(self, headers):
+        usage, regain_minutes = 0, 0
+        try:
+            app = json.loads(headers.get("x-app-usage") or "{}")
+            usage = max([usage] + [v for v in app.values() if isinstance(v, (int, float))])
+            business = json.loads(headers.get("x-business-use-case-usage") or "{}")
+            for entries in business.values():
+                for entry in entries:
+                    usage = max(usage, entry.get("call_count", 0), entry.get("total_time", 0),
+                                entry.get("total_cputime", 0))
+                    regain_minutes = max(regain_minutes, entry.get("estimated_time_to_regain_access", 0))
+        except (ValueError, AttributeError):
+            return
+        with self._lock:
+            self.usage = usage
+            if regain_minutes:
+                self.resume_at = max(self.resume_at, time.time() + regain_minutes * 60)
+            elif usage >= self.STOP:
+                self.resume_at = max(self.resume_at, time.time() + 60)
+
+    def limit(self, concurrency):
+        if self.usage >= self.SLOW:
+            return 1
+        if self.usage >= self.HALF:
+            return max(1, concurrency // 2)
+        return concurrency
+
+    def pause(self):
+        delay = self.resume_at - time.time()
+        if delay <= 0 and self.usage >= self.SLOW:
+            delay = 1 + (self.usage - self.SLOW) / 5
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _comments_url(obj_id, platform, after=None, since=None):
+    params = {"fields": FIELDS[platform], "limit": PAGE_SIZE}
+    if since is not None:
+        params["since"] = int(since)
+        if platform == "Facebook":
+            params["order"] = "reverse_chronological"
+    if after:
+        params["after"] = after
+    return f"{API_VERSION}/{obj_id}/comments?{urlencode(params)}"
+
+
+def comment_time(comment, platform):
+    """Unix time a comment was posted, or None if Meta did not say."""
+    try:
+        return datetime.strptime(comment[TIME_FIELD[platform]], "%Y-%m-%dT%H:%M:%S%z").timestamp()
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _newest(comments, platform, cursor=None):
+    times = [t for t in (comment_time(c, platform) for c in comments) if t is not None]
+    if cursor is not None:
+        times.append(float(cursor))
+    return str(max(times)) if times else None
+
+
+def _flatten(comment, platform):
+    # Facebook's 'from' dictionary becomes two flat, CSV friendly columns;
+    # the nested dict itself is not kept, one per comment adds up
+    if platform == "Facebook" and 'from' in comment:
+        author = comment.pop('from') or {}
+        comment['Author_Name'] = author.get('name')
+        comment['Author_ID'] = author.get('id')
+    return comment
+
+
+def _post_batch(session, token, batch, throttle):
+    requests_json = [{"method": "GET", "relative_url": url} for _, url, _ in batch]
+    with timed("meta_batch"):
+        response = session.post(GRAPH_URL, timeout=60, data={
+            "access_token": token,
+            "batch": json.dumps(requests_json),
+            "include_headers": "false",
+        })
+        throttle.update(response.headers)
+        payload = response.json()
+    if isinstance(payload, dict) and "error" in payload:
+        raise MetaApiError(payload["error"].get("message"))
+    return payload
+
+
+def get_meta_comments(obj_ids, token, platform, concurrency=4, session=None, throttle=None, state=None):
+    """Fetches every comment of every post or media ID.
+
+    Yields (obj_id, comments, error) once per unique ID as soon as its last
+    page has arrived; `error` is None on success. With a StateStore only
+    comments posted after the previous successful run are fetched, and the
+    yielded list holds the stored comments followed by the new ones.
+    """
+    session = session or requests.Session()
+    throttle = throttle or UsageThrottle()
+    kind = meta_kind(platform)
+    obj_ids = list(dict.fromkeys(obj_ids))
+    since = {k: float(v) for k, v in state.cursors(kind, obj_ids).items()} if state is not None else {}
+    pending = deque((obj_id, _comments_url(obj_id, platform, since=since.get(obj_id)), 1) for obj_id in obj_ids)
+    collected = {}
+    running = {}
+
+    def finish(obj_id, error=None):
+        comments = collected.pop(obj_id, [])
+        if state is None:
+            return obj_id, comments, error
+        # A failed fetch keeps its comments but not its cursor, so they are retried
+        cursor = None if error else _newest(comments, platform, since.get(obj_id))
+        state.record(kind, obj_id, comments, key="id", cursor=cursor)
+        return obj_id, state.rows(kind, obj_id), error
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while pending or running:
+            while pending and len(running) < throttle.limit(concurrency):
+                with timed("meta_throttle"):
+                    throttle.pause()
+                batch = [pending.popleft() for _ in range(min(BATCH_SIZE, len(pending)))]
+                running[pool.submit(_post_batch, session, token, batch, throttle)] = batch
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                batch = running.pop(future)
+                try:
+                    answers = future.result()
+                except Exception as e:
+                    for obj_id, _, _ in batch:
+                        yield finish(obj_id, e)
+                    continue
+
+                for (obj_id, url, attempt), answer in zip(batch, answers):
+                    if answer is None:
+                        # Meta timed this entry out inside the batch
+                        if attempt < MAX_ATTEMPTS:
+                            count("retries", stage="meta_batch")
+                            pending.append((obj_id, url, attempt + 1))
+                        else:
+                            yield finish(obj_id, MetaApiError("Batch request timed out"))
+                        continue
+                    try:
+                        body = json.loads(answer.get("body") or "{}")
+                    except ValueError:
+                        body = {"error": {"message": f"Unreadable response (HTTP {answer.get('code')})"}}
+                    if "error" in body:
+                        yield finish(obj_id, MetaApiError(body["error"].get("message")))
+                        continue
+
+                    page = [_flatten(c, platform) for c in body.get("data", [])]
+                    cutoff = since.get(obj_id)
+                    if cutoff is not None:
+                        fresh = [c for c in page if (comment_time(c, platform) or cutoff + 1) > cutoff]
+                        # Newest-first Facebook pages: an old comment means the rest are old too
+                        reached_known = platform == "Facebook" and len(fresh) < len(page)
+                        page = fresh
+                    else:
+                        reached_known = False
+                    collected.setdefault(obj_id, []).extend(page)
+                    paging = body.get("paging", {})
+                    after = paging.get("cursors", {}).get("after")
+                    if paging.get("next") and after and not reached_known:
+                        pending.append((obj_id, _comments_url(obj_id, platform, after, cutoff), 1))
+                    else:
+                        yield finish(obj_id)
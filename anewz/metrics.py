@@ -0,0 +1,251 @@
+"""Per-stage timings and counters for every pipeline, with a Prometheus export.
+
+Stages are timed with `timed("parse")` (or `observe` for durations measured
+elsewhere) into one histogram per stage; a name like "download:connect"
+marks a part of an enclosing stage; errors, retries and cache hits are
+plain counters. Everything lands in the process-wide METRICS registry, so
+the instrumented code needs no handle passed around. Work done in worker
+processes is shipped back with `call_measured`, which returns the worker's
+metrics next to the result for the parent to merge.
+
+The registry renders in the Prometheus text format (`render`), can be
+scraped over HTTP (`serve`), and summarises into a DataFrame (`stage_table`)
+for the apps' performance panel.
+"""
+import bisect
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+PREFIX = "anewz"
+# Seconds; wide enough for a DNS lookup and a 30s yt-dlp extraction alike
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def add(self, counts, total, count):
+        self.counts = [a + b for a, b in zip(self.counts, counts)]
+        self.total += total
+        self.count += count
+
+    def quantile(self, q):
+        """Estimate from the buckets, interpolating inside the one that holds q."""
+        if not self.count:
+            return 0.0
+        rank, seen, lower = q * self.count, 0, 0.0
+        for upper, n in zip(BUCKETS + (float("inf"),), self.counts):
+            if n and seen + n >= rank:
+                if upper == float("inf"):
+                    return lower
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+            lower = upper
+        return lower
+
+
+class Registry:
+    """Stage histograms and labelled counters, safe to share between threads."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.pid = os.getpid()
+        self._histograms = {}  # stage -> _Histogram
+        self._counters = {}  # (name, sorted label items) -> value
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        slot = bisect.bisect_left(BUCKETS, seconds)
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = _Histogram()
+            histogram.counts[slot] += 1
+            histogram.total += seconds
+            histogram.count += 1
+
+    def count(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    @contextmanager
+    def timed(self, stage):
+        """Times the block into the stage's histogram; an exception also counts an error."""
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.count("errors", stage=stage)
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def snapshot(self, reset=False):
+        """Picklable copy of everything recorded, for merge() in another process."""
+        with self._lock:
+            data = ({stage: (h.counts[:], h.total, h.count) for stage, h in self._histograms.items()},
+                    dict(self._counters))
+            if reset:
+                self._histograms.clear()
+                self._counters.clear()
+        return data
+
+    def merge(self, snapshot):
+        histograms, counters = snapshot
+        with self._lock:
+            for stage, values in histograms.items():
+                self._histograms.setdefault(stage, _Histogram()).add(*values)
+            for key, value in counters.items():
+                self._counters[key] = self._counters.get(key, 0) + value
+
+    def reset(self):
+        self.snapshot(reset=True)
+        self.started = time.time()
+
+    def counter(self, name, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def stage_table(self):
+        """One row per stage: calls, total and mean seconds, p50/p95, errors, and the
+        share of the time recorded by top-level stages (sub-stages are not added twice).
+        """
+        with self._lock:
+            rows = [{
+                "Stage": stage,
+                "Calls": h.count,
+                "Total_s": h.total,
+                "Mean_ms": 1000 * h.total / h.count if h.count else 0.0,
+                "P50_ms": 1000 * h.quantile(0.5),
+                "P95_ms": 1000 * h.quantile(0.95),
+                "Errors": self._counters.get(("errors", (("stage", stage),)), 0),
+            } for stage, h in self._histograms.items()]
+        table = pd.DataFrame(rows, columns=["Stage", "Calls", "Total_s", "Mean_ms", "P50_ms", "P95_ms", "Errors"])
+        total = table.loc[~table["Stage"].str.contains(":"), "Total_s"].sum()
+        table["Share"] = table["Total_s"] / total if total else 0.0
+        return table.sort_values("Total_s", ascending=False, ignore_index=True)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            histograms = {stage: (h.counts[:], h.total, h.count) for stage, h in self._histograms.items()}
+            counters = dict(self._counters)
+        lines = [f"# HELP {PREFIX}_stage_seconds Time spent per pipeline stage.",
+                 f"# TYPE {PREFIX}_stage_seconds histogram"]
+        for stage, (counts, total, count) in sorted(histograms.items()):
+            cumulative = 0
+            for upper, n in zip(BUCKETS + ("+Inf",), counts):
+                cumulative += n
+                lines.append(f'{PREFIX}_stage_seconds_bucket{{stage="{stage}",le="{upper}"}} {cumulative}')
+            lines.append(f'{PREFIX}_stage_seconds_sum{{stage="{stage}"}} {total}')
+            lines.append(f'{PREFIX}_stage_seconds_count{{stage="{stage}"}} {count}')
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+            for (other, labels), value in sorted(counters.items()):
+                if other == name:
+                    rendered = ",".join(f'{k}="{v}"' for k, v in labels)
+                    lines.append(f"{PREFIX}_{name}_total{{{rendered}}} {value}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Registry()
+
+
+def timed(stage):
+    return METRICS.timed(stage)
+
+
+def observe(stage, seconds):
+    METRICS.observe(stage, seconds)
+
+
+def count(name, amount=1, **labels):
+    METRICS.count(name, amount, **labels)
+
+
+def worker_context():
+    """Start method for the worker process pools: forkserver, or spawn where
+    there is none (Windows).
+
+    The pools are started from processes already running threads (the
+    download engine, Streamlit, the metrics server). A plain fork copies
+    whatever lock one of them holds at that moment, METRICS' own included,
+    and the worker hangs on its first use.
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def _portable(error):
+    """The exception itself if it survives the trip to the parent, else a
+    RuntimeError with its type and message (yt-dlp's DownloadError holds a
+    traceback, which cannot be pickled).
+    """
+    try:
+        pickle.loads(pickle.dumps(error))
+    except Exception:
+        return RuntimeError(f"{type(error).__name__}: {error}")
+    return error
+
+
+def call_measured(func, *args):
+    """Runs func in a worker process; returns (result, error, metrics snapshot).
+
+    Exceptions are returned rather than raised so the metrics recorded up to
+    the failure still reach the parent, and always as one that pickles.
+    """
+    if METRICS.pid != os.getpid():
+        # A worker forked from the parent starts with a copy of its metrics; they are not its own
+        METRICS.reset()
+        METRICS.pid = os.getpid()
+    try:
+        result, error = func(*args), None
+    except Exception as e:
+        result, error = None, _portable(e)
+    return result, error, METRICS.snapshot(reset=True)
+
+
+def merge_measured(outcome):
+    """Parent side of call_measured: merges the metrics, returns the result or raises."""
+    result, error, snapshot = outcome
+    METRICS.merge(snapshot)
+    if error is not None:
+        raise error
+    return result
+
+
+def serve(port=9464, registry=METRICS):
+    """Serves /metrics for Prometheus from a daemon thread; returns the server."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
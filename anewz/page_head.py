@@ -0,0 +1,121 @@
+"""Article metadata from the <head> of a page, for headers-only extraction.
+
+News sites put title, author, publication date, section and keywords in
+OpenGraph (og:*), article:* meta tags and JSON-LD for link previews and
+search engines; reading those is enough for header audits and needs neither
+the page body nor newspaper's parse() and nlp(). Meta tags win over JSON-LD,
+which wins over plain <title> / name="author" tags. lxml is imported on
+first use, like the other heavy libraries.
+"""
+import email.utils
+import json
+from datetime import datetime
+
+# JSON-LD types that describe the article itself
+ARTICLE_TYPES = {"Article", "NewsArticle", "ReportageNewsArticle", "AnalysisNewsArticle",
+                 "OpinionNewsArticle", "BlogPosting", "WebPage"}
+# Fields a head must provide, or the page goes through the full pipeline
+REQUIRED = ("title", "published")
+
+
+def _names(value):
+    """Author names from a JSON-LD author: a string, an object or a list of either."""
+    if isinstance(value, list):
+        return [name for item in value for name in _names(item)]
+    if isinstance(value, dict):
+        return [value["name"]] if value.get("name") else []
+    return [value] if isinstance(value, str) and value else []
+
+
+def _ld_article(blocks):
+    """The first JSON-LD object describing an article, searching @graph lists too."""
+    stack = []
+    for block in blocks:
+        try:
+            stack.append(json.loads(block))
+        except ValueError:
+            continue
+    while stack:
+        item = stack.pop(0)
+        if isinstance(item, list):
+            stack.extend(item)
+        elif isinstance(item, dict):
+            types = item.get("@type")
+            types = set(types) if isinstance(types, list) else {types}
+            if types & ARTICLE_TYPES and (item.get("headline") or item.get("datePublished")):
+                return item
+            stack.extend(item.get("@graph", []))
+    return {}
+
+
+def parse_date(value):
+    """ISO 8601 or RFC 2822 dates as datetime, like newspaper's publish_date.
+
+    Anything else is None, so the Date column stays one type (Parquet and
+    Arrow refuse a mix) and the page is parsed in full for its date instead.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        pass
+    try:
+        return email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def head_metadata(html):
+    """Title, author(s), published date, section, keywords and description of a page
+    from its head (a whole page works too). Missing fields are None or [].
+    """
+    import lxml.html
+
+    try:
+        doc = lxml.html.document_fromstring(html)
+    except Exception:
+        return {"title": None, "authors": [], "published": None, "section": None, "keywords": [],
+                "description": None}
+
+    meta = {}
+    for tag in doc.iter("meta"):
+        key = (tag.get("property") or tag.get("name") or "").strip().lower()
+        content = (tag.get("content") or "").strip()
+        if key and content:
+            meta.setdefault(key, []).append(content)
+
+    def first(*keys):
+        for key in keys:
+            if meta.get(key):
+                return meta[key][0]
+        return None
+
+    ld = _ld_article(script.text for script in doc.iter("script")
+                     if (script.get("type") or "").lower() == "application/ld+json" and script.text)
+    title_tag = doc.find(".//title")
+
+    authors = [a for a in meta.get("article:author", []) if not a.startswith("http")] \
+        or _names(ld.get("author")) or meta.get("author", [])
+    keywords = meta.get("article:tag") or ld.get("keywords") or first("news_keywords", "keywords") or []
+    if isinstance(keywords, str):
+        keywords = [k.strip() for k in keywords.split(",") if k.strip()]
+    section = first("article:section") or ld.get("articleSection")
+    if isinstance(section, list):
+        section = section[0] if section else None
+
+    return {
+        "title": first("og:title", "twitter:title") or ld.get("headline")
+        or (title_tag.text_content().strip() if title_tag is not None else None) or None,
+        "authors": authors,
+        "published": parse_date(first("article:published_time", "og:published_time", "datepublished")
+                                or ld.get("datePublished")),
+        "section": section,
+        "keywords": keywords,
+        "description": first("og:description", "description", "twitter:description") or ld.get("description"),
+    }
+
+
+def is_complete(metadata):
+    return all(metadata.get(field) for field in REQUIRED)
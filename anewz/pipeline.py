@@ -0,0 +1,159 @@
+"""Two-stage article pipeline: pooled downloads feed a process pool of parsers.
+
+newspaper's parse() and nlp() are CPU-bound, so running them in the download
+threads serialises everything on the GIL. Here the async engine only moves
+bytes, and parsing is spread over one process per core. Both hand-offs are
+bounded, so a slow parse stage pauses downloading instead of piling up HTML.
+With dedupe, pages are fingerprinted in the parent as they arrive and only
+the first page of each near-duplicate cluster is parsed; syndicated copies
+reuse its row. With a StateStore, pages whose content is unchanged since
+the last run reuse the row recorded then.
+
+scrape_headers is the metadata-only variant: it reads just the head of each
+page and builds rows from its OpenGraph, article:* and JSON-LD tags, which
+is cheap enough to do in the parent. Only pages whose head lacks a title or
+date go through scrape_articles afterwards.
+"""
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from anewz.articles import head_row, head_row_details, parse_article, parse_article_details, rebase_row
+from anewz.dedupe import NearDuplicateIndex, page_cluster
+from anewz.fetch import DEFAULT_CONCURRENCY, fetch_pages
+from anewz.http_cache import content_digest, normalize_url
+from anewz.metrics import call_measured, count, merge_measured, timed, worker_context
+from anewz.page_head import head_metadata, is_complete
+from anewz.state import ARTICLE
+
+
+def article_kind(parse):
+    """StateStore kind for rows made by a parse function; rows differ per parser."""
+    return f"{ARTICLE}:{parse.__module__}.{parse.__qualname__}"
+
+
+def scrape_articles(urls, concurrency=DEFAULT_CONCURRENCY, processes=None, timeout=10,
+                    parse=parse_article, cache=None, limits=None, dedupe=False, state=None):
+    """Yields (url, row, error) tuples in completion order.
+
+    `parse(url, html)` runs in the worker processes, so it must be a
+    module-level function. At most two pages per process are queued for
+    parsing and as many again wait in the download buffer. With an
+    HttpCache, pages whose content was already parsed by the same function
+    are answered from the cache without touching the pool. `limits` (an
+    AdaptiveConcurrency) replaces the fixed connection count. With dedupe,
+    rows carry a Cluster_ID and near-duplicate pages copy the row of the
+    first page in their cluster instead of being parsed. With a
+    StateStore, every row is recorded with its page's digest and unchanged
+    pages are answered from it.
+    """
+    processes = processes or os.cpu_count() or 1
+    max_pending = processes * 2
+    parser = f"{parse.__module__}.{parse.__qualname__}"
+    kind = article_kind(parse)
+    pending = {}
+    index = NearDuplicateIndex() if dedupe else None
+    parsed = {}  # cluster -> (row, error) of its first page
+    waiting = {}  # cluster -> copies that arrived while its first page was parsing
+
+    def remember(url, row, digest):
+        if state is not None and row is not None:
+            state.record(kind, normalize_url(url), [row], digest=digest)
+
+    def clustered(url, row, cluster):
+        # Every row gets the column; pages too short to fingerprint get None
+        if index is None or row is None:
+            return row
+        return {**rebase_row(row, url), "Cluster_ID": cluster}
+
+    def settle(cluster, row, error):
+        """Rows for the copies that were waiting on a cluster's first page."""
+        if cluster is None:
+            return
+        parsed[cluster] = row, error
+        for url in waiting.pop(cluster, ()):
+            yield url, clustered(url, row, cluster), error
+
+    def outcome(future):
+        url, digest, cluster = pending.pop(future)
+        try:
+            row = merge_measured(future.result())
+        except Exception as e:
+            yield url, None, e
+            yield from settle(cluster, None, e)
+            return
+        if cache is not None and row is not None:
+            cache.put_parsed(url, parser, digest, row)
+        remember(url, row, digest)
+        yield url, clustered(url, row, cluster), None
+        yield from settle(cluster, row, None)
+
+    # Not forked: the caller's threads may hold locks the workers would inherit
+    with ProcessPoolExecutor(max_workers=processes, mp_context=worker_context()) as pool:
+        pages = fetch_pages(urls, concurrency, timeout, buffer=max_pending, cache=cache, limits=limits)
+        for url, html, error in pages:
+            if html is None:
+                yield url, None, error
+                continue
+            cluster = page_cluster(index, html) if index is not None else None
+            if cluster in parsed:
+                count("duplicates_skipped", stage="parse")
+                # A copy of a page that failed to parse fails with its error
+                row, error = parsed[cluster]
+                yield url, clustered(url, row, cluster), error
+                continue
+            if cluster in waiting:
+                waiting[cluster].append(url)
+                continue
+            digest = content_digest(html)
+            row = cache.get_parsed(url, parser, digest) if cache is not None else None
+            if row is None and state is not None:
+                row = state.unchanged_row(kind, normalize_url(url), digest)
+            if row is not None:
+                count("cache_hits", cache="parsed")
+                remember(url, row, digest)
+                yield url, clustered(url, row, cluster), None
+                if cluster is not None:
+                    parsed[cluster] = row, None
+                continue
+            if len(pending) >= max_pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    yield from outcome(future)
+            if cluster is not None:
+                waiting[cluster] = []
+            # The worker's parse/nlp timings come back with its row
+            pending[pool.submit(call_measured, parse, url, html)] = (url, digest, cluster)
+
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                yield from outcome(future)
+
+
+def scrape_headers(urls, detailed=False, concurrency=DEFAULT_CONCURRENCY, processes=None, timeout=10,
+                   cache=None, limits=None):
+    """Yields (url, row, error) tuples like scrape_articles, from page heads only.
+
+    Rows have the columns of parse_article, or of parse_article_details with
+    `detailed`, but come from the page's meta tags, so Summary is the page's
+    description rather than newspaper's nlp() summary. Pages whose head has
+    no title or publication date are downloaded in full and parsed by
+    scrape_articles once every head is in; `cache` only serves those.
+    """
+    build = head_row_details if detailed else head_row
+    fallback = []
+    for url, head, error in fetch_pages(urls, concurrency, timeout, limits=limits, head_only=True):
+        if head is None:
+            yield url, None, error
+            continue
+        with timed("head_parse"):
+            metadata = head_metadata(head)
+        if is_complete(metadata):
+            yield url, build(metadata, url), None
+        else:
+            fallback.append(url)
+
+    if fallback:
+        count("fallbacks", len(fallback), stage="head_parse")
+        parse = parse_article_details if detailed else parse_article
+        yield from scrape_articles(fallback, concurrency, processes, timeout, parse, cache, limits)
@@ -0,0 +1,45 @@
+"""Local NLTK data for newspaper's nlp(), found without touching the network.
+
+The punkt tokenizers are read from a vendored data directory (nltk_data/ at
+the repository root, or $ANEWZ_NLTK_DATA) that is filled once, when the
+image is built, with `python -m anewz nltk-data`. At run time the apps only
+check that the files are there, so a cold start never waits on (or fails
+without) nltk.download().
+"""
+import os
+import sys
+from pathlib import Path
+
+NLTK_DATA_DIR = Path(os.environ.get("ANEWZ_NLTK_DATA", Path(__file__).resolve().parents[1] / "nltk_data"))
+# NLTK package -> path its resources are loaded from
+NLTK_PACKAGES = {
+    "punkt": "tokenizers/punkt",
+    "punkt_tab": "tokenizers/punkt_tab",
+}
+
+
+def use_local_nltk_data():
+    """Puts the vendored directory first on NLTK's search path, before or after
+    nltk is imported; child processes inherit it through the environment.
+    """
+    path = str(NLTK_DATA_DIR)
+    search = os.environ.get("NLTK_DATA", "").split(os.pathsep)
+    if path not in search:
+        os.environ["NLTK_DATA"] = os.pathsep.join([path] + [p for p in search if p])
+    nltk = sys.modules.get("nltk")
+    if nltk is not None and path not in nltk.data.path:
+        nltk.data.path.insert(0, path)
+
+
+def missing_nltk_data():
+    """NLTK packages absent from the vendored directory (a few stat calls)."""
+    return [name for name, resource in NLTK_PACKAGES.items()
+            if not (NLTK_DATA_DIR / resource).exists() and not (NLTK_DATA_DIR / f"{resource}.zip").exists()]
+
+
+def download_nltk_data(packages=NLTK_PACKAGES):
+    """Fills the vendored directory; for image builds, never for app start."""
+    import nltk
+
+    NLTK_DATA_DIR.mkdir(parents=True, exist_ok=True)
+    return {name: nltk.download(name, download_dir=str(NLTK_DATA_DIR), quiet=True) for name in packages}
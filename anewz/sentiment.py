@@ -0,0 +1,150 @@
+"""Batch VADER sentiment scoring shared by the comment scrapers.
+
+Texts are de-duplicated against an LRU memo of compound scores before any
+scoring happens, and large batches of new texts are sharded across a process
+pool with one analyzer per worker. vaderSentiment is imported and its lexicon
+loaded on first use, once per process: the pool lives as long as the process,
+so each worker loads it once. The memo and the pool are shared by every job
+of the process and are safe to use from several threads. Scoring runs as its
+own stage after the comments are fetched. With dedupe=True, near-duplicate
+texts (copy-pasted comments with small edits) are scored once through their
+cluster's first member; see anewz.dedupe.
+"""
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from anewz.dedupe import near_duplicate_clusters, representatives
+from anewz.metrics import count, timed, worker_context
+
+POSITIVE = 0.05
+NEGATIVE = -0.05
+SENTIMENTS = ["Positive", "Neutral", "Negative"]
+MEMO_SIZE = 200_000
+POOL_THRESHOLD = 5_000  # fewer new texts than this are scored in-process
+SHARD_SIZE = 2_000
+
+_analyzer = None
+_pool = None  # (processes, executor), reused by every batch
+_pool_lock = threading.Lock()
+
+
+def get_analyzer():
+    """The per-process analyzer; the lexicon is loaded only once."""
+    global _analyzer
+    if _analyzer is None:
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+        _analyzer = SentimentIntensityAnalyzer()
+    return _analyzer
+
+
+def _pool_map(processes, shards):
+    """Scores of the shards from the shared pool, restarted for another size.
+
+    The shards are submitted before the lock is released, so a batch asking
+    for another size cannot shut the pool down in between; work already
+    submitted to an old pool still finishes.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool[0] != processes:
+            if _pool is not None:
+                _pool[1].shutdown(wait=False)
+            _pool = (processes, ProcessPoolExecutor(max_workers=processes, mp_context=worker_context(),
+                                                    initializer=get_analyzer))
+        return _pool[1].map(_score_shard, shards)
+
+
+def _score_shard(texts):
+    analyzer = get_analyzer()
+    return [analyzer.polarity_scores(text)['compound'] for text in texts]
+
+
+class _ScoreMemo:
+    """Least-recently-used map of text -> compound score, shared by threads."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._scores = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, text):
+        with self._lock:
+            score = self._scores.get(text)
+            if score is not None:
+                self._scores.move_to_end(text)
+            return score
+
+    def put(self, text, score):
+        with self._lock:
+            self._scores[text] = score
+            self._scores.move_to_end(text)
+            if len(self._scores) > self.maxsize:
+                self._scores.popitem(last=False)
+
+
+_memo = _ScoreMemo(MEMO_SIZE)
+
+
+def _score_new(texts, processes):
+    processes = processes or os.cpu_count() or 1
+    if len(texts) < POOL_THRESHOLD or processes == 1:
+        return _score_shard(texts)
+    shards = [texts[i:i + SHARD_SIZE] for i in range(0, len(texts), SHARD_SIZE)]
+    return [score for shard in _pool_map(processes, shards) for score in shard]
+
+
+def categorize(compound):
+    if compound >= POSITIVE:
+        return "Positive"
+    elif compound <= NEGATIVE:
+        return "Negative"
+    return "Neutral"
+
+
+def score_sentiment(texts, processes=None, dedupe=False):
+    """Scores a list or Series of texts in one batch.
+
+    Returns a DataFrame aligned with the input holding the compound score
+    (Sentiment_Score) and its category (Sentiment, categorical over
+    SENTIMENTS). Empty or missing texts are Neutral with a score of 0.
+    With dedupe, near-duplicates share their representative's score and a
+    Cluster_ID column is added.
+    """
+    if not isinstance(texts, pd.Series):
+        texts = pd.Series(texts, dtype=object)
+    if dedupe:
+        with timed("dedupe"):
+            clusters = near_duplicate_clusters(texts)
+        scored = score_sentiment(texts.iloc[representatives(clusters)], processes)
+        scored = scored.iloc[clusters.to_numpy()].set_axis(texts.index)
+        scored["Cluster_ID"] = clusters
+        return scored
+    codes, uniques = pd.factorize(texts)
+    keys = [str(text) if text else "" for text in uniques]
+
+    scores = {"": 0.0}
+    new = []
+    for key in keys:
+        if key not in scores:
+            scores[key] = _memo.get(key)
+            if scores[key] is None:
+                new.append(key)
+    count("cache_hits", len(keys) - len(new), cache="sentiment")
+    count("cache_misses", len(new), cache="sentiment")
+    with timed("sentiment"):
+        scored = _score_new(new, processes)
+    for key, score in zip(new, scored):
+        scores[key] = score
+        _memo.put(key, score)
+
+    # factorize maps missing values to -1, which picks the trailing 0.0
+    values = np.array([scores[key] for key in keys] + [0.0])[codes]
+    labels = np.select([values >= POSITIVE, values <= NEGATIVE], [0, 2], 1)
+    return pd.DataFrame({"Sentiment_Score": values,
+                         "Sentiment": pd.Categorical.from_codes(labels, SENTIMENTS)}, index=texts.index)
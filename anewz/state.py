@@ -0,0 +1,142 @@
+"""Processed-items state for delta runs over the same monitoring lists.
+
+One SQLite file next to the HTTP cache remembers, for every item of a kind
+(article URL, TikTok video, YouTube video, Facebook or Instagram post), when
+it was last processed, a cursor (the newest comment time seen) or content
+digest, and the result rows it produced. A delta run fetches only what is
+newer than the cursor or differs from the digest, records the new rows,
+and hands back stored and new rows merged, so the daily run of the same
+list pays only for what changed since the day before.
+"""
+import pickle
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+
+from anewz.http_cache import CACHE_DIR
+
+ARTICLE = "article"
+TIKTOK = "tiktok"
+YOUTUBE = "youtube"
+
+ItemState = namedtuple("ItemState", "cursor digest processed_at")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    kind TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    cursor TEXT,
+    digest TEXT,
+    processed_at REAL NOT NULL,
+    PRIMARY KEY (kind, item_id)
+);
+CREATE TABLE IF NOT EXISTS results (
+    kind TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    row_key TEXT NOT NULL,
+    row BLOB NOT NULL,
+    PRIMARY KEY (kind, item_id, row_key)
+);
+"""
+
+
+def meta_kind(platform):
+    return f"meta:{platform.lower()}"
+
+
+class StateStore:
+    """SQLite record of processed items and their rows, safe to share between threads.
+
+    Rows are stored per item under a key (a comment ID; items with a single
+    row, like articles, use one empty key), so recording a fetch that
+    overlaps an earlier one updates those rows instead of repeating them.
+    """
+
+    def __init__(self, path=None):
+        path = Path(path or CACHE_DIR / "state.sqlite3")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def get(self, kind, item_id):
+        """ItemState of a processed item, or None if it was never processed."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT cursor, digest, processed_at FROM items WHERE kind = ? AND item_id = ?",
+                (kind, str(item_id))).fetchone()
+        return ItemState(*row) if row else None
+
+    def cursors(self, kind, item_ids):
+        """{item_id: cursor} for the given items that have one."""
+        found = {}
+        for item_id in item_ids:
+            state = self.get(kind, item_id)
+            if state and state.cursor is not None:
+                found[item_id] = state.cursor
+        return found
+
+    def rows(self, kind, item_id):
+        """Stored rows of one item, oldest first."""
+        with self._lock:
+            blobs = self._db.execute(
+                "SELECT row FROM results WHERE kind = ? AND item_id = ? ORDER BY rowid",
+                (kind, str(item_id))).fetchall()
+        return [pickle.loads(blob) for blob, in blobs]
+
+    def unchanged_row(self, kind, item_id, digest):
+        """The stored single row of an item whose content digest still matches."""
+        state = self.get(kind, item_id)
+        if state is None or state.digest != digest:
+            return None
+        rows = self.rows(kind, item_id)
+        return rows[0] if rows else None
+
+    def record(self, kind, item_id, rows=(), key=None, cursor=None, digest=None):
+        """Stores an item's rows and marks it processed; returns the rows not seen before.
+
+        With a `key` field, rows are merged with the stored ones by that field;
+        without one they replace them. A None cursor or digest keeps the
+        stored value, so a failed fetch does not move the cursor.
+        """
+        item_id = str(item_id)
+        with self._lock, self._db:
+            db = self._db
+            db.execute("BEGIN")
+            if key is None:
+                db.execute("DELETE FROM results WHERE kind = ? AND item_id = ?", (kind, item_id))
+                new = list(rows)
+                keyed = [("", row) for row in new[:1]]
+            else:
+                known = {k for k, in db.execute(
+                    "SELECT row_key FROM results WHERE kind = ? AND item_id = ?", (kind, item_id))}
+                keyed = [(str(row.get(key)), row) for row in rows]
+                new = [row for row_key, row in keyed if row_key not in known]
+            db.executemany(
+                "INSERT INTO results VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (kind, item_id, row_key) DO UPDATE SET row = excluded.row",
+                [(kind, item_id, row_key, pickle.dumps(row)) for row_key, row in keyed])
+            db.execute(
+                "INSERT INTO items VALUES (?, ?, ?, ?, ?) ON CONFLICT (kind, item_id) DO UPDATE SET "
+                "cursor = COALESCE(excluded.cursor, cursor), digest = COALESCE(excluded.digest, digest), "
+                "processed_at = excluded.processed_at",
+                (kind, item_id, cursor, digest, time.time()))
+        return new
+
+    def forget(self, kind, item_ids=None):
+        """Drops the state of some items, or of a whole kind, for a full refresh."""
+        with self._lock, self._db:
+            if item_ids is None:
+                self._db.execute("DELETE FROM items WHERE kind = ?", (kind,))
+                self._db.execute("DELETE FROM results WHERE kind = ?", (kind,))
+                return
+            for item_id in item_ids:
+                self._db.execute("DELETE FROM items WHERE kind = ? AND item_id = ?", (kind, str(item_id)))
+                self._db.execute("DELETE FROM results WHERE kind = ? AND item_id = ?", (kind, str(item_id)))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,287 @@
+"""TikTok oEmbed lookups for the video title extractor.
+
+One TikTokClient serves a whole batch: a shared session, a token bucket
+keeping every thread under RATE requests per second, jittered exponential
+retries for 429/5xx and dropped connections, and coalescing so that the
+URLs of a batch pointing at the same video (short links, query strings,
+mobile hosts) share one request. Each URL comes back with its row or the
+reason it failed.
+With a VideoCache, videos seen in earlier runs skip the network altogether;
+with a StateStore (delta runs), videos processed by any earlier run do too,
+however old their cache entry.
+"""
+import random
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from anewz.concurrency import TokenBucket
+from anewz.genre import TIKTOK_GENRE_MAP, GenreClassifier
+from anewz.metrics import count, timed
+from anewz.state import TIKTOK
+
+OEMBED_URL = "https://www.tiktok.com/oembed"
+TIMEOUT = 5
+RATE = 10  # oEmbed requests per second across all threads
+BURST = 20
+MAX_ATTEMPTS = 4
+BACKOFF = 0.5  # seconds; the retry delay is uniform in [0, BACKOFF * 2**attempt)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+SHORT_HOSTS = ("vm.tiktok.com", "vt.tiktok.com")
+VIDEO_PATH = re.compile(r"^/(?:(@[^/]+)/)?(?:video|photo)/(\d+)")
+
+# "General" is the default if no keywords match
+genre_classifier = GenreClassifier(TIKTOK_GENRE_MAP, missing="General")
+
+
+class TikTokError(Exception):
+    """A lookup that failed for good; the message is the reason shown per URL."""
+
+
+class VideoUnavailable(TikTokError):
+    """TikTok answered, but has no such public video; safe to cache briefly."""
+
+
+def _split(url):
+    url = url.strip()
+    if "://" not in url:
+        url = "https://" + url
+    parts = urlsplit(url)
+    host = parts.netloc.lower().split(":")[0]
+    if host.startswith("m."):
+        host = "www." + host[2:]
+    return host, parts.path.rstrip("/")
+
+
+def video_key(url):
+    """(key, oEmbed URL) for a TikTok link; the oEmbed URL is None for short links.
+
+    Query strings, fragments, mobile hosts and trailing slashes all collapse
+    to the same key. Short links (vm./vt.tiktok.com, tiktok.com/t/...) are
+    keyed by their own path until they are resolved.
+    """
+    host, path = _split(url)
+    if not (host == "tiktok.com" or host.endswith(".tiktok.com")):
+        raise TikTokError("Not a TikTok URL")
+    if host in SHORT_HOSTS or path.startswith("/t/"):
+        return f"short:{host}{path}", None
+    match = VIDEO_PATH.match(path)
+    if not match:
+        raise TikTokError("No video ID in URL")
+    user, video_id = match.groups()
+    return f"video:{video_id}", f"https://www.tiktok.com/{user or '@'}/video/{video_id}"
+
+
+def _stage(method):
+    return "oembed_request" if method == "GET" else "resolve_short_link"
+
+
+def _retry_after(response):
+    try:
+        return min(float(response.headers.get("Retry-After", "")), 60.0)
+    except ValueError:
+        return None
+
+
+class TikTokClient:
+    """Rate-limited, retrying, coalescing oEmbed client shared by worker threads.
+
+    With an AdaptiveConcurrency each attempt also waits for a slot under its
+    limit; with a VideoCache, cached videos and short links are answered
+    without a request.
+    """
+
+    def __init__(self, rate=RATE, burst=BURST, classifier=genre_classifier, limits=None, pool_size=32,
+                 cache=None):
+        self.bucket = TokenBucket(rate, burst)
+        self.classifier = classifier
+        self.limits = limits
+        self.cache = cache
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=pool_size))
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def _once(self, key, func, *args):
+        """Runs func once per key at a time; concurrent callers share its result.
+
+        Nothing is kept once the call is over: a later failure is retried, and
+        repeats of a finished video are the VideoCache's job.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            owner = future is None
+            if owner:
+                future = self._calls[key] = Future()
+        if owner:
+            try:
+                future.set_result(func(*args))
+            except Exception as exc:
+                future.set_exception(exc)
+            finally:
+                with self._lock:
+                    del self._calls[key]
+        return future.result()
+
+    def _send(self, method, url, **kwargs):
+        """One rate-limited attempt; returns (response, reason to retry)."""
+        with timed("rate_limit_wait"):
+            self.bucket.acquire()
+        try:
+            with timed(_stage(method)):
+                if self.limits is None:
+                    response = self.session.request(method, url, timeout=TIMEOUT, **kwargs)
+                else:
+                    with self.limits.for_url(url).request() as outcome:
+                        response = self.session.request(method, url, timeout=TIMEOUT, **kwargs)
+                        outcome.status = response.status_code
+        except requests.Timeout:
+            return None, "Timed out"
+        except requests.ConnectionError:
+            return None, "Connection failed"
+        if response.status_code in RETRY_STATUSES:
+            count("errors", stage=_stage(method))
+            delay = _retry_after(response)
+            if delay:
+                self.bucket.pause(delay)
+            return response, f"HTTP {response.status_code}"
+        return response, None
+
+    def _request(self, method, url, **kwargs):
+        for attempt in range(MAX_ATTEMPTS):
+            response, reason = self._send(method, url, **kwargs)
+            if reason is None:
+                return response
+            if attempt + 1 < MAX_ATTEMPTS:
+                count("retries", stage=_stage(method))
+                delay = _retry_after(response) if response is not None else None
+                time.sleep(delay or random.uniform(0, BACKOFF * 2 ** attempt))
+        raise TikTokError(f"{reason} after {MAX_ATTEMPTS} attempts")
+
+    def _resolve(self, short_url):
+        response = self._request("HEAD", short_url, allow_redirects=True)
+        key, oembed_url = video_key(response.url)
+        if oembed_url is None:
+            raise VideoUnavailable("Short link did not lead to a video")
+        return key, oembed_url
+
+    def _fetch(self, oembed_url):
+        # Secret API for fast TikTok titles
+        response = self._request("GET", OEMBED_URL, params={"url": oembed_url})
+        if response.status_code in (400, 404):
+            raise VideoUnavailable("Video unavailable, private or removed")
+        if response.status_code != 200:
+            raise TikTokError(f"HTTP {response.status_code}")
+        try:
+            data = response.json()
+        except ValueError:
+            raise TikTokError("oEmbed response was not JSON")
+        title = data.get('title', 'N/A')
+
+        # Clean title (TikTok often adds "TikTok - ..." to titles)
+        clean_title = title.split(" TikTok")[0]
+
+        return {
+            "Genre": self.classifier.detect(clean_title),
+            "Title": clean_title,
+            "Author": data.get('author_name', 'N/A'),
+        }
+
+    def _cached(self, key):
+        hit = self.cache.get(key, self.classifier) if self.cache is not None else None
+        if hit is not None and hit[0] is None:
+            raise VideoUnavailable(hit[1])
+        return hit and hit[0]
+
+    def _load(self, key, oembed_url, aliases=()):
+        """Row for one video from the cache, or fetched and cached on a miss."""
+        row = self._cached(key)
+        if row is not None:
+            return row
+        try:
+            row = self._fetch(oembed_url)
+        except VideoUnavailable as exc:
+            if self.cache is not None:
+                self.cache.put(key, error=str(exc), aliases=aliases)
+            raise
+        if self.cache is not None:
+            self.cache.put(key, row, classifier=self.classifier, aliases=aliases)
+        return row
+
+    def _load_short(self, short_key, short_url):
+        row = self._cached(short_key)
+        if row is not None:
+            return row
+        try:
+            key, oembed_url = self._resolve(short_url)
+        except VideoUnavailable as exc:
+            if self.cache is not None:
+                self.cache.put(short_key, error=str(exc))
+            raise
+        return self._once(key, self._load, key, oembed_url, (short_key,))
+
+    def lookup(self, url):
+        """(row, None) for one URL, or (None, reason) if the lookup failed."""
+        try:
+            key, oembed_url = video_key(url)
+            if oembed_url is None:
+                row = self._once(key, self._load_short, key, url if "://" in url else "https://" + url)
+            else:
+                row = self._once(key, self._load, key, oembed_url)
+        except TikTokError as exc:
+            return None, str(exc)
+        except Exception as exc:
+            return None, f"{type(exc).__name__}: {exc}"
+        return {**row, "URL": url}, None
+
+
+def get_tiktok_data(url, classifier=genre_classifier, limits=None, client=None):
+    """Title, author and genre of one video, or None if the lookup failed."""
+    client = client or TikTokClient(classifier=classifier, limits=limits)
+    return client.lookup(url)[0]
+
+
+def fetch_tiktok(urls, workers=10, client=None, state=None):
+    """Yields (url, row, error) for every input URL, in completion order.
+
+    URLs that are plainly the same video share one job before anything is
+    submitted, so duplicates never hold a worker thread; short links are
+    coalesced with the rest once they resolve. With a StateStore, videos
+    recorded by an earlier run are answered first, from the store.
+    """
+    client = client or TikTokClient(pool_size=workers)
+    groups = {}
+    for url in urls:
+        try:
+            key = video_key(url)[0]
+        except TikTokError:
+            key = f"bad:{url}"
+        groups.setdefault(key, []).append(url)
+
+    if state is not None:
+        for key, same in list(groups.items()):
+            stored = state.rows(TIKTOK, key)
+            if stored:
+                del groups[key]
+                for url in same:
+                    yield url, {**stored[0], "URL": url}, None
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(client.lookup, same[0]): (key, same) for key, same in groups.items()}
+        try:
+            for future in as_completed(futures):
+                row, error = future.result()
+                key, same = futures[future]
+                if state is not None and row is not None:
+                    state.record(TIKTOK, key, [{k: v for k, v in row.items() if k != "URL"}])
+                for url in same:
+                    yield url, (row and {**row, "URL": url}), error
+        finally:
+            # Closed early (a cancelled job): drop the lookups not started yet
+            executor.shutdown(cancel_futures=True)
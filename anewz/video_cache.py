@@ -0,0 +1,112 @@
+"""Two-tier cache of TikTok oEmbed results, keyed by canonical video ID.
+
+Published titles and authors rarely change, so a hit skips the network
+entirely: first an in-process LRU, then one SQLite file next to the HTTP
+cache. Successful lookups live for `ttl` seconds; videos TikTok reports as
+unavailable are remembered for `negative_ttl`, so a batch full of deleted
+videos does not hit the API every run. Resolved short links are stored as
+aliases of their video.
+
+Each row keeps the genre it was classified with and the classifier's
+fingerprint; after a genre-map change the genre is recomputed from the
+cached title instead of fetching the video again.
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from anewz.http_cache import CACHE_DIR
+from anewz.metrics import count
+
+DEFAULT_TTL = 7 * 24 * 3600  # a week: the social team's re-check cycle
+DEFAULT_NEGATIVE_TTL = 3600
+MEMORY_SIZE = 20_000  # entries held in process
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    key TEXT PRIMARY KEY,
+    row TEXT,
+    error TEXT,
+    classifier TEXT,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+class VideoCache:
+    """LRU + SQLite cache of oEmbed rows and failures, safe to share between threads.
+
+    get() returns (row, error) or None on a miss; row is a dict with Genre,
+    Title and Author, error the reason a video was unavailable.
+    """
+
+    def __init__(self, path=None, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL,
+                 memory_size=MEMORY_SIZE):
+        path = Path(path or CACHE_DIR / "tiktok.sqlite3")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.memory_size = memory_size
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()  # key -> (expires_at, row, error, classifier)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._db.execute("DELETE FROM videos WHERE expires_at < ?", (time.time(),))
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _entry(self, key):
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            return entry
+        found = self._db.execute(
+            "SELECT expires_at, row, error, classifier FROM videos WHERE key = ?", (key,)).fetchone()
+        if found is None:
+            return None
+        expires_at, row, error, fingerprint = found
+        entry = (expires_at, row and json.loads(row), error, fingerprint)
+        self._remember(key, entry)
+        return entry
+
+    def get(self, key, classifier=None):
+        with self._lock:
+            entry = self._entry(key)
+            if entry is None or entry[0] < time.time():
+                self.misses += 1
+                count("cache_misses", cache="tiktok")
+                return None
+            self.hits += 1
+            count("cache_hits", cache="tiktok")
+        _, row, error, fingerprint = entry
+        if row and classifier is not None and fingerprint != classifier.fingerprint:
+            row = {**row, "Genre": classifier.detect(row["Title"])}
+            self.put(key, row, classifier=classifier, expires_at=entry[0])
+        return row, error
+
+    def put(self, key, row=None, error=None, classifier=None, aliases=(), expires_at=None):
+        """Stores a row (or, with row=None, a failure) under key and its aliases."""
+        if expires_at is None:
+            expires_at = time.time() + (self.ttl if row is not None else self.negative_ttl)
+        fingerprint = classifier.fingerprint if classifier is not None else None
+        entry = (expires_at, row, error, fingerprint)
+        encoded = json.dumps(row) if row is not None else None
+        with self._lock:
+            for name in (key, *aliases):
+                self._remember(name, entry)
+                self._db.execute("INSERT OR REPLACE INTO videos VALUES (?, ?, ?, ?, ?)",
+                                 (name, encoded, error, fingerprint, expires_at))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,175 @@
+"""Parallel, resumable YouTube comment harvesting with yt-dlp.
+
+Videos are spread over worker processes, each keeping one YoutubeDL instance
+for its whole life. Comments are appended to a CSV as each video finishes and
+the video is then recorded in a checkpoint file, so an interrupted job picks
+up where it stopped. A crash between those two writes can repeat one video's
+comments; read the output with read_harvest() to drop such repeats.
+
+With a StateStore (delta runs) each day gets its own working directory,
+comments are requested newest first, and every video's comments are merged
+by Comment_ID with those stored by earlier runs; yt-dlp cannot ask for
+comments since a date, so the saving is in the smaller newest-first cap.
+"""
+import csv
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime
+from pathlib import Path
+
+import pandas as pd
+
+from anewz.collector import INTERNED_COLUMNS, ColumnCollector
+from anewz.csv_stream import OUTPUT_DIR
+from anewz.metrics import call_measured, merge_measured, timed, worker_context
+from anewz.state import YOUTUBE
+
+DEFAULT_MAX_COMMENTS = 50
+COLUMNS = ["Video_URL", "Comment_ID", "Comment_Author", "Comment_Text", "Comment_Date"]
+
+_ydl = None
+
+
+def format_timestamp(ts):
+    """Converts Unix timestamp to readable date string"""
+    if ts:
+        try:
+            return datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')
+        except (OverflowError, OSError, ValueError):
+            return "Unknown"
+    return "N/A"
+
+
+def build_extractor(max_comments=DEFAULT_MAX_COMMENTS, newest_first=False):
+    # yt-dlp takes a good part of a second to import; only harvests pay for it
+    import yt_dlp
+
+    youtube_args = {'max_comments': [str(max_comments)]}
+    if newest_first:
+        youtube_args['comment_sort'] = ['new']
+    ydl_opts = {
+        'getcomments': True,
+        'skip_download': True,
+        'quiet': True,
+        'no_warnings': True,
+        # The comment cap is a YouTube extractor argument, not a top-level option
+        'extractor_args': {'youtube': youtube_args},
+    }
+    return yt_dlp.YoutubeDL(ydl_opts)
+
+
+def _init_worker(extractor, max_comments, newest_first=False):
+    global _ydl
+    _ydl = extractor(max_comments, newest_first)
+
+
+def get_comments_bulk(url, ydl=None):
+    """Comment rows of one video, using this process's extractor by default."""
+    ydl = ydl or _ydl or build_extractor()
+    with timed("yt_dlp_extract"):
+        info = ydl.extract_info(url, download=False)
+    return [{
+        "Video_URL": url,
+        "Comment_ID": c.get('id'),
+        "Comment_Author": c.get('author'),
+        "Comment_Text": c.get('text'),
+        "Comment_Date": format_timestamp(c.get('timestamp'))
+    } for c in info.get('comments') or []]
+
+
+def job_dir(urls, delta=False, max_comments=DEFAULT_MAX_COMMENTS):
+    """Stable working directory for a URL list, so re-running it resumes.
+
+    The comment cap and order (delta runs fetch newest first) are part of
+    the key: a rerun asking for more comments starts over instead of
+    resuming the truncated harvest. Delta runs get one directory per day: a
+    rerun the same day resumes, the next day's run fetches again.
+    """
+    key = "\n".join([f"max_comments={max_comments} newest_first={delta}", *urls])
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    if delta:
+        return OUTPUT_DIR / f"youtube_{digest}_{date.today():%Y%m%d}"
+    return OUTPUT_DIR / f"youtube_{digest}"
+
+
+def _load_checkpoint(path):
+    if not path.exists():
+        return set()
+    return {line.strip() for line in path.read_text(encoding="utf-8").splitlines() if line.strip()}
+
+
+def harvest_comments(urls, workdir, processes=4, max_comments=DEFAULT_MAX_COMMENTS, state=None,
+                     extractor=build_extractor):
+    """Fetches comments for every video not already done in `workdir`.
+
+    Writes workdir/comments.csv and workdir/done.txt and yields
+    (url, comment_count, error) as each video finishes; videos completed by
+    an earlier run are skipped. Failed videos are not checkpointed and are
+    retried next time; closing the generator early leaves the videos not
+    started yet for the next run too. With a StateStore, comments are
+    fetched newest first, recorded per video, and comment_count is the
+    number of new ones. Each worker gets its yt-dlp object from
+    `extractor(max_comments, newest_first)`, which must be picklable (a
+    module-level function or a partial of one).
+    """
+    workdir = Path(workdir)
+    workdir.mkdir(parents=True, exist_ok=True)
+    out_path = workdir / "comments.csv"
+    checkpoint_path = workdir / "done.txt"
+
+    done = _load_checkpoint(checkpoint_path)
+    todo = [url for url in dict.fromkeys(urls) if url not in done]
+    if not todo:
+        return
+
+    new_file = not out_path.exists() or out_path.stat().st_size == 0
+    with open(out_path, "a", encoding="utf-8", newline="") as out, \
+            open(checkpoint_path, "a", encoding="utf-8") as checkpoint, \
+            ProcessPoolExecutor(max_workers=processes, mp_context=worker_context(), initializer=_init_worker,
+                                initargs=(extractor, max_comments, state is not None)) as pool:
+        writer = csv.DictWriter(out, fieldnames=COLUMNS)
+        if new_file:
+            writer.writeheader()
+        futures = {pool.submit(call_measured, get_comments_bulk, url): url for url in todo}
+        try:
+            for future in as_completed(futures):
+                url = futures[future]
+                try:
+                    rows = merge_measured(future.result())
+                except Exception as e:
+                    yield url, 0, e
+                    continue
+                if state is not None:
+                    rows = state.record(YOUTUBE, url, rows, key="Comment_ID")
+                with timed("checkpoint"):
+                    writer.writerows(rows)
+                    out.flush()
+                    os.fsync(out.fileno())
+                    checkpoint.write(url + "\n")
+                    checkpoint.flush()
+                    os.fsync(checkpoint.fileno())
+                yield url, len(rows), None
+        finally:
+            # Closed early (a cancelled job): videos not started yet wait for the next run
+            pool.shutdown(cancel_futures=True)
+
+
+def read_harvest(workdir, state=None, urls=()):
+    """Loads a job's comments, dropping rows repeated by an interrupted run.
+
+    With a StateStore, returns every stored comment of `urls` instead, old
+    and new, so a delta run's output is complete. Video URLs and authors
+    come back as categoricals, held once however many comments they have.
+    """
+    if state is not None:
+        collected = ColumnCollector(COLUMNS)
+        for url in dict.fromkeys(urls):
+            collected.extend(state.rows(YOUTUBE, url))
+        return collected.frame()
+    out_path = Path(workdir) / "comments.csv"
+    if not out_path.exists():
+        return pd.DataFrame(columns=COLUMNS)
+    interned = {column: "category" for column in COLUMNS if column in INTERNED_COLUMNS}
+    df = pd.read_csv(out_path, dtype={"Comment_ID": str, **interned})
+    return df.drop_duplicates(subset=["Video_URL", "Comment_ID"], ignore_index=True)
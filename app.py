@@ -1,46 +1,44 @@
 import newsapi
-import pywhatkit
 import schedule
 import time
 from datetime import datetime
 
+from anewz.briefing import Briefing, HeadlineCache, build_briefing, minutes_before, print_report, whatsapp
+
 # Setup your API Key
 newsapi_client = newsapi.NewsApiClient(api_key='YOUR_NEWS_API_KEY')
 
-def fetch_top_5(country_code, country_name):
-    """Fetches top 5 headlines for a specific country."""
-    top_headlines = newsapi_client.get_top_headlines(country=country_code, language='en', page_size=5)
-    articles = top_headlines.get('articles', [])
-    
-    report = f"\n{country_name} Top 5:\n"
-    for i, art in enumerate(articles, 1):
-        report += f"{i}. {art['title']}\n"
-    return report
+# Countries in the briefing, in order (ISO code, display name); the global
+# section is added at the end. All of them are fetched at the same time.
+COUNTRIES = [
+    ('az', '🇦🇿 Azerbaijan'),
+    ('tr', '🇹🇷 Turkey'),
+]
+SEND_AT = "08:00"
+PREBUILD_MINUTES = 5  # build the report this long before SEND_AT
+
+# Replace with your phone number including country code;
+# set DRY_RUN = True to print the report instead of opening WhatsApp
+PHONE = "+994XXXXXXXXX"
+DRY_RUN = False
+
+headline_cache = HeadlineCache()
 
 def get_morning_briefing():
     print(f"Generating report for {datetime.now().strftime('%Y-%m-%d %H:%M')}...")
-    
-    # 1. Gather Data
-    report = "🌅 *Your 8:00 AM News Briefing* 🌅\n"
-    report += fetch_top_5('az', '🇦🇿 Azerbaijan')
-    report += fetch_top_5('tr', '🇹🇷 Turkey')
-    
-    # Global Trends
-    global_news = newsapi_client.get_top_headlines(language='en', page_size=5)
-    report += "\n🌍 Global Top 5:\n"
-    for i, art in enumerate(global_news.get('articles', []), 1):
-        report += f"{i}. {art['title']}\n"
-        
-    # 2. Send via WhatsApp
-    # Note: Replace with your phone number including country code
-    # wait_time=15 gives the web browser time to load
-    pywhatkit.sendwhatmsg_instantly("+994XXXXXXXXX", report, wait_time=15, tab_close=True)
-    print("Message sent!")
-
-# 3. Schedule for 08:00 AM
-schedule.every().day.at("08:00").do(get_morning_briefing)
-
-print("Automated News Bot is running... waiting for 08:00 AM.")
+    return build_briefing(newsapi_client, COUNTRIES, f"🌅 *Your {SEND_AT} News Briefing* 🌅\n",
+                          cache=headline_cache)
+
+# wait_time=15 gives the web browser time to load
+deliver = print_report if DRY_RUN else whatsapp(PHONE, wait_time=15)
+briefing = Briefing(get_morning_briefing, deliver)
+
+# Prebuild shortly before the send time, then send on the dot
+schedule.every().day.at(minutes_before(SEND_AT, PREBUILD_MINUTES)).do(briefing.prepare)
+schedule.every().day.at(SEND_AT).do(briefing.send)
+
+print(f"Automated News Bot is running... waiting for {SEND_AT}.")
 while True:
     schedule.run_pending()
-    time.sleep(60) # Check every minute
+    # Sleep straight through to the next job instead of waking every minute
+    time.sleep(max(schedule.idle_seconds() or 0, 0))
@@ -0,0 +1 @@
+"""Offline throughput benchmarks for the AnewZ pipelines."""
@@ -0,0 +1,36 @@
+"""Synthetic, seeded corpora shaped like our real exports."""
+import random
+
+WORDS = ("the a of in on for with after before says report new week today people city "
+         "talks deal plan team fans video live update watch share").split()
+KEYWORDS = ("nato election president oil gas price market football match ai tech baku caucasus "
+            "karabakh music festival military strike world business").split()
+SECTIONS = ["region", "economy", "world", "politics", "sport", "tech", "culture"]
+HASHTAGS = ["anewz", "baku", "breaking", "economy", "football", "ai", "nato", "cop29", "caucasus"]
+COMMENTS = ["🔥🔥🔥", "First!", "Great video", "This is terrible news", "Love it ❤️",
+            "Check my channel", "Why is nobody talking about this?", "👏", "So sad", "Thanks for sharing"]
+
+
+def make_posts(n, seed=0):
+    """Post texts mixing filler words, genre keywords and hashtags."""
+    rng = random.Random(seed)
+    posts = []
+    for _ in range(n):
+        words = rng.choices(WORDS, k=rng.randint(8, 30)) + rng.choices(KEYWORDS, k=rng.randint(0, 3))
+        rng.shuffle(words)
+        tags = [f"#{tag}" for tag in rng.sample(HASHTAGS, rng.randint(0, 3))]
+        posts.append(" ".join(words + tags).capitalize())
+    return posts
+
+
+def make_paths(n, seed=0):
+    """anewz.tv-style article paths: /<section>/<slug>-<id>."""
+    rng = random.Random(seed)
+    return [f"/{rng.choice(SECTIONS)}/{'-'.join(rng.choices(WORDS + KEYWORDS, k=5))}-{i}" for i in range(n)]
+
+
+def make_comments(n, duplicate_share=0.3, seed=0):
+    """Comment texts where roughly `duplicate_share` are spam or copy-pastes."""
+    rng = random.Random(seed)
+    return [rng.choice(COMMENTS) if rng.random() < duplicate_share else " ".join(rng.choices(WORDS, k=rng.randint(3, 20)))
+            for _ in range(n)]
@@ -0,0 +1,292 @@
+"""Benchmark runner: rows/s, p50/p99 latency and peak RSS per pipeline.
+
+Starts the local stand-in server, then runs each pipeline in a fresh
+interpreter so peak RSS is measured per pipeline:
+
+    python -m benchmarks.run --rows 200000 --requests 500 --latency 0.05
+    python -m benchmarks.run --only genre,tiktok --error-rate 0.05 --json before.json
+
+Latency is per request for the network pipelines and per chunk for the batch
+ones. The async article pipeline, the TikTok fetcher and the YouTube harvester
+hand results back in completion order from a pool, so only their throughput
+is reported.
+YouTube extraction is replaced by a stand-in extractor reading the local
+server, which measures our harvesting overhead rather than yt-dlp's.
+"""
+import argparse
+import json
+import multiprocessing
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+
+import pandas as pd
+
+from benchmarks.corpora import make_comments, make_paths, make_posts
+
+CHUNK = 10_000
+
+
+def _timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def bench_genre(args):
+    from anewz.genre import SOCIAL_GENRE_MAP, GenreClassifier
+
+    posts = pd.Series(make_posts(args.rows))
+    classifier = GenreClassifier(SOCIAL_GENRE_MAP)
+    latencies = [_timed(classifier.classify, posts[i:i + CHUNK])[1] for i in range(0, len(posts), CHUNK)]
+    return len(posts), 0, latencies
+
+
+def bench_genre_scores(args):
+    from anewz.genre import SOCIAL_GENRE_MAP, GenreScorer
+
+    posts = pd.Series(make_posts(args.rows))
+    scorer = GenreScorer(SOCIAL_GENRE_MAP)
+    latencies = [_timed(scorer.top_k, posts[i:i + CHUNK])[1] for i in range(0, len(posts), CHUNK)]
+    return len(posts), 0, latencies
+
+
+def bench_hashtags(args):
+    from anewz.categorize import HashtagIndex, hashtag_lists
+
+    posts = pd.Series(make_posts(args.rows))
+    trending = HashtagIndex()
+    latencies = [_timed(lambda chunk: trending.update(hashtag_lists(chunk)), posts[i:i + CHUNK])[1]
+                 for i in range(0, len(posts), CHUNK)]
+    return len(posts), 0, latencies
+
+
+def bench_sentiment(args):
+    from anewz.sentiment import score_sentiment
+
+    comments = pd.Series(make_comments(args.rows))
+    latencies = [_timed(score_sentiment, comments[i:i + CHUNK])[1] for i in range(0, len(comments), CHUNK)]
+    return len(comments), 0, latencies
+
+
+def bench_dedupe(args):
+    from anewz.dedupe import near_duplicate_clusters
+
+    comments = pd.Series(make_comments(args.rows))
+    latencies = [_timed(near_duplicate_clusters, comments[i:i + CHUNK])[1] for i in range(0, len(comments), CHUNK)]
+    return len(comments), 0, latencies
+
+
+def bench_collect(args):
+    from anewz.collector import INTERNED_COLUMNS, ColumnCollector
+
+    # Meta-style comments: each post's columns repeated next to its 500 comments
+    texts = make_comments(10_000)
+    collected = ColumnCollector(categorical=INTERNED_COLUMNS + ("post_id", "page"), numeric=("like_count",))
+    latencies = []
+    for post in range(0, args.rows, 500):
+        record = {"post_id": f"1000_{post}", "page": f"Page {post % 20}"}
+        comments = [{"id": f"{post}_{i}", "message": texts[(post + i) % len(texts)], "like_count": i % 7,
+                     "Author_Name": f"user{(post * 7 + i) % 5000}"} for i in range(min(500, args.rows - post))]
+        latencies.append(_timed(collected.extend, comments, record)[1])
+    return len(collected.frame()), 0, latencies
+
+
+def _threaded(func, items, workers):
+    latencies, failed = [], 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for future in as_completed([executor.submit(_timed, func, item) for item in items]):
+            result, seconds = future.result()
+            latencies.append(seconds)
+            failed += not result
+    return len(items), failed, latencies
+
+
+def bench_fast_scrape(args):
+    from anewz.articles import build_config, fast_scrape
+
+    config = build_config()
+    urls = [f"{args.base_url}{path}" for path in make_paths(args.requests)]
+    return _threaded(lambda url: fast_scrape(url, config), urls, args.workers)
+
+
+def bench_articles_pipeline(args):
+    from anewz.pipeline import scrape_articles
+
+    urls = [f"{args.base_url}{path}" for path in make_paths(args.requests)]
+    failed = sum(row is None for _, row, _ in scrape_articles(urls, concurrency=args.workers))
+    return len(urls), failed, []
+
+
+def bench_articles_headers(args):
+    from anewz.pipeline import scrape_headers
+
+    urls = [f"{args.base_url}{path}" for path in make_paths(args.requests)]
+    failed = sum(row is None for _, row, _ in scrape_headers(urls, concurrency=args.workers))
+    return len(urls), failed, []
+
+
+def bench_tiktok(args):
+    import anewz.tiktok
+
+    anewz.tiktok.OEMBED_URL = f"{args.base_url}/oembed"
+    # One in five URLs repeats an earlier video with a query string, to exercise coalescing
+    urls = [f"https://www.tiktok.com/@creator/video/{7_300_000_000 + i % (args.requests * 4 // 5 or 1)}"
+            f"?is_from_webapp=1&sender={i}" for i in range(args.requests)]
+    # The token bucket is opened wide: this measures our overhead, not TikTok's budget
+    client = anewz.tiktok.TikTokClient(rate=10_000, burst=args.workers, pool_size=args.workers)
+    failed = sum(row is None for _, row, _ in anewz.tiktok.fetch_tiktok(urls, args.workers, client))
+    return len(urls), failed, []
+
+
+def bench_meta(args):
+    import requests
+
+    import anewz.meta
+
+    class TimedSession(requests.Session):
+        latencies = []
+
+        def post(self, *a, **kw):
+            started = time.perf_counter()
+            try:
+                return super().post(*a, **kw)
+            finally:
+                self.latencies.append(time.perf_counter() - started)
+
+    anewz.meta.GRAPH_URL = args.base_url
+    session = TimedSession()
+    ids = [f"1000_{i}" for i in range(args.requests)]
+    comments, failed = 0, 0
+    for _, fetched, error in anewz.meta.get_meta_comments(ids, "token", "Facebook", session=session):
+        comments += len(fetched)
+        failed += error is not None
+    return comments, failed, session.latencies
+
+
+class StandInExtractor:
+    """yt-dlp stand-in that reads a video's comments from the local server."""
+
+    def __init__(self, base_url):
+        import requests
+
+        self.base_url = base_url
+        self.session = requests.Session()
+
+    def extract_info(self, url, download=False):
+        response = self.session.get(f"{self.base_url}/youtube/{url.rsplit('=', 1)[-1]}")
+        response.raise_for_status()
+        return {"comments": response.json()}
+
+
+def stand_in_extractor(base_url, max_comments=None, newest_first=False):
+    """harvest_comments' extractor factory for the local server; picklable as a partial."""
+    return StandInExtractor(base_url)
+
+
+def bench_youtube(args):
+    import anewz.youtube
+
+    urls = [f"https://www.youtube.com/watch?v=vid{i}" for i in range(args.requests)]
+    comments, failed = 0, 0
+    with tempfile.TemporaryDirectory() as workdir:
+        # The workers are not forked from this process: they build the stand-in themselves
+        harvest = anewz.youtube.harvest_comments(urls, workdir, processes=args.workers,
+                                                 extractor=partial(stand_in_extractor, args.base_url))
+        for _, count, error in harvest:
+            comments += count
+            failed += error is not None
+    # Every video is served locally; a failure means the stand-in was not used
+    assert failed == 0, f"{failed} videos failed against the local server"
+    return comments, failed, []
+
+
+PIPELINES = {
+    "genre": bench_genre,
+    "genre_scores": bench_genre_scores,
+    "hashtags": bench_hashtags,
+    "sentiment": bench_sentiment,
+    "dedupe": bench_dedupe,
+    "collect": bench_collect,
+    "fast_scrape": bench_fast_scrape,
+    "articles_pipeline": bench_articles_pipeline,
+    "articles_headers": bench_articles_headers,
+    "tiktok": bench_tiktok,
+    "meta": bench_meta,
+    "youtube": bench_youtube,
+}
+
+
+def _percentile(values, q):
+    return round(float(pd.Series(values).quantile(q)) * 1000, 1) if values else None
+
+
+def run_child(args):
+    started = time.perf_counter()
+    items, failed, latencies = PIPELINES[args.child](args)
+    seconds = time.perf_counter() - started
+    # ru_maxrss is in KiB on Linux; pools count through RUSAGE_CHILDREN
+    peak_kib = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                   resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    print(json.dumps({
+        "pipeline": args.child, "items": items, "failed": failed, "seconds": round(seconds, 3),
+        "items_per_s": round(items / seconds, 1), "p50_ms": _percentile(latencies, 0.5),
+        "p99_ms": _percentile(latencies, 0.99), "peak_rss_mb": round(peak_kib / 1024, 1),
+    }))
+
+
+def run_all(args):
+    ready = multiprocessing.Queue()
+    from benchmarks.server import serve
+
+    server = multiprocessing.Process(target=serve, kwargs={
+        "latency": args.latency, "error_rate": args.error_rate, "ready": ready}, daemon=True)
+    server.start()
+    base_url = f"http://127.0.0.1:{ready.get(timeout=10)}"
+
+    names = args.only.split(",") if args.only else list(PIPELINES)
+    results = []
+    try:
+        for name in names:
+            cmd = [sys.executable, "-m", "benchmarks.run", "--child", name, "--base-url", base_url,
+                   "--rows", str(args.rows), "--requests", str(args.requests), "--workers", str(args.workers)]
+            proc = subprocess.run(cmd, capture_output=True, text=True)
+            if proc.returncode:
+                print(f"{name} failed:\n{proc.stderr}", file=sys.stderr)
+                continue
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+            print(f"finished {name}", file=sys.stderr)
+    finally:
+        server.terminate()
+
+    table = pd.DataFrame(results)
+    print(table.to_string(index=False, na_rep="-"))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000, help="corpus size for the batch pipelines")
+    parser.add_argument("--requests", type=int, default=300, help="items for the network pipelines")
+    parser.add_argument("--workers", type=int, default=10, help="threads, connections or processes")
+    parser.add_argument("--latency", type=float, default=0.05, help="stand-in server latency (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 429/503 answers")
+    parser.add_argument("--only", help="comma-separated pipelines: " + ",".join(PIPELINES))
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--child", choices=list(PIPELINES), help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        run_child(args)
+    else:
+        run_all(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Local stand-in for anewz.tv, TikTok oEmbed, the Graph API and YouTube.
+
+Every response waits `latency` seconds (jittered by +-50%) and fails with
+429 or 503 at `error_rate`, so the pipelines can be measured without
+touching live services.
+"""
+import hashlib
+import json
+import random
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from benchmarks.corpora import make_comments, make_posts
+
+ARTICLE_TEMPLATE = """<!DOCTYPE html>
+<html><head>
+<title>{title}</title>
+<meta property="og:title" content="{title}">
+<meta property="article:section" content="{section}">
+<meta property="article:published_time" content="2026-01-15T09:30:00+04:00">
+<meta name="author" content="AnewZ Desk">
+<script type="application/ld+json">{{"@type": "NewsArticle", "headline": "{title}", "datePublished": "2026-01-15T09:30:00+04:00"}}</script>
+</head><body><article><h1>{title}</h1>{paragraphs}</article></body></html>"""
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real origins
+    latency = 0.05
+    error_rate = 0.0
+    pages = 3  # Graph API comment pages per object
+    page_size = 25
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b"", content_type="application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _delay_or_fail(self):
+        time.sleep(self.latency * random.uniform(0.5, 1.5))
+        if random.random() < self.error_rate:
+            status = random.choice((429, 503))
+            self._send(status, json.dumps({"error": {"message": f"stand-in {status}"}}).encode())
+            return True
+        return False
+
+    def do_GET(self):
+        if self._delay_or_fail():
+            return
+        url = urlsplit(self.path)
+        if url.path == "/oembed":
+            self._oembed(parse_qs(url.query).get("url", [""])[0])
+        elif url.path.startswith("/youtube/"):
+            self._youtube(url.path.split("/")[2])
+        else:
+            self._article(url.path)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self._delay_or_fail():
+            return
+        batch = json.loads(parse_qs(body.decode()).get("batch", ["[]"])[0])
+        answers = [{"code": 200, "body": json.dumps(self._graph_page(r["relative_url"]))} for r in batch]
+        self._send(200, json.dumps(answers).encode(), headers={"X-App-Usage": json.dumps({"call_count": 10})})
+
+    def _article(self, path):
+        seed = int(hashlib.sha1(path.encode()).hexdigest()[:8], 16)
+        etag = f'"{seed:x}"'
+        if self.headers.get("If-None-Match") == etag:
+            self._send(304, headers={"ETag": etag})
+            return
+        posts = make_posts(12, seed=seed)
+        section = path.strip("/").split("/")[0] or "news"
+        page = ARTICLE_TEMPLATE.format(title=posts[0][:80], section=section,
+                                       paragraphs="".join(f"<p>{p}. {p}.</p>" for p in posts[1:]))
+        self._send(200, page.encode(), "text/html; charset=utf-8",
+                   {"ETag": etag, "Last-Modified": "Thu, 15 Jan 2026 05:30:00 GMT"})
+
+    def _oembed(self, video_url):
+        seed = int(hashlib.sha1(video_url.encode()).hexdigest()[:8], 16)
+        title = make_posts(1, seed=seed)[0][:90] + " | TikTok"
+        self._send(200, json.dumps({"title": title, "author_name": f"creator{seed % 500}"}).encode())
+
+    def _youtube(self, video_id):
+        texts = make_comments(self.page_size * self.pages, seed=zlib.crc32(video_id.encode()))
+        comments = [{"id": f"{video_id}.{i}", "author": f"@user{i}", "text": t, "timestamp": 1768450000 + i}
+                    for i, t in enumerate(texts)]
+        self._send(200, json.dumps(comments).encode())
+
+    def _graph_page(self, relative_url):
+        url = urlsplit(relative_url)
+        obj_id = url.path.split("/")[1]
+        page = int(parse_qs(url.query).get("after", ["0"])[0])
+        texts = make_comments(self.page_size, seed=zlib.crc32(f"{obj_id}:{page}".encode()))
+        body = {"data": [{"id": f"{obj_id}_{page}_{i}", "message": t, "created_time": "2026-01-15T10:00:00+0000",
+                          "from": {"name": f"user{i}", "id": str(i)}, "like_count": i % 7}
+                         for i, t in enumerate(texts)]}
+        if page + 1 < self.pages:
+            body["paging"] = {"cursors": {"after": str(page + 1)}, "next": "https://graph.facebook.com/next"}
+        return body
+
+
+def serve(port=0, latency=0.05, error_rate=0.0, ready=None):
+    """Runs the stand-in server until the process is killed.
+
+    If `ready` is given (a multiprocessing queue) the bound port is put on it.
+    """
+    StandInHandler.latency = latency
+    StandInHandler.error_rate = error_rate
+    server = ThreadingHTTPServer(("127.0.0.1", port), StandInHandler)
+    server.daemon_threads = True
+    server.request_queue_size = 256
+    if ready is not None:
+        ready.put(server.server_address[1])
+    server.serve_forever()
@@ -1,66 +1,83 @@
 import streamlit as st
 import pandas as pd
-import requests
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-
-# Initialize Analyzer
-analyzer = SentimentIntensityAnalyzer()
-
-def get_sentiment(text):
-    if not text: return "Neutral"
-    score = analyzer.polarity_scores(str(text))['compound']
-    if score >= 0.05: return "Positive"
-    elif score <= -0.05: return "Negative"
-    return "Neutral"
-
-# Scraper Function for Meta (FB/IG)
-def get_meta_comments(obj_id, token, platform):
-    # Endpoint for comments
-    url = f"https://graph.facebook.com/v22.0/{obj_id}/comments"
-    
-    # Instagram uses 'text', Facebook uses 'message'
-    fields = 'text,username,timestamp,like_count' if platform == "Instagram" else 'message,from,created_time,like_count'
-    
-    try:
-        r = requests.get(url, params={'access_token': token, 'fields': fields}, timeout=15).json()
-        
-        if "error" in r:
-            st.error(f"Meta API Error for ID {obj_id}: {r['error'].get('message')}")
-            return None
-            
-        data = r.get('data', [])
-        for c in data:
-            # Extract content based on platform to run sentiment
-            msg = c.get('text') if platform == "Instagram" else c.get('message')
-            c['Sentiment_Category'] = get_sentiment(msg)
-            
-            # Flatten the 'from' dictionary in Facebook to make it CSV friendly
-            if platform == "Facebook" and 'from' in c:
-                c['Author_Name'] = c['from'].get('name')
-                c['Author_ID'] = c['from'].get('id')
-        return data
-    except Exception as e:
-        st.error(f"Connection Error: {e}")
-        return None
+import sys
+from pathlib import Path
+
+# Make the shared anewz package importable under `streamlit run`
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from anewz.collector import INTERNED_COLUMNS, ColumnCollector
+from anewz.columnar import LABELS, UPLOAD_TYPES, export, file_name, mime_type, read_table
+from anewz.jobs import DONE, progress_panel, start_job
+from anewz.meta import COMMENT_COLUMNS, get_meta_comments
+from anewz.metrics import METRICS
+from anewz.sentiment import score_sentiment
+from anewz.state import StateStore
 
 # --- UI SECTION ---
 st.set_page_config(page_title="Meta Sentiment Scraper", layout="wide")
+
+# Comments of earlier runs, merged into delta runs
+@st.cache_resource
+def get_state_store():
+    return StateStore()
+
 st.title("📊 Meta Sentiment Scraper (FB & IG)")
 st.markdown("Scrape comments from Facebook or Instagram while preserving all original CSV columns.")
 
 # Sidebar Settings
 platform = st.sidebar.selectbox("Select Platform", ["Facebook", "Instagram"])
 token = st.sidebar.text_input(f"Enter {platform} Page Access Token", type="password")
+concurrency = st.sidebar.slider("Parallel batch requests", 1, 10, 4)
+# Copy-pasted comments are scored once and grouped under a Cluster_ID
+dedupe = st.sidebar.checkbox("Merge near-duplicate comments", value=False)
+delta = st.sidebar.checkbox("Delta run: fetch only comments newer than the last run")
+# Graph API calls and throttling vs. sentiment scoring
+show_perf = st.sidebar.checkbox("Show performance panel")
+export_format = st.sidebar.selectbox("Download format", list(LABELS), format_func=LABELS.get)
 
 # File Uploader
-uploaded_file = st.sidebar.file_uploader("Upload your CSV/Excel list", type=["csv", "xlsx"])
+uploaded_file = st.sidebar.file_uploader("Upload your CSV/Excel/Parquet/Arrow list", type=UPLOAD_TYPES + ["xlsx"])
+
+def fetch_and_score(job, rows_by_id, token, platform, concurrency, state, dedupe):
+    """Runs on the job's thread: no st.* calls, progress goes through the job.
+
+    Returns the scored comments (None if there are none) and the errors.
+    """
+    errors = []
+    fetched = get_meta_comments(rows_by_id, token, platform, concurrency=concurrency, state=state)
+    for item_id, comments, error in fetched:
+        if job.cancelled:
+            # The comments fetched so far are still scored and shown
+            fetched.close()
+            break
+        if error:
+            errors.append(f"Meta API Error for ID {item_id}: {error}")
+        # Keep every original column next to each comment
+        for record in rows_by_id[item_id]:
+            job.extend(comments, record)
+        job.step(failed=error is not None)
+
+    df_final = job.frame()
+    if df_final.empty:
+        return None, errors
+
+    # Sentiment runs as its own stage, after all network I/O
+    # Instagram uses 'text', Facebook uses 'message'
+    job.note("Scoring sentiment...")
+    msg_col = 'text' if platform == "Instagram" else 'message'
+    messages = df_final[msg_col] if msg_col in df_final else pd.Series(None, index=df_final.index, dtype=object)
+    scores = score_sentiment(messages, dedupe=dedupe)
+    df_final['Sentiment_Score'] = scores['Sentiment_Score']
+    df_final['Sentiment_Category'] = scores['Sentiment']
+    if dedupe:
+        df_final['Cluster_ID'] = scores['Cluster_ID']
+    job.note("")
+    return df_final, errors
 
 if uploaded_file:
-    # Read the original file
-    if uploaded_file.name.endswith('.csv'):
-        df_original = pd.read_csv(uploaded_file)
-    else:
-        df_original = pd.read_excel(uploaded_file)
+    # Read the original file (format from the file extension)
+    df_original = read_table(uploaded_file)
     
     st.write("### Original Data Preview", df_original.head(3))
     
@@ -71,11 +88,49 @@ if uploaded_file:
         if not token:
             st.warning("Please enter a valid Access Token in the sidebar.")
         else:
-            all_rows = []
-            progress_bar = st.progress(0)
+            # Stage timings are process-wide; start each run from zero
+            METRICS.reset()
+            
+            # Up to 50 IDs per Graph batch call, every comment page followed
+            records = df_original.to_dict('records')
+            ids = df_original[id_column].astype(str).str.strip()
+            rows_by_id = {}
+            for record, item_id in zip(records, ids):
+                rows_by_id.setdefault(item_id, []).append(record)
             
-            for index, row in df_original.iterrows():
-                item_id = str(row[id_column]).strip()
+            # Comments are stored a column at a time; the original columns
+            # repeat for every comment of a post, so they are interned (all
+            # but those holding lists or other unhashable values)
+            repeated = [c for c in df_original.columns if df_original[c].map(pd.api.types.is_hashable).all()]
+            collector = ColumnCollector(list(dict.fromkeys(list(df_original.columns) + COMMENT_COLUMNS[platform])),
+                                        categorical=INTERNED_COLUMNS + tuple(repeated), numeric=("like_count",))
+            # The fetch runs in the background and survives reruns; the panel below polls it
+            start_job("meta_job", fetch_and_score, rows_by_id, token, platform, concurrency,
+                      get_state_store() if delta else None, dedupe, total=len(rows_by_id), collector=collector)
+
+    job = st.session_state.get("meta_job")
+    if job is not None:
+        progress_panel(job, "meta_job", "IDs", export_format, f"{platform.lower()}_comments_partial")
+
+        if not job.running:
+            df_final, errors = job.result or (None, [])
+            if errors:
+                with st.expander(f"⚠️ {len(errors)} IDs failed"):
+                    st.write("\n".join(f"- {e}" for e in errors))
+            
+            if df_final is not None:
+                st.success(f"Collected {len(df_final)} comments.")
+                st.dataframe(df_final)
                 
-                # Fetch comments from Meta
-                fetched_data = get_meta_comments(item_id, token, platform)
+                st.download_button(f"📥 Download Results as {LABELS[export_format]}", export(df_final, export_format),
+                                   file_name(f"{platform.lower()}_sentiment", export_format), mime_type(export_format))
+            elif job.snapshot().status == DONE:
+                st.error("No comments could be retrieved. Check your IDs and token and try again.")
+
+            if show_perf:
+                snap = job.snapshot()
+                comments = 0 if df_final is None else len(df_final)
+                with st.expander("⏱ Performance", expanded=True):
+                    st.caption(f"{snap.done} IDs and {comments} comments in {snap.elapsed:.1f}s "
+                               f"({snap.rate:.1f} IDs/s). Stage times add up across batch requests.")
+                    st.dataframe(METRICS.stage_table(), use_container_width=True)
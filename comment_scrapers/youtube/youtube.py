@@ -1,74 +1,66 @@
 import streamlit as st
-import pandas as pd
-import yt_dlp
 from datetime import datetime
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-
-# Initialize the analyzer
-analyzer = SentimentIntensityAnalyzer()
-
-def get_sentiment(text):
-    if not text:
-        return "Neutral"
-    score = analyzer.polarity_scores(str(text))
-    compound = score['compound']
-    if compound >= 0.05:
-        return "Positive"
-    elif compound <= -0.05:
-        return "Negative"
-    else:
-        return "Neutral"
-
-def format_timestamp(ts):
-    """Converts Unix timestamp to readable date string"""
-    if ts:
-        try:
-            return datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S')
-        except:
-            return "Unknown"
-    return "N/A"
-
-def get_comments_bulk(url):
-    ydl_opts = {
-        'getcomments': True, 
-        'skip_download': True, 
-        'quiet': True, 
-        'max_comments': 50,
-        'no_warnings': True
-    }
-    try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-            comments = info.get('comments', [])
-            
-            results = []
-            for c in comments:
-                comment_text = c.get('text')
-                results.append({
-                    "Video_URL": url,
-                    "Comment_ID": c.get('id'),
-                    "Comment_Author": c.get('author'),
-                    "Comment_Text": comment_text,
-                    "Sentiment": get_sentiment(comment_text),
-                    "Comment_Date": format_timestamp(c.get('timestamp'))
-                })
-            return results
-    except Exception as e:
-        return None
+import sys
+from pathlib import Path
+
+# Make the shared anewz package importable under `streamlit run`
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from anewz.columnar import LABELS, UPLOAD_TYPES, export, file_name, mime_type, read_table
+from anewz.jobs import DONE, progress_panel, start_job
+from anewz.metrics import METRICS
+from anewz.sentiment import score_sentiment
+from anewz.state import StateStore
+from anewz.youtube import DEFAULT_MAX_COMMENTS, harvest_comments, job_dir, read_harvest
 
 # --- UI SECTION ---
 st.set_page_config(page_title="YouTube Bulk Scraper", layout="wide")
+
+# Comments of earlier runs, merged into delta runs
+@st.cache_resource
+def get_state_store():
+    return StateStore()
+
 st.title("📊 Bulk YouTube Scraper & Sentiment Analyzer")
 
 st.sidebar.header("Upload Data")
-uploaded_file = st.sidebar.file_uploader("Upload CSV or Excel", type=["csv", "xlsx"])
+uploaded_file = st.sidebar.file_uploader("Upload CSV, Excel, Parquet or Arrow", type=UPLOAD_TYPES + ["xlsx"])
+max_comments = st.sidebar.number_input("Max comments per video", 1, 100_000, DEFAULT_MAX_COMMENTS)
+num_workers = st.sidebar.slider("Parallel workers", 1, 16, 4)
+# Copy-pasted comments are scored once and grouped under a Cluster_ID
+dedupe = st.sidebar.checkbox("Merge near-duplicate comments", value=False)
+delta = st.sidebar.checkbox("Delta run: fetch newest comments and merge with earlier runs")
+# yt-dlp extraction vs. checkpointing vs. sentiment scoring
+show_perf = st.sidebar.checkbox("Show performance panel")
+export_format = st.sidebar.selectbox("Download format", list(LABELS), format_func=LABELS.get)
+
+def harvest_and_score(job, urls, workdir, state, num_workers, max_comments, dedupe):
+    """Runs on the job's thread: no st.* calls, progress goes through the job."""
+    harvest = harvest_comments(urls, workdir, processes=num_workers, max_comments=max_comments,
+                               state=state)
+    for url, count, error in harvest:
+        if job.cancelled:
+            # Videos not finished yet are left for the next run of the same list;
+            # those done so far are still scored and shown
+            harvest.close()
+            break
+        job.step(failed=error is not None, note=f"last: {url} ({count} {'new ' if state else ''}comments)")
+
+    df_final = read_harvest(workdir, state, urls)
+    if not df_final.empty:
+        # Score every comment in one batch once fetching is done
+        job.note("Scoring sentiment...")
+        scores = score_sentiment(df_final['Comment_Text'], dedupe=dedupe)
+        df_final.insert(4, "Sentiment", scores['Sentiment'])
+        df_final.insert(5, "Sentiment_Score", scores['Sentiment_Score'])
+        if dedupe:
+            df_final.insert(6, "Cluster_ID", scores['Cluster_ID'])
+        job.note("✅ Scraping Complete!")
+    return df_final
 
 if uploaded_file:
-    # Handle File Loading
-    if uploaded_file.name.endswith('.csv'):
-        df_input = pd.read_csv(uploaded_file)
-    else:
-        df_input = pd.read_excel(uploaded_file)
+    # Handle File Loading (format from the file extension)
+    df_input = read_table(uploaded_file)
 
     st.write("### 1. Preview Uploaded Data")
     st.dataframe(df_input.head())
@@ -84,36 +76,48 @@ if uploaded_file:
         if not urls:
             st.warning("No URLs found in the selected column.")
         else:
-            all_comments = []
-            progress_bar = st.progress(0)
-            status_text = st.empty()
+            # Stage timings are process-wide; start each run from zero
+            METRICS.reset()
+            # Comments go to disk as each video finishes; re-running the same
+            # list resumes from the checkpoint instead of starting over. The
+            # harvest runs in the background and survives reruns.
+            state = get_state_store() if delta else None
+            workdir = st.session_state["youtube_workdir"] = job_dir(urls, delta=delta, max_comments=max_comments)
+            start_job("youtube_job", harvest_and_score, urls, workdir, state,
+                      num_workers, max_comments, dedupe, total=len(urls))
 
-            for i, url in enumerate(urls):
-                status_text.text(f"Processing video {i+1} of {len(urls)}: {url}")
-                data = get_comments_bulk(url)
-                if data:
-                    all_comments.extend(data)
-                
-                # Update progress
-                progress_bar.progress((i + 1) / len(urls))
+    job = st.session_state.get("youtube_job")
+    if job is not None:
+        # Partial downloads read the checkpointed comments, without sentiment yet
+        progress_panel(job, "youtube_job", "videos", export_format, "youtube_comments_partial",
+                       partial=lambda: read_harvest(st.session_state["youtube_workdir"]))
 
-            status_text.text("✅ Scraping Complete!")
+        if not job.running:
+            snap = job.snapshot()
+            if snap.failed:
+                st.warning(f"{snap.failed} videos failed; run again to retry just those.")
 
+            df_final = job.result
             # --- Display & Download Results ---
-            if all_comments:
-                df_final = pd.DataFrame(all_comments)
+            if df_final is not None and not df_final.empty:
                 st.write("### 2. Scraped Results")
                 st.dataframe(df_final)
 
-                # Export to CSV
-                csv_data = df_final.to_csv(index=False).encode('utf-8')
+                # Export in the chosen format
                 st.download_button(
-                    label="📥 Download Results as CSV",
-                    data=csv_data,
-                    file_name=f"youtube_sentiment_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                    mime="text/csv"
+                    label=f"📥 Download Results as {LABELS[export_format]}",
+                    data=export(df_final, export_format),
+                    file_name=file_name(f"youtube_sentiment_{datetime.now().strftime('%Y%m%d_%H%M%S')}", export_format),
+                    mime=mime_type(export_format)
                 )
-            else:
+            elif snap.status == DONE:
                 st.error("No comments could be retrieved. Check your URLs and try again.")
+
+            if show_perf:
+                comments = 0 if df_final is None else len(df_final)
+                with st.expander("⏱ Performance", expanded=True):
+                    st.caption(f"{snap.done} videos and {comments} comments in {snap.elapsed:.1f}s "
+                               f"({snap.rate:.2f} videos/s). Stage times add up across worker processes.")
+                    st.dataframe(METRICS.stage_table(), use_container_width=True)
 else:
     st.info("Please upload a file in the sidebar to get started.")
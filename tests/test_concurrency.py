@@ -0,0 +1,114 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from anewz.concurrency import AdaptiveConcurrency, AdaptiveLimit, TokenBucket
+
+
+def test_successes_add_about_one_slot_per_window():
+    limit = AdaptiveLimit(initial=4, maximum=64)
+    for _ in range(4):
+        limit.acquire()
+        limit.release(0.1, status=200)
+    assert 4.9 < limit.limit < 5
+
+
+def test_throttling_halves_the_limit_once_per_round_trip():
+    limit = AdaptiveLimit(initial=16)
+    for _ in range(3):
+        limit.acquire()
+        limit.release(0.1, status=429)
+    # The three 429s came back within one round trip of each other
+    assert limit.limit == 8
+    assert (limit.errors, limit.throttled) == (3, 3)
+
+
+def test_limit_stays_within_bounds():
+    limit = AdaptiveLimit(initial=2, minimum=1, maximum=3)
+    limit.acquire()
+    limit.release(0.01, failed=True)
+    limit.acquire()
+    limit.release(0.01, failed=True)
+    assert limit.limit == 1
+    for _ in range(50):
+        limit.acquire()
+        limit.release(0.01, status=200)
+    assert limit.limit == 3
+
+
+def test_rising_latency_decreases_the_limit():
+    limit = AdaptiveLimit(initial=10, latency_tolerance=2.0)
+    for _ in range(5):
+        limit.acquire()
+        limit.release(0.01, status=200)
+    before = limit.limit
+    limit.acquire()
+    limit.release(1.0, status=200)
+    assert limit.limit == pytest.approx(before / 2)
+
+
+def test_request_counts_exceptions_as_failures():
+    limit = AdaptiveLimit(initial=4)
+    with pytest.raises(OSError):
+        with limit.request():
+            raise OSError("reset")
+    assert (limit.in_flight, limit.errors) == (0, 1)
+
+
+def test_async_waiters_are_woken_by_a_release_from_another_thread():
+    limit = AdaptiveLimit(initial=1)
+    limit.acquire()
+
+    async def wait_for_slot():
+        started = time.perf_counter()
+        await limit.acquire_async()
+        return time.perf_counter() - started
+
+    threading.Timer(0.2, limit.release, args=(0.01,), kwargs={"status": 200}).start()
+    waited = asyncio.run(wait_for_slot())
+    assert 0.15 < waited < 1
+    assert limit.in_flight == 1
+    assert limit._async_waiters == []
+
+
+def test_cancelled_async_waiters_are_forgotten():
+    limit = AdaptiveLimit(initial=1)
+    limit.acquire()
+
+    async def give_up():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(limit.acquire_async(), 0.05)
+
+    asyncio.run(give_up())
+    assert limit._async_waiters == []
+    limit.release(0.01, status=200)
+    assert limit.in_flight == 0
+
+
+def test_hosts_get_their_own_limits():
+    limits = AdaptiveConcurrency(initial=2)
+    assert limits.for_url("https://a.example/x") is limits.for_url("https://A.example/y")
+    assert limits.for_url("https://a.example/x") is not limits.for_url("https://b.example/x")
+    assert limits.summary()["limit"] == 4
+
+
+def test_token_bucket_allows_a_burst_then_the_rate():
+    bucket = TokenBucket(rate=20, burst=5)
+    started = time.perf_counter()
+    for _ in range(5):
+        bucket.acquire()
+    assert time.perf_counter() - started < 0.05
+    for _ in range(4):
+        bucket.acquire()
+    # Four more tokens at 20 per second
+    assert time.perf_counter() - started == pytest.approx(0.2, abs=0.08)
+
+
+def test_token_bucket_pause_holds_callers_back():
+    bucket = TokenBucket(rate=100, burst=10)
+    bucket.pause(0.2)
+    started = time.perf_counter()
+    bucket.acquire()
+    assert time.perf_counter() - started == pytest.approx(0.2, abs=0.08)
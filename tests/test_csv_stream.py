@@ -0,0 +1,33 @@
+import io
+
+import pandas as pd
+import pytest
+
+from anewz.csv_stream import sniff_encoding, stream_csv
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_dtype_drift_between_chunks(tmp_path, fmt):
+    # Chunk 1 reads as int64, chunk 2 as float with NaN, chunk 3 as text
+    source = io.BytesIO(("a,b\n" + "1,x\n" * 5 + "2.5,\n" * 5 + "text,7\n").encode())
+    source.name = "drift.csv"
+    out = tmp_path / f"out.{fmt}"
+
+    result = stream_csv(source, lambda chunk: chunk.assign(n=len(chunk)), chunksize=5,
+                        out_path=out, output_format=fmt)
+
+    df = pd.read_parquet(out) if fmt == "parquet" else pd.read_feather(out)
+    assert result.rows == 11
+    assert list(df["a"]) == ["1"] * 5 + ["2.5"] * 5 + ["text"]
+    assert df["b"].isna().sum() == 5
+    # Columns added by the processing keep their own types
+    assert list(df["n"]) == [5] * 10 + [1]
+
+
+def test_encoding_sniffed_from_the_whole_file():
+    # Valid UTF-8 for the first MiB, then a latin-1 byte
+    source = io.BytesIO(("text\n" + "ok\n" * (1 << 19)).encode() + "café\n".encode("latin1"))
+    assert sniff_encoding(source) == "latin1"
+    assert source.tell() == 0
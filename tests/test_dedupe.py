@@ -0,0 +1,81 @@
+import pandas as pd
+
+import anewz.pipeline
+from anewz.dedupe import NearDuplicateIndex, near_duplicate_clusters, page_cluster, representatives
+from anewz.metrics import METRICS
+
+STORY = ("the central bank raised interest rates by half a point on tuesday citing inflation that has "
+         "stayed above target for a year and analysts expect another increase before the summer")
+EDITED = STORY.replace("tuesday", "wednesday")
+WEATHER = ("heavy snow closed the mountain roads overnight and the weather service warned drivers to stay "
+           "at home while crews worked to clear the passes before the holiday traffic arrives")
+OTHER = ("the football team won the league title after a late goal in the final match of the season "
+         "and thousands of fans celebrated in the streets of the capital until the early morning")
+
+
+def _page(text, times=3):
+    return "<html><body>" + f"<p>{text}</p>" * times + "</body></html>"
+
+
+def test_near_duplicates_share_a_cluster():
+    clusters = near_duplicate_clusters([STORY, OTHER, EDITED, STORY.upper(), "short text", "Short text!"])
+    # IDs count up in order of first appearance
+    assert list(clusters) == [0, 1, 0, 0, 2, 2]
+    assert list(representatives(clusters)) == [0, 1, 4]
+
+
+def test_short_texts_only_cluster_when_identical():
+    assert list(near_duplicate_clusters(["red car", "red cars", "Red car."])) == [0, 1, 0]
+
+
+def test_cluster_ids_are_stable():
+    texts = pd.Series([OTHER, STORY, EDITED, None, OTHER], index=list("abcde"))
+    first, second = near_duplicate_clusters(texts), near_duplicate_clusters(texts)
+    assert first.equals(second)
+    assert list(first.index) == list("abcde")
+    assert list(first) == [0, 1, 1, 2, 0]
+
+
+def test_index_matches_the_batch_clustering():
+    index = NearDuplicateIndex()
+    assert [index.add_text(text) for text in [STORY, OTHER, EDITED, OTHER]] == [0, 1, 0, 1]
+    assert index.clusters == 2
+
+
+def test_short_pages_are_not_clustered():
+    index = NearDuplicateIndex()
+    assert page_cluster(index, _page("too short to fingerprint")) is None
+    assert page_cluster(index, _page(STORY)) == page_cluster(index, _page(EDITED)) == 0
+
+
+def parse_or_fail(url, html):
+    """Module level, so the parser processes can import it."""
+    if "bank" in html:
+        raise ValueError(f"cannot parse {url}")
+    return {"Title": "Parsed", "URL": url}
+
+
+def test_copies_of_a_failed_leader_get_its_exception(monkeypatch):
+    pages = [("https://example.com/leader", _page(STORY)),
+             ("https://example.com/waiting-copy", _page(EDITED)),
+             ("https://example.com/other", _page(OTHER)),
+             # With one parser process at most two pages are pending: this one
+             # waits for the leader to finish first
+             ("https://example.com/weather", _page(WEATHER)),
+             # Arrives once the leader has failed: answered from the cluster's outcome
+             ("https://example.com/late-copy", _page(STORY))]
+    monkeypatch.setattr(anewz.pipeline, "fetch_pages",
+                        lambda urls, *args, **kwargs: ((url, html, None) for url, html in pages))
+
+    METRICS.reset()
+    results = {url: (row, error) for url, row, error in
+               anewz.pipeline.scrape_articles([url for url, _ in pages], processes=1, parse=parse_or_fail,
+                                              dedupe=True)}
+
+    leader_error = results["https://example.com/leader"][1]
+    assert isinstance(leader_error, ValueError)
+    for copy in ("https://example.com/waiting-copy", "https://example.com/late-copy"):
+        assert results[copy] == (None, leader_error)
+    # The late copy was not queued behind its leader but answered after it failed
+    assert METRICS.counter("duplicates_skipped", stage="parse") == 1
+    assert [results[f"https://example.com/{page}"][0]["Cluster_ID"] for page in ("other", "weather")] == [1, 2]
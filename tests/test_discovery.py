@@ -0,0 +1,64 @@
+from xml.sax.saxutils import escape
+
+import httpx
+
+from anewz.discovery import discover
+from anewz.state import StateStore
+
+BASE = "https://example.com"
+SITEMAP_URL = BASE + "/sitemap.xml"
+
+
+def _sitemap(entries):
+    urls = "".join(f"<url><loc>{escape(BASE + path)}</loc><lastmod>{lastmod}</lastmod></url>"
+                   for path, lastmod in entries)
+    return f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+
+
+def _client(entries):
+    return httpx.Client(transport=httpx.MockTransport(lambda request: httpx.Response(200, text=_sitemap(entries))))
+
+
+def _paths(found):
+    return [entry.url.removeprefix("https://example.com") for entry in found]
+
+
+def _run(state, entries, failed=()):
+    """Discovers, then commits every URL found but the `failed` paths."""
+    discovery = discover([SITEMAP_URL], state=state, client=_client(entries))
+    paths = _paths(discovery)
+    discovery.commit(f"https://example.com{path}" for path in paths if path not in failed)
+    return paths
+
+
+def test_entries_sharing_the_cursor_lastmod_are_kept(tmp_path):
+    state = StateStore(tmp_path / "state.sqlite3")
+    entries = [("/a", "2026-03-01"), ("/b", "2026-03-02")]
+    assert _run(state, entries) == ["/a", "/b"]
+
+    # Same day as the cursor (day-only lastmod): only the new URL comes back
+    entries.append(("/c", "2026-03-02"))
+    assert _run(state, entries) == ["/c"]
+    assert _run(state, entries) == []
+
+
+def test_cursor_waits_for_the_extraction(tmp_path):
+    state = StateStore(tmp_path / "state.sqlite3")
+    entries = [("/a", "2026-03-01"), ("/b", "2026-03-02"), ("/c", "2026-03-03")]
+    # Nothing committed (the job crashed): everything comes back
+    assert _paths(discover([SITEMAP_URL], state=state, client=_client(entries))) == ["/a", "/b", "/c"]
+    # /b failed: it and the newer /c are found again, /a is not
+    assert _run(state, entries, failed={"/b"}) == ["/a", "/b", "/c"]
+    assert _run(state, entries) == ["/b", "/c"]
+    assert _run(state, entries) == []
+
+
+def test_cursor_matches_urls_that_normalize_differently(tmp_path):
+    state = StateStore(tmp_path / "state.sqlite3")
+    entries = [("/a/", "2026-03-02"), ("/b?utm_source=feed&id=1", "2026-03-02")]
+    assert _run(state, entries) == ["/a/", "/b?utm_source=feed&id=1"]
+    # Both are listed at the cursor's time under their normalized URLs
+    assert _run(state, entries) == []
+    entries.append(("/c/", "2026-03-02"))
+    assert _run(state, entries) == ["/c/"]
+    assert _run(state, entries) == []
@@ -0,0 +1,72 @@
+import pandas as pd
+import pytest
+
+from anewz.genre import NEWS_GENRE_MAP, GenreClassifier, GenreScorer
+
+MAP = {
+    "World": ["nato", "un"],
+    "Economy": ["oil", "prices", "price", "market"],
+    "Sports": ["win", "wins", "match"],
+    "Region": ["central asia"],
+}
+
+
+def test_top_k_orders_genres_by_score():
+    result = GenreScorer(MAP).top_k(["oil prices and market news at the NATO summit"])
+    assert result.loc[0, "Genre"] == "Economy"
+    assert result.loc[0, "Genre_Score"] == 3
+    assert result.loc[0, "Genres"] == "Economy; World"
+
+
+def test_repeated_keywords_count_once():
+    assert GenreScorer(MAP).top_k(["oil oil oil, and nato"]).loc[0, "Genres"] == "World; Economy"
+
+
+def test_ties_keep_map_order():
+    # One keyword each for Economy and World: World comes first in the map
+    result = GenreScorer(MAP).top_k(["oil and nato"])
+    assert result.loc[0, "Genres"] == "World; Economy"
+    assert GenreClassifier(MAP).classify(["oil and nato"])[0] == "World"
+
+
+def test_weights_override_the_map():
+    scorer = GenreScorer(MAP, weights={"nato": 5})
+    result = scorer.top_k(["oil prices at the NATO summit"])
+    assert result.loc[0, "Genre"] == "World"
+    assert result.loc[0, "Genre_Score"] == 5
+    assert scorer.fingerprint != GenreScorer(MAP).fingerprint
+
+
+def test_top_k_limits_the_genres():
+    text = "nato oil match central asia"
+    assert GenreScorer(MAP, k=2).top_k([text]).loc[0, "Genres"] == "World; Economy"
+    assert GenreScorer(MAP).top_k([text], k=4).loc[0, "Genres"] == "World; Economy; Sports; Region"
+
+
+@pytest.mark.parametrize("cls", [GenreClassifier, GenreScorer])
+def test_empty_missing_and_unmatched_texts(cls):
+    texts = pd.Series(["", None, float("nan"), "nothing to see here"], index=[10, 11, 12, 13])
+    genres = cls(MAP).classify(texts)
+    assert list(genres) == ["Not_specified", "Not_specified", "Not_specified", "General"]
+    assert list(genres.index) == [10, 11, 12, 13]
+    assert list(genres.cat.categories) == ["World", "Economy", "Sports", "Region", "General", "Not_specified"]
+
+
+def test_top_k_of_empty_and_unmatched_texts():
+    result = GenreScorer(MAP).top_k(["", "nothing to see here"])
+    assert list(result["Genre"]) == ["Not_specified", "General"]
+    assert list(result["Genre_Score"]) == [0, 0]
+    assert list(result["Genres"]) == ["", ""]
+
+
+@pytest.mark.parametrize("cls", [GenreClassifier, GenreScorer])
+def test_keywords_match_whole_words_only(cls):
+    classifier = cls(MAP)
+    # No implicit plurals: "wines" is not "win" + "es", "fun" not "un"
+    assert list(classifier.classify(["fine wines", "so much fun", "team wins", "the oil price"])) == \
+        ["General", "General", "Sports", "Economy"]
+
+
+def test_scorer_agrees_with_classifier_on_single_hits():
+    texts = ["Baku hosts the football league", "New AI software", "Parliament elections", "Gas markets"]
+    assert list(GenreScorer(NEWS_GENRE_MAP).classify(texts)) == list(GenreClassifier(NEWS_GENRE_MAP).classify(texts))
@@ -0,0 +1,33 @@
+import pickle
+import sys
+
+import pytest
+
+from anewz.metrics import call_measured, merge_measured
+
+
+class DownloadError(Exception):
+    """Like yt-dlp's: keeps the traceback of the error it wraps."""
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.exc_info = sys.exc_info()
+
+
+def _fails_with_traceback(url):
+    try:
+        raise OSError("connection reset")
+    except OSError:
+        raise DownloadError(f"ERROR: {url}: video unavailable")
+
+
+def test_unpicklable_errors_keep_their_reason():
+    outcome = pickle.loads(pickle.dumps(call_measured(_fails_with_traceback, "vid0")))
+    with pytest.raises(RuntimeError, match="DownloadError: ERROR: vid0: video unavailable"):
+        merge_measured(outcome)
+
+
+def test_picklable_errors_come_back_as_they_are():
+    outcome = pickle.loads(pickle.dumps(call_measured(int, "x")))
+    with pytest.raises(ValueError, match="invalid literal"):
+        merge_measured(outcome)
@@ -0,0 +1,30 @@
+import pandas as pd
+import pytest
+
+from anewz.articles import head_row
+from anewz.columnar import export, read_table
+from anewz.page_head import head_metadata, is_complete
+
+pytest.importorskip("pyarrow")
+
+
+def _page(published):
+    return (f'<html><head><title>Story</title>'
+            f'<meta property="article:published_time" content="{published}"></head></html>')
+
+
+def test_unparseable_dates_are_none():
+    metadata = head_metadata(_page("March 3"))
+    assert metadata["published"] is None
+    # Without a date the page goes through the full parse
+    assert not is_complete(metadata)
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_mixed_date_formats_export(fmt):
+    pages = [_page("2026-03-01T10:00:00Z"), _page("Tue, 03 Mar 2026 10:00:00 +0000"), _page("March 3")]
+    df = pd.DataFrame([head_row(head_metadata(html), f"https://example.com/{i}") for i, html in enumerate(pages)])
+
+    exported = read_table(export(df, fmt), fmt)
+
+    assert list(exported["Date"].dt.day.fillna(0)) == [1, 3, 0]
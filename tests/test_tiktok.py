@@ -0,0 +1,60 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from anewz.tiktok import TikTokClient, TikTokError
+from anewz.video_cache import VideoCache
+
+URL = "https://www.tiktok.com/@news/video/123"
+
+
+class FakeClient(TikTokClient):
+    """Answers oEmbed lookups from `outcomes` (rows, or exceptions to raise)."""
+
+    def __init__(self, outcomes, release=None, **kwargs):
+        super().__init__(**kwargs)
+        self.outcomes = list(outcomes)
+        self.release = release
+        self.fetched = 0
+
+    def _fetch(self, oembed_url):
+        self.fetched += 1
+        if self.release is not None:
+            self.release.wait(5)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def test_concurrent_lookups_of_one_video_share_the_request():
+    release = threading.Event()
+    client = FakeClient([{"Title": "Baku", "Genre": "Region", "Author": "news"}], release=release)
+    urls = [URL, URL + "?lang=en", "https://m.tiktok.com/@news/video/123/"]
+    with ThreadPoolExecutor(3) as executor:
+        futures = [executor.submit(client.lookup, url) for url in urls]
+        # Every lookup joins the first one while its request is held open
+        time.sleep(0.2)
+        release.set()
+        results = [future.result() for future in futures]
+    assert client.fetched == 1
+    assert [row["URL"] for row, error in results] == urls
+    assert client._calls == {}
+
+
+def test_failures_are_not_remembered():
+    client = FakeClient([TikTokError("HTTP 500 after 4 attempts"),
+                         {"Title": "t", "Genre": "General", "Author": "a"}])
+    assert client.lookup(URL) == (None, "HTTP 500 after 4 attempts")
+    row, error = client.lookup(URL)
+    assert error is None and row["Title"] == "t"
+    assert client.fetched == 2
+    assert client._calls == {}
+
+
+def test_finished_lookups_are_repeated_from_the_cache(tmp_path):
+    client = FakeClient([{"Title": "t", "Genre": "General", "Author": "a"}],
+                        cache=VideoCache(tmp_path / "tiktok.sqlite3"))
+    assert client.lookup(URL)[0]["Title"] == "t"
+    assert client.lookup(URL + "?is_from_webapp=1")[0]["Title"] == "t"
+    assert client.fetched == 1